@@ -0,0 +1,252 @@
+# backend/app/core/admission.py
+# Contrôle d'admission par tenant: token bucket (débit) + bulkhead (concurrence)
+#
+# Configuration (JSON), la clé "default" s'applique aux tenants non listés:
+#   TENANT_LIMITS='{"default": {"rate": 100, "burst": 200, "concurrency": 20},
+#                   "bigcorp": {"rate": 300, "burst": 600, "concurrency": 40}}'
+# Chaque requête /api/{tenant_id} tient au plus une session DB du tenant: limiter
+# les requêtes concurrentes d'un tenant borne donc ses sessions dans le pool.
+#
+# Le tenant vient du chemin, donc de n'importe quel client: l'état par tenant est
+# borné (LRU, ADMISSION_MAX_TENANTS) et les métriques ne portent que les tenants
+# connus (TENANT_LIMITS, annuaire des shards), les autres sont regroupés sous "other".
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, Histogram, Gauge
+from pydantic import BaseModel
+from starlette.routing import Match
+
+from .tenant import shard_router
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_TENANTS = int(os.getenv("ADMISSION_MAX_TENANTS", "10000"))  # États (bucket, bulkhead) gardés en mémoire
+OTHER_TENANT = "other"
+
+class TenantLimits(BaseModel):
+    rate: float = 100.0  # Requêtes/seconde soutenues
+    burst: int = 200  # Taille du bucket
+    concurrency: int = 20  # Requêtes simultanées
+    max_queue: int = 50  # Requêtes en attente d'une place
+    queue_timeout: float = 0.1  # Attente maximale d'une place (secondes)
+
+admission_rejections = Counter(
+    'workos_admission_rejections_total',
+    'Requests rejected by admission control',
+    ['tenant', 'route', 'reason']
+)
+
+admission_queue_wait = Histogram(
+    'workos_admission_queue_wait_seconds',
+    'Time spent waiting for a tenant concurrency slot',
+    ['route'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+admission_in_flight = Gauge(
+    'workos_admission_in_flight',
+    'Admitted in-flight requests per tenant',
+    ['tenant'],
+    multiprocess_mode='livesum'
+)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Retourne 0 si un jeton est pris, sinon le délai avant le prochain jeton"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def idle(self) -> bool:
+        """Bucket de nouveau plein: l'oublier ne rend aucun jeton au tenant"""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+class Bulkhead:
+    def __init__(self, concurrency: int, max_queue: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.active = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            self.active += 1
+            return True
+        if self.waiting >= self.max_queue or timeout <= 0:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+            self.active += 1
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    def idle(self) -> bool:
+        return self.active == 0 and self.waiting == 0
+
+def load_limits(value: Optional[str]) -> Dict[str, TenantLimits]:
+    limits = {"default": TenantLimits()}
+    for tenant_id, config in json.loads(value or "{}").items():
+        limits[tenant_id] = TenantLimits(**config)
+    return limits
+
+class AdmissionController:
+    def __init__(self, limits: Dict[str, TenantLimits], max_tenants: int = ADMISSION_MAX_TENANTS):
+        self.limits = limits
+        self.max_tenants = max_tenants
+        self._buckets = OrderedDict()
+        self._bulkheads = OrderedDict()
+
+    def limits_for(self, tenant_id: str) -> TenantLimits:
+        return self.limits.get(tenant_id, self.limits["default"])
+
+    def tenant_label(self, tenant_id: str) -> str:
+        """Label de métrique à cardinalité bornée: tenants configurés ou connus de l'annuaire"""
+        if tenant_id in self.limits or shard_router.known(tenant_id):
+            return tenant_id
+        return OTHER_TENANT
+
+    def bucket(self, tenant_id: str) -> TokenBucket:
+        bucket = self._buckets.get(tenant_id)
+        if bucket is None:
+            limits = self.limits_for(tenant_id)
+            bucket = self._buckets[tenant_id] = TokenBucket(limits.rate, limits.burst)
+            self._evict(self._buckets)
+        else:
+            self._buckets.move_to_end(tenant_id)
+        return bucket
+
+    def bulkhead(self, tenant_id: str) -> Bulkhead:
+        # Créé paresseusement: le sémaphore doit appartenir à la boucle en cours
+        bulkhead = self._bulkheads.get(tenant_id)
+        if bulkhead is None:
+            limits = self.limits_for(tenant_id)
+            bulkhead = self._bulkheads[tenant_id] = Bulkhead(limits.concurrency, limits.max_queue)
+            self._evict(self._bulkheads)
+        else:
+            self._bulkheads.move_to_end(tenant_id)
+        return bulkhead
+
+    def _evict(self, states: OrderedDict):
+        """Oublie les tenants les moins récemment vus; un état en cours d'utilisation
+        (bucket entamé, places occupées) est conservé et repoussé en fin de file"""
+        for _ in range(len(states)):
+            if len(states) <= self.max_tenants:
+                return
+            tenant_id, state = next(iter(states.items()))
+            if state.idle():
+                del states[tenant_id]
+            else:
+                states.move_to_end(tenant_id)
+
+# Instance globale
+admission_controller = AdmissionController(load_limits(os.getenv("TENANT_LIMITS")))
+
+def route_template(request: Request) -> str:
+    """Chemin déclaré de la route (/api/{tenant_id}/...) pour des labels à cardinalité bornée"""
+    for route in request.app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+def _reject(status_code: int, detail: str, retry_after: float):
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+async def admission_middleware(request: Request, call_next):
+    path_parts = request.url.path.split("/")
+    if not ADMISSION_ENABLED or len(path_parts) < 3 or path_parts[1] != "api":
+        return await call_next(request)
+
+    tenant = path_parts[2]
+    label = admission_controller.tenant_label(tenant)
+    route = route_template(request)
+
+    # 1. Débit: rejet immédiat si le bucket est vide
+    retry_after = admission_controller.bucket(tenant).try_acquire()
+    if retry_after:
+        admission_rejections.labels(tenant=label, route=route, reason="rate_limited").inc()
+        return _reject(429, "Tenant rate limit exceeded", retry_after)
+
+    # 2. Concurrence: courte attente bornée, puis rejet
+    bulkhead = admission_controller.bulkhead(tenant)
+    start = time.perf_counter()
+    admitted = await bulkhead.acquire(admission_controller.limits_for(tenant).queue_timeout)
+    admission_queue_wait.labels(route=route).observe(time.perf_counter() - start)
+
+    if not admitted:
+        admission_rejections.labels(tenant=label, route=route, reason="concurrency").inc()
+        return _reject(503, "Tenant concurrency limit exceeded", 1)
+
+    admission_in_flight.labels(tenant=label).inc()
+    released = False
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission_in_flight.labels(tenant=label).dec()
+            bulkhead.release()
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        release()
+        raise
+    # call_next rend la main dès les en-têtes: pour un export ou un flux .ics, la session
+    # et le curseur restent ouverts pendant tout l'envoi du corps, la place aussi
+    response.body_iterator = HoldUntilSent(response.body_iterator, release)
+    return response
+
+class HoldUntilSent:
+    """Itérateur du corps qui libère la place à la fin de l'envoi, sur erreur/annulation
+    (client déconnecté), à la fermeture ou au ramasse-miettes s'il n'a jamais été lu"""
+    def __init__(self, body, release):
+        self.body = body
+        self.release = release
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.body.__anext__()
+        except BaseException:
+            self.release()
+            raise
+
+    async def aclose(self):
+        self.release()
+        if hasattr(self.body, "aclose"):
+            await self.body.aclose()
+
+    def __del__(self):
+        self.release()
@@ -0,0 +1,93 @@
+# backend/app/core/coalesce.py
+# Single-flight: des lectures identiques et simultanées partagent une seule requête
+#
+# La première requête (leader) calcule la réponse sérialisée dans un thread, avec une
+# session propre au calcul (et non celle du leader, fermée s'il se déconnecte); les
+# requêtes identiques qui arrivent pendant ce calcul (followers) attendent le même
+# résultat au lieu d'interroger la base. Rien n'est conservé après la fin du calcul:
+# ce n'est pas un cache, la fraîcheur est celle d'une requête normale.
+#
+# Activation par route (toutes par défaut):  COALESCE_ROUTES="project_details,calendar_view"
+# Désactivation complète:                    COALESCE_ROUTES=""
+import asyncio
+import os
+from typing import Callable, Hashable
+
+from fastapi import Response
+from prometheus_client import Counter, Histogram
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .tenant import shard_router
+
+coalesce_requests = Counter(
+    'workos_coalesce_requests_total',
+    'Coalesced read requests by role (leader = query executed, follower = result shared)',
+    ['route', 'role']
+)
+
+coalesce_flight_size = Histogram(
+    'workos_coalesce_flight_size',
+    'Requests served by a single executed query',
+    ['route'],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+
+def load_routes(value):
+    if value is None:
+        return None  # Toutes les routes
+    return {route.strip() for route in value.split(",") if route.strip()}
+
+def _with_session(tenant_id: str, compute: Callable[[Session], bytes]) -> bytes:
+    db = shard_router.session_for(tenant_id)
+    try:
+        return compute(db)
+    finally:
+        db.close()
+
+class Flight:
+    def __init__(self, task):
+        self.task = task
+        self.size = 1
+
+class SingleFlight:
+    def __init__(self, routes=None):
+        self.routes = routes
+        self._flights = {}
+
+    def enabled(self, route: str) -> bool:
+        return self.routes is None or route in self.routes
+
+    async def run(self, route: str, tenant_id: str, key: Hashable, compute: Callable[[Session], bytes]) -> bytes:
+        """compute(db) est synchrone (requêtes + sérialisation) et exécuté dans un thread
+        avec une session du shard du tenant, ouverte et fermée par le calcul lui-même"""
+        if not self.enabled(route):
+            return await run_in_threadpool(_with_session, tenant_id, compute)
+
+        flight_key = (route, tenant_id, key)
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            # Tâche indépendante de la requête leader: une déconnexion du leader ne pénalise pas les followers
+            flight = Flight(asyncio.ensure_future(run_in_threadpool(_with_session, tenant_id, compute)))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(route, flight_key, flight))
+            coalesce_requests.labels(route=route, role="leader").inc()
+        else:
+            flight.size += 1
+            coalesce_requests.labels(route=route, role="follower").inc()
+
+        return await asyncio.shield(flight.task)
+
+    def _finish(self, route, flight_key, flight):
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+        coalesce_flight_size.labels(route=route).observe(flight.size)
+        if not flight.task.cancelled():
+            # Marquer l'exception comme récupérée si tous les demandeurs ont disparu
+            flight.task.exception()
+
+    async def response(self, route: str, tenant_id: str, key: Hashable, compute: Callable[[Session], bytes]) -> Response:
+        return Response(content=await self.run(route, tenant_id, key, compute), media_type="application/json")
+
+# Instance globale (par process et boucle d'événements)
+single_flight = SingleFlight(load_routes(os.getenv("COALESCE_ROUTES")))
@@ -1,5 +1,6 @@
 # backend/app/core/database.py
 import os
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
@@ -8,17 +9,59 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Fix pour postgres:// vs postgresql://
-DATABASE_URL = os.getenv("DATABASE_URL")
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def normalize_database_url(url):
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL"))
+
+# Taille des pools (un pool par shard), pré-remplis au démarrage par app.core.warmup
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+def engine_options(**overrides):
+    options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+    options.update(overrides)
+    return options
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engine du shard par défaut créé au premier usage, pas à l'import (démarrage, scripts
+# sans base); database.engine et database.SessionLocal restent accessibles par attribut
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                default_engine = create_engine(DATABASE_URL, **engine_options())
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=default_engine)
+                _engine = default_engine
+    return _engine
+
+def get_sessionmaker():
+    get_engine()
+    return _session_factory
+
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def ilike_contains(column, value: str):
+    """column ILIKE '%value%', les caractères % et _ de la saisie pris littéralement"""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.ilike(f"%{escaped}%", escape="\\")
+
 # Cette fonction manquait !
 def get_db():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
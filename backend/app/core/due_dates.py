@@ -0,0 +1,329 @@
+# backend/app/core/due_dates.py
+# Suivi des échéances: état "pending" / "due_soon" / "overdue" maintenu en base
+#
+# Chaque type suivi (tâches, projets) déclare sa colonne d'échéance, sa colonne
+# d'état et la condition "encore ouvert". Un thread par process garde une file
+# triée par heure de transition (heapq) des échéances proches, rechargée
+# périodiquement depuis chaque shard, et applique les transitions par lots
+# (UPDATE ... RETURNING sur les ids). L'UPDATE revérifie l'échéance et l'état
+# courants: une entrée périmée (échéance reportée, tâche terminée) ne change rien,
+# et seules les lignes réellement modifiées produisent un événement, même avec
+# plusieurs workers.
+#
+# Les routes recalculent l'état dans leur transaction (sync). Une réconciliation
+# périodique rattrape les transitions manquées (arrêt, écritures hors API) et
+# classe sans événement les lignes jamais suivies (données existantes, imports).
+# Elle parcourt toute la table: c'est un travail périodique de la file durable
+# (un par type suivi et par shard et par créneau, exécuté par un seul process),
+# ou le thread de chaque process si la file est désactivée (JOBS_ENABLED=false).
+# Les tenants gelés par un déplacement de shard sont exclus: leurs transitions sont
+# appliquées sur le nouveau shard après la copie.
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import and_, case, null, or_, select, update
+
+from app.core.jobs import JOBS_ENABLED, job_queue
+from app.core.tenant import shard_router
+
+DUE_TRACKER_ENABLED = os.getenv("DUE_TRACKER_ENABLED", "true").lower() == "true"
+DUE_SOON_HOURS = float(os.getenv("DUE_SOON_HOURS", "48"))
+DUE_TRACKER_REFRESH = float(os.getenv("DUE_TRACKER_REFRESH", "60"))  # Rechargement de la file (s)
+DUE_TRACKER_RECONCILE = float(os.getenv("DUE_TRACKER_RECONCILE", "300"))  # Rattrapage complet (s)
+DUE_TRACKER_BATCH = 500
+
+PENDING = "pending"
+DUE_SOON = "due_soon"
+OVERDUE = "overdue"
+
+# État cible -> états de départ autorisés (le moteur ne fait qu'avancer)
+TRANSITIONS = {
+    DUE_SOON: (PENDING,),
+    OVERDUE: (PENDING, DUE_SOON),
+}
+
+due_transitions = Counter(
+    'workos_due_transitions_total',
+    'Due date state transitions applied by the tracker',
+    ['kind', 'state']
+)
+
+due_queue_size = Gauge(
+    'workos_due_queue_size',
+    'Upcoming due date transitions held in memory',
+    multiprocess_mode='livesum'
+)
+
+def _not_frozen(tracker) -> tuple:
+    frozen = shard_router.frozen_tenants()
+    return (tracker.table.c.tenant_id.notin_(frozen),) if frozen else ()
+
+class Tracker:
+    """Type d'élément suivi; open_clause: condition SQL "encore ouvert" (tâche non terminée...)"""
+    def __init__(self, name: str, model, due_column: str, open_clause, payload: Iterable[str] = (),
+                 state_column: str = "due_state"):
+        self.name = name
+        self.table = model.__table__
+        self.due = self.table.c[due_column]
+        self.state = self.table.c[state_column]
+        self.open = open_clause
+        # Colonnes ajoutées aux événements (destinataires des notifications)
+        self.payload = [self.table.c[column] for column in payload]
+
+    def expected_state(self, now: datetime, window: timedelta):
+        return case(
+            (or_(self.due.is_(None), ~self.open), null()),
+            (self.due <= now, OVERDUE),
+            (self.due <= now + window, DUE_SOON),
+            else_=PENDING
+        )
+
+    def reached(self, target: str, now: datetime, window: timedelta):
+        if target == OVERDUE:
+            return self.due <= now
+        return and_(self.due > now, self.due <= now + window)
+
+    def values(self, state):
+        # updated_at inchangé: le passage du temps n'est pas une modification
+        return {self.state: state, self.table.c.updated_at: self.table.c.updated_at}
+
+class DueDateTracker:
+    def __init__(self, due_soon: timedelta = timedelta(hours=DUE_SOON_HOURS),
+                 refresh_interval: float = DUE_TRACKER_REFRESH,
+                 reconcile_interval: float = DUE_TRACKER_RECONCILE):
+        self.due_soon = due_soon
+        self.refresh_interval = refresh_interval
+        self.reconcile_interval = reconcile_interval
+        # Les transitions au-delà de l'horizon seront chargées par un prochain rechargement
+        self.horizon = timedelta(seconds=2 * refresh_interval)
+        self.trackers = {}
+        self._listeners = []
+        self._queue = []  # (heure, type, shard, id, état cible)
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track(self, tracker: Tracker):
+        self.trackers[tracker.name] = tracker
+
+        # Échec: pas de nouvelle tentative, le créneau suivant rattrape
+        @job_queue.handler(f"due_dates.reconcile.{tracker.name}", max_attempts=1, every=self.reconcile_interval)
+        def reconcile_job(job):
+            if DUE_TRACKER_ENABLED:
+                self.reconcile([tracker.name], [job.shard])
+
+    def state_of(self, name: str, now: Optional[datetime] = None):
+        """Expression SQL de l'état d'échéance pour les filtres et compteurs
+
+        La colonne maintenue (indexée) si le moteur tourne; sinon (DUE_TRACKER_ENABLED=false)
+        elle n'est jamais mise à jour hors des routes: état recalculé depuis l'échéance.
+        """
+        tracker = self.trackers[name]
+        if DUE_TRACKER_ENABLED:
+            return tracker.state
+        return tracker.expected_state(now or datetime.utcnow(), self.due_soon)
+
+    def subscribe(self, callback: Callable[[List[dict]], None]):
+        """callback(events) est appelé dans le thread du moteur après chaque lot de transitions"""
+        self._listeners.append(callback)
+
+    # === ÉCRITURES DES ROUTES ===
+
+    def sync(self, db, name: str, tenant_id: str, ids: List[int]):
+        """Recalcule l'état de lignes écrites par une route, dans sa transaction (sans événement)"""
+        tracker = self.trackers[name]
+        now = datetime.utcnow()
+        rows = db.execute(
+            update(tracker.table)
+            .where(tracker.table.c.id.in_(ids))
+            .values(tracker.values(tracker.expected_state(now, self.due_soon)))
+            .returning(tracker.table.c.id, tracker.due, tracker.state)
+        ).all()
+
+        shard, _ = shard_router.resolve(tenant_id)
+        with self._lock:
+            for row_id, due, state in rows:
+                self._schedule(name, shard, row_id, due, state, now)
+        self._wakeup.set()
+
+    def _schedule(self, name, shard, row_id, due, state, now):
+        """Ajoute les prochaines transitions d'une ligne si elles tombent dans l'horizon (verrou tenu)"""
+        upcoming = []
+        if state == PENDING:
+            upcoming.append((due - self.due_soon, DUE_SOON))
+        if state in (PENDING, DUE_SOON):
+            upcoming.append((due, OVERDUE))
+        for at, target in upcoming:
+            entry = (at, name, shard, row_id, target)
+            if at <= now + self.horizon and entry not in self._scheduled:
+                self._scheduled.add(entry)
+                heapq.heappush(self._queue, entry)
+        due_queue_size.set(len(self._queue))
+
+    # === MOTEUR ===
+
+    def start(self):
+        if self._thread is None and self.trackers:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="due-date-tracker", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        next_reconcile = next_refresh = 0.0
+        while not self._stop.is_set():
+            try:
+                if not JOBS_ENABLED and time.monotonic() >= next_reconcile:
+                    self.reconcile()
+                    next_reconcile = time.monotonic() + self.reconcile_interval
+                if time.monotonic() >= next_refresh:
+                    self.refresh()
+                    next_refresh = time.monotonic() + self.refresh_interval
+                self.apply_due()
+            except Exception as e:
+                print(f"Error in due date tracker: {e}")
+
+            # Dormir jusqu'à la prochaine transition connue ou au prochain rechargement
+            wait = next_refresh - time.monotonic()
+            with self._lock:
+                if self._queue:
+                    wait = min(wait, (self._queue[0][0] - datetime.utcnow()).total_seconds())
+            self._wakeup.wait(max(wait, 0.05))
+            self._wakeup.clear()
+
+    def refresh(self):
+        """Charge les transitions de l'horizon depuis chaque shard (index (due_state, échéance))"""
+        now = datetime.utcnow()
+        for name, tracker in self.trackers.items():
+            for shard in shard_router.shards():
+                db = shard_router.sessionmaker(shard)()
+                try:
+                    rows = db.execute(
+                        select(tracker.table.c.id, tracker.due, tracker.state).where(
+                            tracker.open,
+                            or_(
+                                and_(tracker.state == PENDING, tracker.due <= now + self.due_soon + self.horizon),
+                                and_(tracker.state == DUE_SOON, tracker.due <= now + self.horizon)
+                            )
+                        )
+                    ).all()
+                finally:
+                    db.close()
+                with self._lock:
+                    for row_id, due, state in rows:
+                        self._schedule(name, shard, row_id, due, state, now)
+
+    def apply_due(self) -> int:
+        """Applique les transitions arrivées à échéance, retourne le nombre d'événements émis"""
+        now = datetime.utcnow()
+        groups = {}
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                entry = heapq.heappop(self._queue)
+                self._scheduled.discard(entry)
+                _, name, shard, row_id, target = entry
+                groups.setdefault((name, shard, target), []).append(row_id)
+            due_queue_size.set(len(self._queue))
+
+        emitted = 0
+        # Overdue après due_soon: une ligne en retard passe directement à "overdue"
+        for (name, shard, target), ids in sorted(groups.items(), key=lambda item: item[0][2] == OVERDUE):
+            tracker = self.trackers[name]
+            for start in range(0, len(ids), DUE_TRACKER_BATCH):
+                emitted += self._transition(
+                    tracker, shard, target, now,
+                    tracker.table.c.id.in_(ids[start:start + DUE_TRACKER_BATCH])
+                )
+        return emitted
+
+    def reconcile(self, names: Optional[List[str]] = None, shards: Optional[List[str]] = None) -> int:
+        """Rattrapage ensembliste: transitions manquées (avec événements) puis reclassement silencieux"""
+        now = datetime.utcnow()
+        emitted = 0
+        for name in names or list(self.trackers):
+            tracker = self.trackers[name]
+            for shard in shards or shard_router.shards():
+                emitted += self._transition(tracker, shard, OVERDUE, now)
+                emitted += self._transition(tracker, shard, DUE_SOON, now)
+                self._reclassify(tracker, shard, now)
+        return emitted
+
+    def _transition(self, tracker: Tracker, shard: str, target: str, now: datetime, *conditions) -> int:
+        conditions += _not_frozen(tracker)
+        db = shard_router.sessionmaker(shard)()
+        try:
+            rows = db.execute(
+                update(tracker.table)
+                .where(
+                    tracker.state.in_(TRANSITIONS[target]),
+                    tracker.reached(target, now, self.due_soon),
+                    tracker.open,
+                    *conditions
+                )
+                .values(tracker.values(target))
+                .returning(tracker.table.c.id, tracker.table.c.tenant_id, tracker.due, *tracker.payload)
+            ).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        events = []
+        for row in rows:
+            event = dict(row._mapping)
+            # Lignes restées sur un ancien shard après un déplacement de tenant: ignorées
+            if shard_router.resolve(event["tenant_id"])[0] != shard:
+                continue
+            event.update(kind=tracker.name, state=target, due=event.pop(tracker.due.name))
+            events.append(event)
+
+        if events:
+            due_transitions.labels(kind=tracker.name, state=target).inc(len(events))
+            self._notify(events)
+        return len(events)
+
+    def _reclassify(self, tracker: Tracker, shard: str, now: datetime):
+        """Lignes jamais suivies, fermées, sans échéance ou reportées hors API: état recalculé, sans événement"""
+        db = shard_router.sessionmaker(shard)()
+        try:
+            db.execute(
+                update(tracker.table)
+                .where(or_(
+                    and_(tracker.state.is_(None), tracker.due.isnot(None), tracker.open),
+                    and_(tracker.state.isnot(None), or_(tracker.due.is_(None), ~tracker.open)),
+                    and_(tracker.state == OVERDUE, tracker.due > now),
+                    and_(tracker.state == DUE_SOON, tracker.due > now + self.due_soon)
+                ), *_not_frozen(tracker))
+                .values(tracker.values(tracker.expected_state(now, self.due_soon)))
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _notify(self, events: List[dict]):
+        for callback in self._listeners:
+            try:
+                callback(events)
+            except Exception as e:
+                print(f"Error in due date listener: {e}")
+
+# Instance globale (une par process)
+due_tracker = DueDateTracker()
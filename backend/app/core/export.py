@@ -0,0 +1,124 @@
+# backend/app/core/export.py
+# Exports complets en streaming (NDJSON ou CSV, gzip optionnel)
+#
+# La requête (colonnes uniquement, sans objets ORM) est lue par un curseur côté
+# serveur (yield_per): chaque lot est sérialisé, éventuellement compressé, puis
+# envoyé avant la lecture du suivant. La mémoire reste constante quel que soit
+# le nombre de lignes. Pas d'ORDER BY: le premier octet part sans tri préalable
+# et l'ordre des lignes n'est pas garanti.
+import csv
+import io
+import json
+import os
+import time
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+from prometheus_client import Counter, Histogram
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+export_rows = Counter(
+    'workos_export_rows_total',
+    'Rows streamed by bulk exports',
+    ['module', 'format']
+)
+
+export_duration = Histogram(
+    'workos_export_seconds',
+    'Bulk export duration (until the last byte is produced)',
+    ['module'],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+)
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Type not serializable: {type(value).__name__}")
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def _encode_ndjson(keys, rows) -> bytes:
+    dumps = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(",", ":")).encode
+    return "".join(dumps(dict(zip(keys, row))) + "\n" for row in rows).encode()
+
+def _encode_csv(rows, buffer: io.StringIO, writer) -> bytes:
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+def stream_rows(result, fmt: ExportFormat, module: str) -> Iterator[bytes]:
+    """Un morceau par lot du curseur"""
+    keys = list(result.keys())
+    start = time.perf_counter()
+    count = 0
+    try:
+        if fmt == ExportFormat.CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            yield _encode_csv([keys], buffer, writer)
+            for batch in result.partitions():
+                count += len(batch)
+                yield _encode_csv(batch, buffer, writer)
+        else:
+            for batch in result.partitions():
+                count += len(batch)
+                yield _encode_ndjson(keys, batch)
+    finally:
+        result.close()
+        export_rows.labels(module=module, format=fmt.value).inc(count)
+        export_duration.labels(module=module).observe(time.perf_counter() - start)
+
+def gzip_stream(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def table_columns(model, exclude=()):
+    """Colonnes exportées d'un modèle (toutes sauf exclude), id et tenant_id en tête"""
+    columns = [column for column in model.__table__.c if column.name not in exclude]
+    return sorted(columns, key=lambda column: (column.name != "id", column.name != "tenant_id"))
+
+def export_response(db, query, module: str, fmt: ExportFormat, compress: bool) -> StreamingResponse:
+    """query: select() de colonnes; la session reste ouverte jusqu'à la fin de l'envoi"""
+    result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    body = stream_rows(result, fmt, module)
+    filename = f"{module}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt.value}"
+    media_type = MEDIA_TYPES[fmt]
+    if compress:
+        body = gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
@@ -0,0 +1,455 @@
+# backend/app/core/jobs.py
+# Travaux en arrière-plan durables: table background_jobs sur le shard du tenant
+#
+# Un handler s'enregistre par nom et file:
+#   @job_queue.handler("documents.delete_files", queue="storage")
+#   def delete_files(job): ...
+# Il doit être idempotent: un travail peut être rejoué (process arrêté entre
+# l'exécution et l'acquittement, bail expiré). enqueue() écrit le travail dans la
+# transaction de l'appelant: il n'existe que si cette transaction est validée.
+# Une clé (tenant, nom, key) rend l'ajout idempotent tant que la ligne est conservée.
+#
+# Exécution: un thread par file réclame les travaux dus par lots
+# (UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING): plusieurs
+# process se partagent une file sans s'attendre ni exécuter deux fois un travail.
+# Les travaux tournent dans le pool de la file (JOB_QUEUES fixe sa concurrence par
+# process) et sont acquittés par lots. Échec: nouvelle tentative après un délai
+# exponentiel (avec gigue), "failed" après max_attempts. Un travail dont le bail
+# expire (process tué) est remis en file par la maintenance.
+#
+# Priorité: plus petit = plus urgent. run_at: exécution programmée. every=: travail
+# périodique, ajouté sur chaque shard avec une clé par créneau (exécuté une fois).
+# Les travaux d'un tenant gelé (déplacement de shard) ne sont pas réclamés: ils sont
+# copiés avec le tenant et exécutés sur son nouveau shard.
+import os
+import random
+import socket
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.models import BackgroundJob
+from app.core.tenant import shard_router
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+JOB_QUEUES = os.getenv("JOB_QUEUES", "default:4,storage:4,notifications:2")  # file:concurrence par process
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "100"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE = float(os.getenv("JOB_LEASE", "300"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "10"))  # Doublé à chaque tentative
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "3600"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))  # Travaux terminés (clés) conservés
+JOB_MAINTENANCE_INTERVAL = float(os.getenv("JOB_MAINTENANCE_INTERVAL", "10"))
+JOB_DEFAULT_CONCURRENCY = 2  # File absente de JOB_QUEUES
+JOB_ACK_INTERVAL = 0.05  # Délai maximal d'acquittement groupé (secondes)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+SYSTEM_TENANT = "_system"  # Travaux périodiques, hors tenant
+
+Job = namedtuple("Job", "id shard tenant_id name key payload attempts max_attempts")
+Handler = namedtuple("Handler", "fn queue max_attempts priority every")
+
+jobs_enqueued = Counter(
+    'workos_jobs_enqueued_total',
+    'Background jobs enqueued (idempotent duplicates included)',
+    ['queue']
+)
+
+jobs_processed = Counter(
+    'workos_jobs_processed_total',
+    'Background jobs executed, by outcome',
+    ['queue', 'result']  # completed, retried, failed
+)
+
+job_duration = Histogram(
+    'workos_job_duration_seconds',
+    'Background job handler duration',
+    ['queue'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+)
+
+# Valeurs lues en base: identiques d'un process à l'autre (max plutôt que somme)
+jobs_queue_depth = Gauge(
+    'workos_jobs_queue_depth',
+    'Due background jobs waiting in a queue (all shards)',
+    ['queue'],
+    multiprocess_mode='livemax'
+)
+
+jobs_oldest_age = Gauge(
+    'workos_jobs_oldest_age_seconds',
+    'Age of the oldest due job in a queue (all shards)',
+    ['queue'],
+    multiprocess_mode='livemax'
+)
+
+def parse_queues(value: str) -> Dict[str, int]:
+    """"default:4,storage:2" -> {"default": 4, "storage": 2}"""
+    queues = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, concurrency = item.partition(":")
+            queues[name.strip()] = int(concurrency or JOB_DEFAULT_CONCURRENCY)
+    return queues
+
+def _insert(db):
+    # ON CONFLICT: Postgres en production, SQLite pour les bancs d'essai locaux
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+
+def retry_delay(attempts: int) -> float:
+    """Délai avant la tentative suivante: exponentiel, plafonné, gigue de 50%"""
+    delay = min(JOB_RETRY_DELAY * 2 ** (attempts - 1), JOB_RETRY_MAX_DELAY)
+    return delay * (0.5 + random.random() / 2)
+
+class QueueWorker:
+    """Réclamation, exécution et acquittement des travaux d'une file (un thread + un pool)"""
+    def __init__(self, jobs: "JobQueue", queue: str, concurrency: int):
+        self.jobs = jobs
+        self.queue = queue
+        self.concurrency = concurrency
+        self.wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._done = {}  # shard -> ids à acquitter
+        self._failed = []  # (job, erreur)
+        self._released = {}  # shard -> ids réclamés non exécutés (arrêt)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"jobs-{queue}")
+        self._thread = threading.Thread(target=self._run, name=f"jobs-{queue}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self.wakeup.set()
+        self._thread.join(timeout=5)
+        # Travaux réclamés pas encore commencés: rendus à la file (voir _execute)
+        self._executor.shutdown(wait=True)
+        self.acknowledge()
+
+    def _run(self):
+        while not self.jobs._stop.is_set():
+            claimed = 0
+            try:
+                self.acknowledge()
+                claimed = self.fill()
+            except Exception as e:
+                print(f"Error in job queue '{self.queue}': {e}")
+            # File vide: attente d'un ajout (même process) ou du prochain sondage
+            with self._lock:
+                busy = self._in_flight or self._done or self._failed or self._released
+            self.wakeup.wait(JOB_ACK_INTERVAL if busy or claimed else JOB_POLL_INTERVAL)
+            self.wakeup.clear()
+
+    def fill(self) -> int:
+        """Réclame jusqu'à deux fois la concurrence: une réserve attend pendant que le pool travaille"""
+        claimed = 0
+        for shard in shard_router.shards():
+            with self._lock:
+                free = min(2 * self.concurrency - self._in_flight, JOB_BATCH_SIZE)
+            if free <= 0:
+                break
+            for job in self.jobs.claim(shard, self.queue, free):
+                with self._lock:
+                    self._in_flight += 1
+                self._executor.submit(self._execute, job)
+                claimed += 1
+        return claimed
+
+    def _execute(self, job: Job):
+        if self.jobs._stop.is_set():
+            with self._lock:
+                self._released.setdefault(job.shard, []).append(job.id)
+                self._in_flight -= 1
+            return
+        start = time.perf_counter()
+        error = None
+        try:
+            self.jobs.handlers[job.name].fn(job)
+        except Exception as e:
+            error = e
+        job_duration.labels(queue=self.queue).observe(time.perf_counter() - start)
+        with self._lock:
+            if error is None:
+                self._done.setdefault(job.shard, []).append(job.id)
+            else:
+                self._failed.append((job, error))
+            self._in_flight -= 1
+            # Pool à moitié vide: réclamer sans attendre la fin du sondage
+            if self._in_flight <= self.concurrency:
+                self.wakeup.set()
+
+    def acknowledge(self):
+        with self._lock:
+            done, failed, released = self._done, self._failed, self._released
+            self._done, self._failed, self._released = {}, [], {}
+        try:
+            while released:
+                shard, ids = next(iter(released.items()))
+                self.jobs.release(shard, ids)
+                del released[shard]
+            while done:
+                shard, ids = next(iter(done.items()))
+                self.jobs.complete(shard, ids)
+                del done[shard]
+                jobs_processed.labels(queue=self.queue, result="completed").inc(len(ids))
+            while failed:
+                job, error = failed[0]
+                result = self.jobs.fail(job, error)
+                failed.pop(0)
+                jobs_processed.labels(queue=self.queue, result=result).inc()
+        finally:
+            # Erreur de base (verrou, connexion): acquittements restants repris au prochain tour,
+            # sinon les travaux resteraient "running" jusqu'à l'expiration du bail puis rejoués
+            with self._lock:
+                for shard, ids in released.items():
+                    self._released.setdefault(shard, []).extend(ids)
+                for shard, ids in done.items():
+                    self._done.setdefault(shard, []).extend(ids)
+                self._failed[:0] = failed
+
+class JobQueue:
+    def __init__(self, queues: Optional[Dict[str, int]] = None):
+        self.queues = queues if queues is not None else parse_queues(JOB_QUEUES)
+        self.handlers = {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._workers = {}
+        self._stop = threading.Event()
+        self._maintenance = None
+
+    def handler(self, name: str, queue: str = "default", max_attempts: int = 5, priority: int = 100,
+                every: Optional[float] = None):
+        """Enregistre handler(job); every=secondes pour un travail périodique (tenant SYSTEM_TENANT)"""
+        def register(fn):
+            self.handlers[name] = Handler(fn, queue, max_attempts, priority, every)
+            return fn
+        return register
+
+    # === AJOUT ===
+
+    def _row(self, tenant_id: str, name: str, payload, key, run_at, priority) -> dict:
+        handler = self.handlers[name]
+        now = datetime.utcnow()
+        return {
+            "tenant_id": tenant_id, "queue": handler.queue, "name": name,
+            "key": key, "payload": payload,
+            "priority": handler.priority if priority is None else priority,
+            "status": QUEUED, "run_at": run_at or now,
+            "attempts": 0, "max_attempts": handler.max_attempts,
+            "created_at": now, "updated_at": now,
+        }
+
+    def enqueue(self, db, tenant_id: str, name: str, payload: Optional[dict] = None, key: Optional[str] = None,
+                run_at: Optional[datetime] = None, priority: Optional[int] = None):
+        """Ajoute le travail dans la transaction de l'appelant (ignoré si la clé existe déjà)"""
+        row = self._row(tenant_id, name, payload, key, run_at, priority)
+        db.execute(
+            _insert(db)(BackgroundJob.__table__).on_conflict_do_nothing(index_elements=["tenant_id", "name", "key"]),
+            [row]
+        )
+        jobs_enqueued.labels(queue=row["queue"]).inc()
+        # Les workers de ce process n'attendent pas le prochain sondage
+        worker = self._workers.get(row["queue"])
+        if worker is not None:
+            event.listen(db, "after_commit", lambda session: worker.wakeup.set(), once=True)
+
+    def enqueue_now(self, tenant_id: str, name: str, payload: Optional[dict] = None, key: Optional[str] = None,
+                    run_at: Optional[datetime] = None, priority: Optional[int] = None):
+        """Ajout hors requête (threads de fond), dans sa propre transaction
+
+        Lève TenantMoving si le tenant est gelé: le travail serait perdu sur l'ancien shard.
+        """
+        db = shard_router.sessionmaker(shard_router.writable_shard(tenant_id))()
+        try:
+            self.enqueue(db, tenant_id, name, payload, key, run_at, priority)
+            db.commit()
+        finally:
+            db.close()
+
+    # === RÉCLAMATION ET ACQUITTEMENT ===
+
+    def claim(self, shard: str, queue: str, limit: int):
+        names = [name for name, handler in self.handlers.items() if handler.queue == queue]
+        now = datetime.utcnow()
+        conditions = [
+            BackgroundJob.queue == queue,
+            BackgroundJob.status == QUEUED,
+            BackgroundJob.run_at <= now,
+            BackgroundJob.name.in_(names)
+        ]
+        frozen = shard_router.frozen_tenants()
+        if frozen:
+            conditions.append(BackgroundJob.tenant_id.notin_(frozen))
+        due = select(BackgroundJob.id).where(*conditions).order_by(BackgroundJob.priority, BackgroundJob.run_at).limit(limit).with_for_update(skip_locked=True)
+
+        db = shard_router.sessionmaker(shard)()
+        try:
+            rows = db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id.in_(due.scalar_subquery()))
+                .values(
+                    status=RUNNING,
+                    attempts=BackgroundJob.attempts + 1,
+                    locked_by=self.worker_id,
+                    locked_until=now + timedelta(seconds=JOB_LEASE),
+                    updated_at=now
+                )
+                .returning(
+                    BackgroundJob.id, BackgroundJob.tenant_id, BackgroundJob.name, BackgroundJob.key,
+                    BackgroundJob.payload, BackgroundJob.attempts, BackgroundJob.max_attempts
+                )
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+        finally:
+            db.close()
+        return [Job(row[0], shard, *row[1:]) for row in rows]
+
+    def complete(self, shard: str, ids):
+        now = datetime.utcnow()
+        db = shard_router.sessionmaker(shard)()
+        try:
+            db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id.in_(ids), BackgroundJob.locked_by == self.worker_id)
+                .values(status=DONE, finished_at=now, locked_until=None, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, shard: str, ids):
+        """Travaux réclamés mais non exécutés: de nouveau disponibles, tentative non comptée"""
+        db = shard_router.sessionmaker(shard)()
+        try:
+            db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id.in_(ids), BackgroundJob.locked_by == self.worker_id)
+                .values(status=QUEUED, attempts=BackgroundJob.attempts - 1, locked_by=None, locked_until=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def fail(self, job: Job, error: Exception) -> str:
+        print(f"Job {job.name} #{job.id} failed (attempt {job.attempts}/{job.max_attempts}): {error}")
+        now = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            result, values = "failed", {"status": FAILED, "finished_at": now}
+        else:
+            result, values = "retried", {"status": QUEUED, "run_at": now + timedelta(seconds=retry_delay(job.attempts))}
+        db = shard_router.sessionmaker(job.shard)()
+        try:
+            db.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job.id, BackgroundJob.locked_by == self.worker_id)
+                .values(locked_by=None, locked_until=None, last_error=str(error)[:1000], updated_at=now, **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        return result
+
+    # === MAINTENANCE ===
+
+    def maintain(self):
+        """Baux expirés, travaux périodiques, profondeur et âge des files"""
+        now = datetime.utcnow()
+        depth, oldest = {}, {}
+        for shard in shard_router.shards():
+            db = shard_router.sessionmaker(shard)()
+            try:
+                expired = (BackgroundJob.status == RUNNING, BackgroundJob.locked_until < now)
+                # Process tué pendant l'exécution: tentative comptée à la réclamation
+                db.execute(
+                    update(BackgroundJob)
+                    .where(*expired, BackgroundJob.attempts >= BackgroundJob.max_attempts)
+                    .values(status=FAILED, finished_at=now, locked_by=None, locked_until=None,
+                            last_error="lease expired")
+                    .execution_options(synchronize_session=False)
+                )
+                db.execute(
+                    update(BackgroundJob)
+                    .where(*expired)
+                    .values(status=QUEUED, run_at=now, locked_by=None, locked_until=None)
+                    .execution_options(synchronize_session=False)
+                )
+                for name, handler in self.handlers.items():
+                    if handler.every:
+                        slot = int(time.time() // handler.every)
+                        self.enqueue(db, SYSTEM_TENANT, name, key=str(slot),
+                                     run_at=datetime.utcfromtimestamp(slot * handler.every))
+                db.commit()
+
+                for queue, count, first in db.execute(
+                    select(BackgroundJob.queue, func.count(), func.min(BackgroundJob.run_at))
+                    .where(BackgroundJob.status == QUEUED, BackgroundJob.run_at <= now)
+                    .group_by(BackgroundJob.queue)
+                ).all():
+                    depth[queue] = depth.get(queue, 0) + count
+                    oldest[queue] = min(oldest.get(queue, first), first)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        for queue in set(self.queues) | {handler.queue for handler in self.handlers.values()}:
+            jobs_queue_depth.labels(queue=queue).set(depth.get(queue, 0))
+            age = (now - oldest[queue]).total_seconds() if queue in oldest else 0
+            jobs_oldest_age.labels(queue=queue).set(max(age, 0))
+
+    def _maintain_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"Error in job queue maintenance: {e}")
+            self._stop.wait(JOB_MAINTENANCE_INTERVAL)
+
+    # === CYCLE DE VIE ===
+
+    def start(self):
+        if self._maintenance is not None:
+            return
+        self._stop.clear()
+        for queue in sorted({handler.queue for handler in self.handlers.values()}):
+            worker = QueueWorker(self, queue, self.queues.get(queue, JOB_DEFAULT_CONCURRENCY))
+            self._workers[queue] = worker
+            worker.start()
+        self._maintenance = threading.Thread(target=self._maintain_loop, name="jobs-maintenance", daemon=True)
+        self._maintenance.start()
+
+    def close(self):
+        """Arrêt: travaux en cours terminés et acquittés, travaux réclamés non commencés repris au bail"""
+        self._stop.set()
+        for worker in self._workers.values():
+            worker.close()
+        self._workers = {}
+        if self._maintenance is not None:
+            self._maintenance.join(timeout=5)
+            self._maintenance = None
+
+# Instance globale (une par process)
+job_queue = JobQueue()
+
+@job_queue.handler("jobs.prune", every=3600)
+def prune_jobs(job: Job):
+    """Purge des travaux terminés au-delà de la rétention (leurs clés d'idempotence expirent)"""
+    before = datetime.utcnow() - timedelta(hours=JOB_RETENTION_HOURS)
+    db = shard_router.sessionmaker(job.shard)()
+    try:
+        db.execute(delete(BackgroundJob).where(BackgroundJob.status == DONE, BackgroundJob.finished_at < before))
+        db.commit()
+    finally:
+        db.close()
@@ -1,6 +1,7 @@
 # backend/app/core/metrics.py
-from prometheus_client import Counter, Histogram, Gauge, generate_latest
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, generate_latest, multiprocess
 from fastapi import Response, Request
+import os
 import time
 
 # Métriques personnalisées WorkOS
@@ -19,12 +20,14 @@ request_duration = Histogram(
 active_users = Gauge(
     'workos_active_users',
     'Active users per tenant',
-    ['tenant']
+    ['tenant'],
+    multiprocess_mode='livemax'
 )
 
 db_connections = Gauge(
     'workos_db_connections_active',
-    'Active database connections'
+    'Active database connections',
+    multiprocess_mode='livesum'
 )
 
 # Middleware pour tracker les métriques
@@ -57,6 +60,11 @@ async def metrics_middleware(request: Request, call_next):
 
 # Endpoint pour Prometheus
 async def metrics_endpoint(request: Request = None):
+    # Plusieurs workers (app.server): agréger les fichiers de tous les processus
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type="text/plain")
     return Response(generate_latest(), media_type="text/plain")
 
 # Fonction helper pour mettre à jour les métriques utilisateurs actifs
@@ -1,5 +1,5 @@
 # backend/app/core/models.py
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Index, UniqueConstraint, text
 from datetime import datetime
 from .database import Base
 
@@ -9,4 +9,43 @@ class BaseModel(Base):
     id = Column(Integer, primary_key=True, index=True)
     tenant_id = Column(String(50), index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TenantShard(Base):
+    """Annuaire tenant -> shard (stocké sur le shard par défaut)"""
+    __tablename__ = "tenant_shards"
+    
+    tenant_id = Column(String(50), primary_key=True)
+    shard = Column(String(50), nullable=False)
+    read_only = Column(Boolean, default=False, nullable=False)  # Gel des écritures pendant un déplacement
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BackgroundJob(BaseModel):
+    """Travail en arrière-plan (app/core/jobs.py), sur le shard de son tenant"""
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # Réclamation: travaux en attente d'une file par priorité puis échéance (index partiel)
+        Index(
+            "ix_background_jobs_claim", "queue", "priority", "run_at",
+            postgresql_where=text("status = 'queued'"), sqlite_where=text("status = 'queued'")
+        ),
+        # Baux expirés (running) et purge des travaux terminés (done)
+        Index("ix_background_jobs_status_locked", "status", "locked_until"),
+        # Ajout idempotent: une seule ligne par clé (les clés NULL ne sont pas comparées)
+        UniqueConstraint("tenant_id", "name", "key", name="uq_background_jobs_key"),
+    )
+    
+    queue = Column(String(50), nullable=False)
+    name = Column(String(100), nullable=False)  # Handler enregistré
+    key = Column(String(200))  # Clé d'idempotence
+    payload = Column(JSON)
+    priority = Column(Integer, nullable=False, default=100)  # Plus petit = plus urgent
+    
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    run_at = Column(DateTime, nullable=False)  # Pas avant (travaux programmés, reprises)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    locked_by = Column(String(100))  # Process qui exécute le travail
+    locked_until = Column(DateTime)  # Fin du bail: au-delà le travail est remis en file
+    last_error = Column(String(1000))
+    finished_at = Column(DateTime)
@@ -1,7 +1,9 @@
+import io
 import os
 import uuid
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import BinaryIO
 import mimetypes
 
 class StorageBackend(ABC):
@@ -10,6 +12,14 @@ class StorageBackend(ABC):
         """Retourne (storage_path, public_url)"""
         pass
     
+    @abstractmethod
+    def read_file(self, storage_path: str) -> bytes:
+        pass
+    
+    def open_file(self, storage_path: str) -> BinaryIO:
+        """Lecture en flux (fichier binaire à fermer); par défaut le contenu est chargé en mémoire"""
+        return io.BytesIO(self.read_file(storage_path))
+    
     @abstractmethod
     def delete_file(self, storage_path: str) -> bool:
         pass
@@ -41,6 +51,13 @@ class LocalStorage(StorageBackend):
         
         return storage_path, f"file://{file_path}"
     
+    def read_file(self, storage_path: str) -> bytes:
+        with open(self.upload_dir / storage_path, "rb") as f:
+            return f.read()
+    
+    def open_file(self, storage_path: str) -> BinaryIO:
+        return open(self.upload_dir / storage_path, "rb")
+    
     def delete_file(self, storage_path: str) -> bool:
         try:
             file_path = self.upload_dir / storage_path
@@ -0,0 +1,168 @@
+# backend/app/core/tenant.py
+# Routage tenant -> shard: chaque shard a son propre engine (et donc son pool)
+#
+# Configuration:
+#   TENANT_SHARDS="shard1=postgresql://...;shard2=postgresql://..."
+#   TENANT_SHARD_MAP="bigcorp=shard1,acme=shard2"
+# Le shard "default" est toujours DATABASE_URL. La table tenant_shards (sur le
+# shard par défaut) a priorité sur TENANT_SHARD_MAP et sert aux déplacements en ligne.
+import os
+import time
+import threading
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .database import get_engine, get_sessionmaker, normalize_database_url, engine_options
+from .models import TenantShard
+
+DEFAULT_SHARD = "default"
+SHARD_MAP_TTL = int(os.getenv("TENANT_SHARD_MAP_TTL", "30"))
+
+# Méthodes autorisées pendant le gel d'un tenant en cours de déplacement
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class TenantMoving(Exception):
+    """Écriture hors requête (pool, thread, travail) sur un tenant gelé par un déplacement"""
+
+def parse_shard_urls(value: str) -> Dict[str, str]:
+    shards = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(";"))):
+        name, url = item.split("=", 1)
+        shards[name.strip()] = normalize_database_url(url.strip())
+    return shards
+
+def parse_tenant_map(value: str) -> Dict[str, str]:
+    tenants = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        tenant_id, shard = item.split("=", 1)
+        tenants[tenant_id.strip()] = shard.strip()
+    return tenants
+
+class ShardRouter:
+    def __init__(self, shard_urls: Dict[str, str], tenant_map: Dict[str, str]):
+        self._urls = dict(shard_urls)
+        self._engines = {}  # Créés au premier usage, shard par défaut compris
+        self._sessions = {}
+        self._static_map = dict(tenant_map)
+        self._directory = {}  # tenant_id -> (shard, read_only)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        # Distinct du verrou de l'annuaire, qui crée au besoin l'engine du shard par défaut
+        self._engine_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            parse_shard_urls(os.getenv("TENANT_SHARDS", "")),
+            parse_tenant_map(os.getenv("TENANT_SHARD_MAP", ""))
+        )
+
+    def shards(self):
+        return [DEFAULT_SHARD] + [name for name in self._urls if name != DEFAULT_SHARD]
+
+    def engine(self, shard: str):
+        if shard not in self._engines:
+            with self._engine_lock:
+                if shard not in self._engines:
+                    if shard == DEFAULT_SHARD:
+                        self._sessions[shard] = get_sessionmaker()
+                        self._engines[shard] = get_engine()
+                    elif shard not in self._urls:
+                        raise KeyError(f"Unknown shard: {shard}")
+                    else:
+                        shard_engine = create_engine(self._urls[shard], **engine_options(pool_pre_ping=True))
+                        self._sessions[shard] = sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+                        self._engines[shard] = shard_engine
+        return self._engines[shard]
+
+    def sessionmaker(self, shard: str):
+        self.engine(shard)
+        return self._sessions[shard]
+
+    def assign(self, tenant_id: str, shard: str):
+        """Affectation statique (hors annuaire) d'un tenant à un shard"""
+        self._static_map[tenant_id] = shard
+
+    def invalidate(self):
+        """Force le rechargement de l'annuaire au prochain appel"""
+        self._loaded_at = 0.0
+
+    def _refresh_directory(self):
+        if time.monotonic() - self._loaded_at < SHARD_MAP_TTL:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at < SHARD_MAP_TTL:
+                return
+            db = self.sessionmaker(DEFAULT_SHARD)()
+            try:
+                rows = db.query(TenantShard).all()
+                self._directory = {row.tenant_id: (row.shard, row.read_only) for row in rows}
+            except Exception as e:
+                # Annuaire indisponible: garder la dernière version connue
+                print(f"Error loading tenant shard directory: {e}")
+                db.rollback()
+            finally:
+                db.close()
+            self._loaded_at = time.monotonic()
+
+    def resolve(self, tenant_id: str) -> Tuple[str, bool]:
+        """Retourne (shard, read_only) pour un tenant"""
+        self._refresh_directory()
+        if tenant_id in self._directory:
+            return self._directory[tenant_id]
+        return self._static_map.get(tenant_id, DEFAULT_SHARD), False
+
+    def known(self, tenant_id: str) -> bool:
+        """Tenant affecté explicitement à un shard (annuaire ou TENANT_SHARD_MAP)
+
+        Sans rechargement de l'annuaire: utilisable depuis la boucle d'événements.
+        """
+        return tenant_id in self._directory or tenant_id in self._static_map
+
+    def session_for(self, tenant_id: str):
+        shard, _ = self.resolve(tenant_id)
+        return self.sessionmaker(shard)()
+
+    def writable_shard(self, tenant_id: str, timeout: float = 0) -> str:
+        """Shard où écrire hors requête HTTP, à relire avant chaque écriture d'un traitement long
+
+        Un tenant gelé est en cours de copie: une écriture sur l'ancien shard serait perdue
+        après le rattrapage final. Attend la fin du gel au plus timeout secondes, puis
+        lève TenantMoving.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            shard, read_only = self.resolve(tenant_id)
+            if not read_only:
+                return shard
+            if time.monotonic() >= deadline:
+                raise TenantMoving(tenant_id)
+            time.sleep(1)
+
+    def frozen_tenants(self) -> List[str]:
+        """Tenants gelés: à exclure des traitements ensemblistes qui écrivent sur un shard"""
+        self._refresh_directory()
+        return [tenant_id for tenant_id, (_, read_only) in self._directory.items() if read_only]
+
+# Instance globale
+shard_router = ShardRouter.from_env()
+
+def get_tenant_db(tenant_id: str, request: Request):
+    """Session liée au shard du tenant de la route (remplace get_db dans les routes /api/{tenant_id})"""
+    shard, read_only = shard_router.resolve(tenant_id)
+
+    if read_only and request.method not in READ_ONLY_METHODS:
+        raise HTTPException(
+            status_code=503,
+            detail="Tenant is being migrated, retry shortly",
+            headers={"Retry-After": "5"}
+        )
+
+    db = shard_router.sessionmaker(shard)()
+    try:
+        yield db
+    finally:
+        db.close()
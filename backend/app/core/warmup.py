@@ -0,0 +1,121 @@
+# backend/app/core/warmup.py
+# Préchauffage au démarrage: pools de connexions, requêtes chaudes, schémas
+#
+# Exécuté par le lifespan de l'application avant que /ready ne réponde 200, pour
+# que la première vraie requête d'une instance fraîchement lancée ne paie ni les
+# connexions TCP/TLS, ni la compilation SQL, ni la configuration des mappers.
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+from prometheus_client import Gauge
+from sqlalchemy.orm import configure_mappers
+
+from .tenant import shard_router
+
+WARMUP_ENABLED = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+# Connexions ouvertes par shard (plafonnées à la taille du pool)
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", os.getenv("DB_POOL_SIZE", "5")))
+
+startup_phase_seconds = Gauge(
+    'workos_startup_phase_seconds',
+    'Duration of each startup warmup phase',
+    ['phase'],
+    multiprocess_mode='max'
+)
+
+def warmup_tenant(shard: str) -> str:
+    return f"__warmup_{shard}__"
+
+def prewarm_pools(connections: int = WARMUP_CONNECTIONS) -> int:
+    """Ouvre les connexions de chaque pool en même temps pour qu'elles y restent"""
+    opened = 0
+    for shard in shard_router.shards():
+        engine = shard_router.engine(shard)
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        held = []
+        try:
+            for _ in range(min(connections, size)):
+                connection = engine.connect()
+                connection.exec_driver_sql("SELECT 1")
+                held.append(connection)
+        finally:
+            for connection in held:
+                connection.close()
+        opened += len(held)
+    return opened
+
+async def _asgi_get(app, path: str) -> int:
+    """GET interne à travers toute la pile ASGI (middlewares, dépendances, sérialisation)"""
+    path, _, query = path.partition("?")
+    response = {}
+    sent = [False]
+    done = asyncio.Event()
+
+    async def receive():
+        # Corps vide, puis déconnexion une fois la réponse envoyée
+        if not sent[0]:
+            sent[0] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await app({
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"warmup")],
+        "client": ("127.0.0.1", 0),
+        "server": ("warmup", 80),
+    }, receive, send)
+    return response.get("status", 500)
+
+async def compile_hot_queries(app, paths: List[str]) -> Dict[str, int]:
+    """Rejoue les routes chaudes sur un tenant vide de chaque shard.
+
+    Le cache de compilation SQLAlchemy étant propre à chaque engine, chaque shard
+    reçoit son propre tenant de préchauffage.
+    """
+    statuses = {}
+    for shard in shard_router.shards():
+        tenant_id = warmup_tenant(shard)
+        shard_router.assign(tenant_id, shard)
+        for path in paths:
+            statuses[f"{shard} {path}"] = await _asgi_get(app, f"/api/{tenant_id}{path}")
+    return statuses
+
+def build_schemas(app):
+    """Mappers ORM et schéma OpenAPI (les validateurs pydantic sont construits à l'import)"""
+    configure_mappers()
+    app.openapi()
+
+async def warmup(app, paths: List[str]):
+    phases = [
+        ("schemas", lambda: build_schemas(app)),
+        ("pools", prewarm_pools),
+    ]
+    for phase, step in phases:
+        start = time.perf_counter()
+        step()
+        startup_phase_seconds.labels(phase=phase).set(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    statuses = await compile_hot_queries(app, paths)
+    startup_phase_seconds.labels(phase="hot_queries").set(time.perf_counter() - start)
+
+    failed = {path: status for path, status in statuses.items() if status >= 500}
+    if failed:
+        print(f"Warmup requests failed: {failed}")
@@ -1,51 +1,135 @@
+from contextlib import asynccontextmanager
+import importlib
+import importlib.util
+import os
+import sys
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import os
+from fastapi.responses import JSONResponse
 
 from app.core.metrics import metrics_middleware, metrics_endpoint
-from app.modules.contacts.routes import router as contacts_router
-from app.modules.tasks.routes import router as tasks_router
-from app.modules.messages.routes import router as messages_router
-from app.modules.documents.routes import router as documents_router
-from app.modules.calendar.routes import router as calendar_router
-from app.modules.projects.routes import router as projects_router  # <-- Cette ligne
-
-app = FastAPI(title="WorkOS MVP")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Middleware de métriques
-app.middleware("http")(metrics_middleware)
-
-# Inclure les routes
-app.include_router(contacts_router)
-app.include_router(tasks_router)
-app.include_router(messages_router)
-app.include_router(documents_router)
-app.include_router(calendar_router)
-app.include_router(projects_router)  # <-- Et cette ligne
-
-# Route pour Prometheus metrics
-app.add_route("/metrics", metrics_endpoint, methods=["GET"])
-
-@app.get("/")
-async def root():
-    return {"message": "WorkOS API", "version": "0.1.0"}
-
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "server": os.getenv("SERVER_NAME", "local")
-    }
+from app.core.admission import admission_middleware
+from app.core.tenant import shard_router
+from app.core.warmup import warmup, WARMUP_ENABLED
+
+# Modules de l'application et routes GET rejouées au préchauffage (/api/{tenant_id}...)
+MODULES = {
+    "contacts": ["/contacts"],
+    "tasks": ["/tasks"],
+    "messages": ["/messages?channel=general", "/messages/channels", "/messages/unread?contact_id=0"],
+    "documents": ["/folders", "/documents", "/documents/shared-with-me?contact_id=0"],
+    "calendar": ["/events", "/calendar?start_date=2024-01-01T00:00:00&end_date=2024-01-08T00:00:00"],
+    "projects": ["/projects", "/projects/activity"],
+    "dashboard": ["/dashboard"],
+}
+
+# Services de fond: (module, instance, drapeau d'activation), démarrés et arrêtés dans
+# cet ordre. Pris en charge seulement si les routes d'un module activé les ont importés:
+# une instance allégée ne charge ni ces services ni leurs dépendances.
+BACKGROUND_SERVICES = [
+    ("app.core.due_dates", "due_tracker", "DUE_TRACKER_ENABLED"),
+    ("app.core.jobs", "job_queue", "JOBS_ENABLED"),
+    ("app.modules.documents.previews", "preview_pipeline", None),  # Démarré au premier rendu
+    ("app.modules.documents.extraction", "text_extraction", None),  # EXTRACTION_ENABLED vérifié par start()
+]
+
+def loaded_services():
+    """(instance, à démarrer) des services importés par les modules activés"""
+    services = []
+    for module_name, instance, flag in BACKGROUND_SERVICES:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            service = getattr(module, instance)
+            enabled = hasattr(service, "start") and (flag is None or getattr(module, flag))
+            services.append((service, enabled))
+    return services
+
+def enabled_modules():
+    """ENABLED_MODULES="contacts,messages" pour une instance allégée (tous par défaut)"""
+    value = os.getenv("ENABLED_MODULES", "")
+    names = [name.strip() for name in value.split(",") if name.strip()] or list(MODULES)
+    unknown = set(names) - set(MODULES)
+    if unknown:
+        raise ValueError(f"Unknown modules in ENABLED_MODULES: {', '.join(sorted(unknown))}")
+    return names
+
+def create_app(modules=None) -> FastAPI:
+    modules = modules or enabled_modules()
+
+    # Tous les modèles sont chargés (relations croisées), seules les routes sont optionnelles
+    for name in MODULES:
+        if importlib.util.find_spec(f"app.modules.{name}.models"):
+            importlib.import_module(f"app.modules.{name}.models")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        services = loaded_services()
+        if WARMUP_ENABLED:
+            try:
+                await warmup(app, [path for name in modules for path in MODULES[name]])
+            except Exception as e:
+                # Une base indisponible ne doit pas empêcher l'instance de démarrer
+                print(f"Startup warmup failed: {e}")
+        for service, enabled in services:
+            if enabled:
+                service.start()
+        app.state.ready = True
+        yield
+        app.state.ready = False
+        for service, _ in services:
+            service.close()
+        for shard in shard_router.shards():
+            shard_router.engine(shard).dispose()
+
+    app = FastAPI(title="WorkOS MVP", lifespan=lifespan)
+    app.state.ready = False
+    app.state.modules = modules
+
+    # Contrôle d'admission par tenant (déclaré en premier: s'exécute sous CORS et métriques)
+    app.middleware("http")(admission_middleware)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Middleware de métriques
+    app.middleware("http")(metrics_middleware)
+
+    # Inclure les routes des modules activés
+    for name in modules:
+        app.include_router(importlib.import_module(f"app.modules.{name}.routes").router)
+
+    # Route pour Prometheus metrics
+    app.add_route("/metrics", metrics_endpoint, methods=["GET"])
+
+    @app.get("/")
+    async def root():
+        return {"message": "WorkOS API", "version": "0.1.0"}
+
+    @app.get("/health")
+    async def health_check():
+        return {
+            "status": "healthy",
+            "server": os.getenv("SERVER_NAME", "local")
+        }
+
+    @app.get("/ready")
+    async def readiness_check():
+        # Readiness: 200 seulement une fois le préchauffage terminé
+        if not app.state.ready:
+            return JSONResponse(status_code=503, content={"status": "starting"})
+        return {"status": "ready", "modules": app.state.modules}
+
+    return app
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,131 @@
+# app/modules/calendar/ics.py
+# Flux iCalendar (RFC 5545) générés en streaming
+#
+# Les lignes d'événements arrivent d'un curseur serveur (yield_per) et sont
+# sérialisées au fil de l'eau: la mémoire reste constante quelle que soit la
+# taille du calendrier. La récurrence est émise telle quelle (RRULE), les
+# occurrences sont calculées par le client. L'ETag (fort) est dérivé du nombre
+# de lignes et des derniers updated_at: un abonnement inchangé coûte une seule
+# requête d'agrégat et une réponse 304.
+import hashlib
+from datetime import datetime, time, timedelta
+from typing import Iterable, Iterator
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.modules.contacts.models import Contact
+from . import models
+from .schemas import RecurrenceTypeEnum
+
+FEED_VERSION = 2  # À incrémenter si le format change (invalide les ETag existants)
+FEED_BATCH_SIZE = 500
+PRODID = "-//WorkOS//WorkOS Calendar//FR"
+
+RRULE_FREQ = {
+    RecurrenceTypeEnum.DAILY: "DAILY",
+    RecurrenceTypeEnum.WEEKLY: "WEEKLY",
+    RecurrenceTypeEnum.MONTHLY: "MONTHLY",
+    RecurrenceTypeEnum.YEARLY: "YEARLY",
+}
+
+def escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold(line: str) -> bytes:
+    """Lignes de 75 octets maximum, continuation par CRLF + espace (sans couper un caractère UTF-8)"""
+    data = line.encode()
+    if len(data) <= 75:
+        return data + b"\r\n"
+    chunks, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        chunks.append(data[start:end])
+        start, limit = end, 74  # L'espace de continuation compte
+    return b"\r\n ".join(chunks) + b"\r\n"
+
+def format_datetime(value: datetime) -> str:
+    # Dates stockées en UTC (naïves)
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+def format_date(value: datetime) -> str:
+    return value.strftime("%Y%m%d")
+
+def all_day_end(start: datetime, end: datetime) -> datetime:
+    """DTEND d'un événement sur la journée: exclusif, donc le lendemain du dernier jour
+
+    Une fin à minuit pile après le début est déjà exclusive et conservée.
+    """
+    if end.time() == time.min and end.date() > start.date():
+        return end
+    return max(end, start) + timedelta(days=1)
+
+def feed_query(*criteria):
+    """Colonnes nécessaires au flux, organisateur compris (une seule requête, sans chargement ORM)"""
+    Event = models.Event
+    return select(
+        Event.id, Event.tenant_id, Event.title, Event.description, Event.location,
+        Event.start_time, Event.end_time, Event.is_all_day, Event.event_type,
+        Event.recurrence_type, Event.recurrence_end, Event.created_at, Event.updated_at,
+        Contact.name.label("organizer_name"), Contact.email.label("organizer_email")
+    ).join(Contact, Contact.id == Event.created_by).where(*criteria).order_by(Event.start_time, Event.id)
+
+def vevent(row) -> Iterator[bytes]:
+    yield b"BEGIN:VEVENT\r\n"
+    yield fold(f"UID:event-{row.id}@{row.tenant_id}.workos")
+    yield fold(f"DTSTAMP:{format_datetime(row.updated_at or row.created_at)}")
+    if row.is_all_day:
+        yield fold(f"DTSTART;VALUE=DATE:{format_date(row.start_time)}")
+        yield fold(f"DTEND;VALUE=DATE:{format_date(all_day_end(row.start_time, row.end_time))}")
+    else:
+        yield fold(f"DTSTART:{format_datetime(row.start_time)}")
+        yield fold(f"DTEND:{format_datetime(row.end_time)}")
+    frequency = RRULE_FREQ.get(row.recurrence_type)
+    if frequency:
+        rule = f"RRULE:FREQ={frequency}"
+        if row.recurrence_end:
+            # UNTIL du même type de valeur que DTSTART (RFC 5545 §3.3.10)
+            until = format_date if row.is_all_day else format_datetime
+            rule += f";UNTIL={until(row.recurrence_end)}"
+        yield fold(rule)
+    yield fold(f"SUMMARY:{escape(row.title)}")
+    if row.description:
+        yield fold(f"DESCRIPTION:{escape(row.description)}")
+    if row.location:
+        yield fold(f"LOCATION:{escape(row.location)}")
+    if row.event_type:
+        yield fold(f"CATEGORIES:{escape(row.event_type.value)}")
+    # Valeur de paramètre: entre guillemets (virgules, points-virgules), sans guillemet interne
+    organizer = row.organizer_name.replace('"', "'")
+    yield fold(f'ORGANIZER;CN="{organizer}":mailto:{row.organizer_email}')
+    if row.updated_at:
+        yield fold(f"LAST-MODIFIED:{format_datetime(row.updated_at)}")
+    yield b"END:VEVENT\r\n"
+
+def render(name: str, rows: Iterable) -> Iterator[bytes]:
+    """Calendrier complet, un morceau par événement"""
+    yield (b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n" + fold(f"PRODID:{PRODID}")
+           + b"CALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n" + fold(f"X-WR-CALNAME:{escape(name)}"))
+    for row in rows:
+        yield b"".join(vevent(row))
+    yield b"END:VCALENDAR\r\n"
+
+def compute_etag(db, scope: str, aggregate) -> str:
+    """aggregate: requête d'une ligne (nombre, derniers updated_at...) qui identifie le contenu du flux"""
+    values = [scope, FEED_VERSION, *db.execute(aggregate).one()]
+    digest = hashlib.sha256(repr(values).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+def feed_response(request: Request, db, name: str, filename: str, etag: str, query) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # Curseur côté serveur (stream_results) parcouru pendant l'envoi de la réponse
+    rows = db.execute(query.execution_options(yield_per=FEED_BATCH_SIZE))
+    headers["Content-Disposition"] = f'inline; filename="{filename}.ics"'
+    return StreamingResponse(render(name, rows), media_type="text/calendar", headers=headers)
@@ -1,5 +1,5 @@
 # app/modules/calendar/models.py
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from app.core.models import BaseModel
 from .schemas import EventTypeEnum, RecurrenceTypeEnum
@@ -35,6 +35,10 @@ class Event(BaseModel):
 
 class EventParticipant(BaseModel):
     __tablename__ = "event_participants"
+    __table_args__ = (
+        # Détection des conflits: engagements d'un ensemble de contacts
+        Index("ix_event_participants_tenant_contact_status", "tenant_id", "contact_id", "status", "event_id"),
+    )
     
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
     contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
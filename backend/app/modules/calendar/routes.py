@@ -1,16 +1,145 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, select
 from typing import List, Optional
 from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from itertools import count
+import os
 
-from app.core.database import get_db
+from app.core.tenant import get_tenant_db
+from app.core.coalesce import single_flight
+from app.core.export import ExportFormat, export_response, table_columns
 from app.modules.contacts.models import Contact
+from app.modules.contacts.autocomplete import record_interaction
 from app.modules.tasks.models import Task
-from . import models, schemas
+from . import ics, models, schemas
 
 router = APIRouter()
 
+# Mode par défaut de la vérification des doubles réservations (paramètre conflicts des routes)
+CONFLICT_CHECK_DEFAULT = schemas.ConflictModeEnum(os.getenv("CALENDAR_CONFLICT_CHECK", "ignore"))
+
+# Récurrences: pas fixe (jours, semaines) ou en mois (même jour du mois, sauté s'il
+# n'existe pas, comme une RRULE FREQ=MONTHLY/YEARLY du flux iCalendar)
+RECURRENCE_STEPS = {
+    schemas.RecurrenceTypeEnum.DAILY: timedelta(days=1),
+    schemas.RecurrenceTypeEnum.WEEKLY: timedelta(weeks=1),
+}
+RECURRENCE_MONTHS = {
+    schemas.RecurrenceTypeEnum.MONTHLY: 1,
+    schemas.RecurrenceTypeEnum.YEARLY: 12,
+}
+# Durée maximale d'une occurrence prise en compte pour écarter en SQL les récurrences terminées
+RECURRENCE_MAX_DURATION = timedelta(days=31)
+# Occurrences d'un événement récurrent vérifiées à la création/modification: celles qui
+# commencent dans cet horizon (jours) après la première
+CONFLICT_HORIZON = timedelta(days=int(os.getenv("CALENDAR_CONFLICT_HORIZON_DAYS", "365")))
+
+def _add_months(value: datetime, months: int) -> Optional[datetime]:
+    year, month = divmod(value.month - 1 + months, 12)
+    try:
+        return value.replace(year=value.year + year, month=month + 1)
+    except ValueError:
+        return None  # 31 d'un mois de 30 jours, 29 février
+
+def _occurrences(start_time: datetime, end_time: datetime, recurrence_type, recurrence_end: Optional[datetime],
+                 window_start: datetime, window_end: datetime):
+    """(début, fin) des occurrences d'un événement qui chevauchent [window_start, window_end)"""
+    duration = end_time - start_time
+    earliest = window_start - duration  # Une occurrence qui commence avant ne chevauche pas
+    if recurrence_type in RECURRENCE_STEPS:
+        step = RECURRENCE_STEPS[recurrence_type]
+        first = max(0, (earliest - start_time) // step)
+        starts = (start_time + n * step for n in count(first))
+    elif recurrence_type in RECURRENCE_MONTHS:
+        months = RECURRENCE_MONTHS[recurrence_type]
+        elapsed = (earliest.year - start_time.year) * 12 + earliest.month - start_time.month
+        first = max(0, elapsed // months - 1)
+        starts = filter(None, (_add_months(start_time, n * months) for n in count(first)))
+    else:
+        starts = iter([start_time])
+
+    for occurrence in starts:
+        if occurrence >= window_end or (recurrence_end and occurrence > recurrence_end):
+            return
+        if occurrence + duration > window_start:
+            yield occurrence, occurrence + duration
+
+def _slots(start_time: datetime, end_time: datetime, recurrence_type=None,
+           recurrence_end: Optional[datetime] = None) -> List[tuple]:
+    """Créneaux à vérifier pour un événement: ses occurrences dans CONFLICT_HORIZON"""
+    return list(_occurrences(
+        start_time, end_time, recurrence_type, recurrence_end, start_time, start_time + CONFLICT_HORIZON
+    )) or [(start_time, end_time)]
+
+def _find_conflicts(db: Session, tenant_id: str, contact_ids, slots: List[tuple],
+                    exclude_event_id: Optional[int] = None) -> List[schemas.EventConflict]:
+    """Chevauchements de tous les contacts en une requête (contact_ids: liste ou sous-requête)
+
+    slots: créneaux vérifiés (_slots), triés et de même durée. Les événements existants
+    de la période sont développés en occurrences, chacune comparée aux créneaux par
+    recherche dichotomique (conflit daté de l'occurrence existante).
+    """
+    start_time, end_time = slots[0][0], slots[-1][1]
+    slot_starts = [slot_start for slot_start, _ in slots]
+    slot_ends = [slot_end for _, slot_end in slots]
+    Event, Participant = models.Event, models.EventParticipant
+    recurring = and_(
+        Event.recurrence_type.isnot(None),
+        Event.recurrence_type != schemas.RecurrenceTypeEnum.NONE
+    )
+    query = db.query(
+        Participant.contact_id,
+        Event.id.label("event_id"),
+        Event.title,
+        Event.start_time,
+        Event.end_time,
+        Event.recurrence_type,
+        Event.recurrence_end
+    ).join(Event, Event.id == Participant.event_id).filter(
+        Participant.tenant_id == tenant_id,
+        Participant.contact_id.in_(contact_ids),
+        Participant.status == schemas.ParticipantStatusEnum.ACCEPTED.value,
+        Event.tenant_id == tenant_id,
+        Event.start_time < end_time,
+        or_(
+            Event.end_time > start_time,
+            and_(recurring, or_(
+                Event.recurrence_end.is_(None),
+                Event.recurrence_end > start_time - RECURRENCE_MAX_DURATION
+            ))
+        )
+    )
+    if exclude_event_id:
+        query = query.filter(Event.id != exclude_event_id)
+
+    conflicts = [
+        schemas.EventConflict(
+            contact_id=row.contact_id, event_id=row.event_id, title=row.title,
+            start_time=occurrence_start, end_time=occurrence_end
+        )
+        for row in query.all()
+        for occurrence_start, occurrence_end in _occurrences(
+            row.start_time, row.end_time, row.recurrence_type, row.recurrence_end, start_time, end_time
+        )
+        # Un créneau qui commence avant la fin de l'occurrence et finit après son début
+        if bisect_right(slot_ends, occurrence_start) < bisect_left(slot_starts, occurrence_end)
+    ]
+    return sorted(conflicts, key=lambda conflict: (conflict.start_time, conflict.contact_id))
+
+def _check_conflicts(db: Session, mode: schemas.ConflictModeEnum, tenant_id: str, contact_ids,
+                     slots: List[tuple], exclude_event_id: Optional[int] = None) -> List[schemas.EventConflict]:
+    if mode == schemas.ConflictModeEnum.IGNORE:
+        return []
+    conflicts = _find_conflicts(db, tenant_id, contact_ids, slots, exclude_event_id)
+    if conflicts and mode == schemas.ConflictModeEnum.REJECT:
+        raise HTTPException(status_code=409, detail={
+            "message": "Scheduling conflict",
+            "conflicts": [conflict.model_dump(mode="json") for conflict in conflicts]
+        })
+    return conflicts
+
 # === EVENTS ===
 
 @router.get("/api/{tenant_id}/events", response_model=List[schemas.EventResponse])
@@ -20,7 +149,7 @@ async def list_events(
     end_date: Optional[datetime] = Query(None),
     event_type: Optional[schemas.EventTypeEnum] = Query(None),
     contact_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     query = db.query(models.Event).filter_by(tenant_id=tenant_id).options(
         joinedload(models.Event.creator),
@@ -46,11 +175,12 @@ async def list_events(
     events = query.order_by(models.Event.start_time).all()
     return events
 
-@router.post("/api/{tenant_id}/events", response_model=schemas.EventResponse)
+@router.post("/api/{tenant_id}/events", response_model=schemas.EventWithConflicts)
 async def create_event(
     tenant_id: str,
     event: schemas.EventCreate,
-    db: Session = Depends(get_db)
+    conflicts: schemas.ConflictModeEnum = Query(CONFLICT_CHECK_DEFAULT),
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier que creator existe
     creator = db.query(Contact).filter_by(
@@ -75,6 +205,12 @@ async def create_event(
     event_data = event.dict()
     participant_ids = event_data.pop('participant_ids', [])
     
+    # Doubles réservations des participants et du créateur (avant toute écriture)
+    found = _check_conflicts(
+        db, conflicts, tenant_id, sorted(set(participant_ids) | {event.created_by}),
+        _slots(event.start_time, event.end_time, event.recurrence_type, event.recurrence_end)
+    )
+    
     db_event = models.Event(
         **event_data,
         tenant_id=tenant_id
@@ -111,6 +247,7 @@ async def create_event(
         )
         db.add(organizer)
     
+    record_interaction(db, tenant_id, [event.created_by, *participant_ids])
     db.commit()
     db.refresh(db_event)
     
@@ -120,13 +257,36 @@ async def create_event(
         joinedload(models.Event.participants).joinedload(models.EventParticipant.contact)
     ).filter_by(id=db_event.id).first()
     
-    return db_event
+    response = schemas.EventWithConflicts.model_validate(db_event, from_attributes=True)
+    response.conflicts = found
+    return response
+
+# Déclarée avant /events/{event_id}
+@router.get("/api/{tenant_id}/events/export")
+async def export_events(
+    tenant_id: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    event_type: Optional[schemas.EventTypeEnum] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    Event = models.Event
+    query = select(*table_columns(Event)).where(Event.tenant_id == tenant_id)
+    if start_date:
+        query = query.where(Event.end_time >= start_date)
+    if end_date:
+        query = query.where(Event.start_time <= end_date)
+    if event_type:
+        query = query.where(Event.event_type == event_type)
+    return export_response(db, query, "events", format, gzip)
 
 @router.get("/api/{tenant_id}/events/{event_id}", response_model=schemas.EventResponse)
 async def get_event(
     tenant_id: str,
     event_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     event = db.query(models.Event).options(
         joinedload(models.Event.creator),
@@ -141,12 +301,13 @@ async def get_event(
     
     return event
 
-@router.put("/api/{tenant_id}/events/{event_id}", response_model=schemas.EventResponse)
+@router.put("/api/{tenant_id}/events/{event_id}", response_model=schemas.EventWithConflicts)
 async def update_event(
     tenant_id: str,
     event_id: int,
     event_update: schemas.EventUpdate,
-    db: Session = Depends(get_db)
+    conflicts: schemas.ConflictModeEnum = Query(CONFLICT_CHECK_DEFAULT),
+    db: Session = Depends(get_tenant_db)
 ):
     event = db.query(models.Event).filter_by(
         id=event_id,
@@ -156,8 +317,28 @@ async def update_event(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    changes = event_update.dict(exclude_unset=True)
+    
+    # Horaire modifié: vérifier tous les participants qui n'ont pas décliné, sur chaque occurrence
+    found = []
+    if changes.keys() & {"start_time", "end_time"}:
+        attendees = select(models.EventParticipant.contact_id).where(
+            models.EventParticipant.event_id == event_id,
+            models.EventParticipant.status != schemas.ParticipantStatusEnum.DECLINED.value
+        )
+        found = _check_conflicts(
+            db, conflicts, tenant_id, attendees,
+            _slots(
+                changes.get("start_time") or event.start_time,
+                changes.get("end_time") or event.end_time,
+                event.recurrence_type,
+                event.recurrence_end
+            ),
+            exclude_event_id=event_id
+        )
+    
     # Mettre à jour les champs fournis
-    for field, value in event_update.dict(exclude_unset=True).items():
+    for field, value in changes.items():
         setattr(event, field, value)
     
     db.commit()
@@ -169,13 +350,15 @@ async def update_event(
         joinedload(models.Event.participants).joinedload(models.EventParticipant.contact)
     ).filter_by(id=event_id).first()
     
-    return event
+    response = schemas.EventWithConflicts.model_validate(event, from_attributes=True)
+    response.conflicts = found
+    return response
 
 @router.delete("/api/{tenant_id}/events/{event_id}")
 async def delete_event(
     tenant_id: str,
     event_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     event = db.query(models.Event).filter_by(
         id=event_id,
@@ -192,12 +375,13 @@ async def delete_event(
 
 # === PARTICIPANTS ===
 
-@router.post("/api/{tenant_id}/events/{event_id}/participants", response_model=schemas.ParticipantResponse)
+@router.post("/api/{tenant_id}/events/{event_id}/participants", response_model=schemas.ParticipantWithConflicts)
 async def add_participant(
     tenant_id: str,
     event_id: int,
     participant: schemas.ParticipantCreate,
-    db: Session = Depends(get_db)
+    conflicts: schemas.ConflictModeEnum = Query(CONFLICT_CHECK_DEFAULT),
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier que l'événement existe
     event = db.query(models.Event).filter_by(
@@ -227,6 +411,12 @@ async def add_participant(
     if existing:
         raise HTTPException(status_code=400, detail="Participant already exists")
     
+    found = _check_conflicts(
+        db, conflicts, tenant_id, [participant.contact_id],
+        _slots(event.start_time, event.end_time, event.recurrence_type, event.recurrence_end),
+        exclude_event_id=event_id
+    )
+    
     # Créer le participant
     db_participant = models.EventParticipant(
         event_id=event_id,
@@ -236,6 +426,7 @@ async def add_participant(
     )
     
     db.add(db_participant)
+    record_interaction(db, tenant_id, [participant.contact_id])
     db.commit()
     db.refresh(db_participant)
     
@@ -244,7 +435,9 @@ async def add_participant(
         joinedload(models.EventParticipant.contact)
     ).filter_by(id=db_participant.id).first()
     
-    return db_participant
+    response = schemas.ParticipantWithConflicts.model_validate(db_participant, from_attributes=True)
+    response.conflicts = found
+    return response
 
 @router.put("/api/{tenant_id}/events/{event_id}/participants/{participant_id}", response_model=schemas.ParticipantResponse)
 async def update_participant_status(
@@ -252,7 +445,7 @@ async def update_participant_status(
     event_id: int,
     participant_id: int,
     participant_update: schemas.ParticipantUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     participant = db.query(models.EventParticipant).filter_by(
         id=participant_id,
@@ -275,9 +468,15 @@ async def update_participant_status(
 async def get_calendar_view(
     tenant_id: str,
     start_date: datetime = Query(...),
-    end_date: datetime = Query(...),
-    db: Session = Depends(get_db)
+    end_date: datetime = Query(...)
 ):
+    # Même semaine ouverte par toute une équipe: une seule requête
+    return await single_flight.response(
+        "calendar_view", tenant_id, (start_date, end_date),
+        lambda db: _calendar_view(db, tenant_id, start_date, end_date)
+    )
+
+def _calendar_view(db: Session, tenant_id: str, start_date: datetime, end_date: datetime) -> bytes:
     events = db.query(models.Event).options(
         joinedload(models.Event.creator),
         joinedload(models.Event.participants).joinedload(models.EventParticipant.contact)
@@ -287,18 +486,50 @@ async def get_calendar_view(
         models.Event.end_time >= start_date
     ).order_by(models.Event.start_time).all()
     
-    return {
+    return schemas.CalendarView.model_validate({
         "start_date": start_date,
         "end_date": end_date,
         "events": events,
         "total_events": len(events)
-    }
+    }, from_attributes=True).model_dump_json().encode()
+
+# === FLUX ICALENDAR ===
+
+@router.get("/api/{tenant_id}/calendar/contacts/{contact_id}.ics")
+async def get_contact_feed(
+    tenant_id: str,
+    contact_id: int,
+    request: Request,
+    db: Session = Depends(get_tenant_db)
+):
+    """Abonnement .ics: événements du contact (organisateur ou invité), sauf ceux qu'il a déclinés"""
+    contact = db.query(Contact).filter_by(id=contact_id, tenant_id=tenant_id).first()
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    Participant = models.EventParticipant
+    criteria = (
+        Participant.tenant_id == tenant_id,
+        Participant.contact_id == contact_id,
+        Participant.status != schemas.ParticipantStatusEnum.DECLINED.value,
+    )
+    # Changement de statut d'une participation = updated_at de la participation
+    etag = ics.compute_etag(db, f"contact:{tenant_id}:{contact_id}", select(
+        func.count(models.Event.id), func.max(models.Event.updated_at), func.max(Participant.updated_at)
+    ).join(Participant, Participant.event_id == models.Event.id).where(*criteria))
+    
+    query = ics.feed_query(*criteria).join(Participant, Participant.event_id == models.Event.id)
+    return ics.feed_response(request, db, contact.name, f"contact-{contact_id}", etag, query)
 
 @router.get("/api/{tenant_id}/calendar/stats", response_model=schemas.EventStats)
 async def get_calendar_stats(
     tenant_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
+    return _calendar_stats(db, tenant_id)
+
+def _calendar_stats(db: Session, tenant_id: str) -> dict:
+    """Compteurs du calendrier (aussi utilisés par le dashboard)"""
     now = datetime.now()
     week_start = now - timedelta(days=now.weekday())
     month_start = now.replace(day=1)
@@ -60,6 +60,20 @@ class EventUpdate(BaseModel):
     event_type: Optional[EventTypeEnum] = None
     is_all_day: Optional[bool] = None
 
+class ConflictModeEnum(str, Enum):
+    IGNORE = "ignore"  # Aucune vérification
+    REPORT = "report"  # Écriture effectuée, conflits renvoyés dans la réponse
+    REJECT = "reject"  # 409 avec la liste des conflits, rien n'est écrit
+
+class EventConflict(BaseModel):
+    """Participant déjà engagé (statut accepted) sur un événement qui chevauche
+    (événement récurrent: dates de l'occurrence qui chevauche)"""
+    contact_id: int
+    event_id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+
 class ParticipantResponse(BaseModel):
     id: int
     event_id: int
@@ -72,6 +86,10 @@ class ParticipantResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ParticipantWithConflicts(ParticipantResponse):
+    """Réponse de l'ajout d'un participant (mode report: conflits du participant)"""
+    conflicts: List[EventConflict] = []
+
 class EventResponse(EventBase):
     id: int
     tenant_id: str
@@ -85,6 +103,10 @@ class EventResponse(EventBase):
     class Config:
         from_attributes = True
 
+class EventWithConflicts(EventResponse):
+    """Réponse de la création / modification d'un événement (mode report: conflits des participants)"""
+    conflicts: List[EventConflict] = []
+
 class ParticipantCreate(BaseModel):
     contact_id: int
     role: str = "attendee"
@@ -0,0 +1,369 @@
+# app/modules/contacts/autocomplete.py
+# Autocomplétion des contacts: index en mémoire par tenant (préfixes + trigrammes)
+#
+# Un tenant est chargé à sa première recherche (id, nom, email, entreprise, dernière
+# interaction) puis tenu à jour de façon incrémentale: les contacts dont updated_at
+# ou last_interaction_at a bougé depuis le dernier passage sont relus au plus une
+# fois par AUTOCOMPLETE_REFRESH_SECONDS (index (tenant_id, updated_at) et
+# (tenant_id, last_interaction_at)); les créations faites par ce process sont
+# appliquées à la recherche suivante. Chaque process a son propre index, sans état partagé.
+# Le chargement d'un tenant prend plusieurs secondes pour 100k contacts: search() est
+# bloquante et s'exécute hors de la boucle d'événements; un verrou par tenant sérialise
+# chargement, rafraîchissement et recherche (les listes triées ne sont pas thread-safe).
+# L'API ne supprime pas de contacts: l'index ne fait que grandir ou se modifier.
+#
+# - Préfixe: liste triée des mots (nom, entreprise) et des emails, recherche par
+#   bisect; chaque terme de la requête doit préfixer un mot du contact.
+# - Approché: trigrammes des mots du nom et de l'entreprise, similarité calculée
+#   comme pg_trgm (seuil 0.3), quand les préfixes ne remplissent pas la liste.
+# - Classement: correspondances par préfixe puis approchées, chaque groupe trié par
+#   interaction la plus récente (puis ordre alphabétique).
+import bisect
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from operator import attrgetter, itemgetter
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from prometheus_client import Histogram
+from sqlalchemy import or_, select, update
+
+from . import models
+
+AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "2"))
+AUTOCOMPLETE_MAX_TENANTS = int(os.getenv("AUTOCOMPLETE_MAX_TENANTS", "50"))
+
+INTERACTION_GRANULARITY = timedelta(minutes=1)  # Au plus une écriture par contact et par minute
+REFRESH_MARGIN = timedelta(seconds=5)  # Transactions validées après leur horodatage, horloges des instances
+EPOCH = datetime(1970, 1, 1)
+REBUILD_THRESHOLD = 5000  # Au-delà, un rafraîchissement recharge tout le tenant
+SCAN_THRESHOLD_MIN = 200  # Candidats à partir desquels un parcours par récence peut remplacer le tri
+SCAN_COST = 30  # Un contact testé pendant un parcours coûte ~30 ids ajoutés à un ensemble
+FUZZY_THRESHOLD = 0.3
+FUZZY_MIN_LENGTH = 3
+
+PREFIX, FUZZY = "prefix", "fuzzy"
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+autocomplete_duration = Histogram(
+    'workos_contacts_autocomplete_seconds',
+    'Contact autocomplete duration (search = index only, load/refresh include the database)',
+    ['phase'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 2.0, 10.0)
+)
+
+def fold(value: Optional[str]) -> str:
+    """Minuscules, sans accents"""
+    value = value or ""
+    if value.isascii():
+        return value.lower()
+    value = unicodedata.normalize("NFKD", value)
+    return "".join(char for char in value if not unicodedata.combining(char)).lower()
+
+def trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def record_interaction(db, tenant_id: str, contact_ids: Iterable[Optional[int]], at: Optional[datetime] = None):
+    """Dernière interaction (message, événement, tâche), dans la transaction de l'appelant
+
+    updated_at n'est pas modifié: une interaction ne change pas la fiche du contact.
+    """
+    ids = sorted({contact_id for contact_id in contact_ids if contact_id})
+    if not ids:
+        return
+    at = at or datetime.utcnow()
+    Contact = models.Contact
+    db.execute(
+        update(Contact).where(
+            Contact.tenant_id == tenant_id,
+            Contact.id.in_(ids),
+            or_(Contact.last_interaction_at.is_(None), Contact.last_interaction_at < at - INTERACTION_GRANULARITY)
+        ).values(last_interaction_at=at, updated_at=Contact.updated_at).execution_options(synchronize_session=False)
+    )
+
+class Entry:
+    __slots__ = ("id", "name", "email", "company", "last_interaction_at", "tokens", "text", "rank")
+
+    def __init__(self, id: int, name: str, email: Optional[str], company: Optional[str],
+                 last_interaction_at: Optional[datetime]):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.company = company
+        self.last_interaction_at = last_interaction_at
+        folded_name = fold(name)
+        tokens = set(WORD_PATTERN.findall(folded_name))
+        if company:
+            tokens.update(WORD_PATTERN.findall(fold(company)))
+        if email:
+            tokens.add(fold(email.strip()))
+        self.tokens = tuple(sys.intern(token) for token in tokens)
+        # "\0mot1\0mot2...": test de préfixe d'un terme par une seule recherche de sous-chaîne
+        self.text = "\0" + "\0".join(self.tokens)
+        # Position dans la liste par récence (croissante = plus récent d'abord)
+        recency = (last_interaction_at - EPOCH).total_seconds() if last_interaction_at else 0.0
+        self.rank = (-recency, folded_name, id)
+
+    @classmethod
+    def of(cls, contact) -> "Entry":
+        return cls(contact.id, contact.name, contact.email, contact.company, contact.last_interaction_at)
+
+    def values(self) -> tuple:
+        return (self.id, self.name, self.email, self.company, self.last_interaction_at)
+
+class TenantIndex:
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.entries = {}
+        # Listes parallèles triées par mot: tokens[i] appartient au contact token_ids[i]
+        self.tokens: List[str] = []
+        self.token_ids: List[int] = []
+        self.by_rank: List[tuple] = []  # Entry.rank de chaque contact
+        self.trigram_words = {}  # trigramme -> mots (nom, entreprise)
+        self.since: Optional[datetime] = None  # Prochain rafraîchissement: contacts modifiés depuis
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+        self.pending: List[Entry] = []  # Créations de ce process, appliquées sous le verrou
+
+    def apply_pending(self):
+        while self.pending:
+            self.upsert(self.pending.pop(0))
+
+    def _query(self, since: Optional[datetime] = None):
+        Contact = models.Contact
+        query = select(
+            Contact.id, Contact.name, Contact.email, Contact.company, Contact.last_interaction_at
+        ).where(Contact.tenant_id == self.tenant_id)
+        if since is not None:
+            query = query.where(or_(Contact.updated_at >= since, Contact.last_interaction_at >= since))
+        return query
+
+    def load(self, db):
+        started = datetime.utcnow()
+        entries = [Entry(*row) for row in db.execute(self._query())]
+        self.entries = {entry.id: entry for entry in entries}
+        postings = sorted((token, entry.id) for entry in entries for token in entry.tokens)
+        self.tokens = [token for token, _ in postings]
+        self.token_ids = [contact_id for _, contact_id in postings]
+        self.by_rank = sorted(entry.rank for entry in entries)
+        self.trigram_words = {}
+        for word in set(self.tokens):
+            if "@" not in word:
+                self._add_word(word)
+        self.since = started - REFRESH_MARGIN
+        self.refreshed_at = time.monotonic()
+
+    def refresh(self, db):
+        started = datetime.utcnow()
+        changed = [
+            row for row in db.execute(self._query(self.since))
+            if row[0] not in self.entries or self.entries[row[0]].values() != tuple(row)
+        ]
+        if len(changed) > REBUILD_THRESHOLD:
+            self.load(db)
+            return
+        for row in changed:
+            self.upsert(Entry(*row))
+        self.since = started - REFRESH_MARGIN
+        self.refreshed_at = time.monotonic()
+
+    def _add_word(self, word: str):
+        for gram in trigrams(word):
+            self.trigram_words.setdefault(gram, set()).add(word)
+
+    def _remove_word(self, word: str):
+        for gram in trigrams(word):
+            words = self.trigram_words.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self.trigram_words[gram]
+
+    def upsert(self, entry: Entry):
+        previous = self.entries.get(entry.id)
+        if previous is not None:
+            if previous.values() == entry.values():
+                return
+            self._remove(previous)
+        self.entries[entry.id] = entry
+        for token in entry.tokens:
+            i = bisect.bisect_left(self.tokens, token)
+            known = i < len(self.tokens) and self.tokens[i] == token
+            self.tokens.insert(i, token)
+            self.token_ids.insert(i, entry.id)
+            if not known and "@" not in token:
+                self._add_word(token)
+        bisect.insort(self.by_rank, entry.rank)
+
+    def _remove(self, entry: Entry):
+        for token in entry.tokens:
+            lo, hi = bisect.bisect_left(self.tokens, token), bisect.bisect_right(self.tokens, token)
+            i = self.token_ids.index(entry.id, lo, hi)
+            del self.tokens[i]
+            del self.token_ids[i]
+            if hi - lo == 1 and "@" not in token:
+                self._remove_word(token)
+        del self.by_rank[bisect.bisect_left(self.by_rank, entry.rank)]
+        del self.entries[entry.id]
+
+    def _prefix_range(self, term: str) -> Tuple[int, int]:
+        return bisect.bisect_left(self.tokens, term), bisect.bisect_left(self.tokens, term + "\uffff")
+
+    def _word_range(self, word: str) -> Tuple[int, int]:
+        return bisect.bisect_left(self.tokens, word), bisect.bisect_right(self.tokens, word)
+
+    def _similar_words(self, term: str) -> set:
+        if len(term) < FUZZY_MIN_LENGTH or "@" in term:
+            return set()
+        grams = trigrams(term)
+        shared = {}
+        for gram in grams:
+            for word in self.trigram_words.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        similar = set()
+        for word, count in shared.items():
+            # Le dénominateur vaut au moins len(grams): filtre avant de calculer les trigrammes du mot
+            if count / len(grams) >= FUZZY_THRESHOLD:
+                if count / (len(grams) + len(trigrams(word)) - count) >= FUZZY_THRESHOLD:
+                    similar.add(word)
+        return similar
+
+    def _scan(self, accepts, limit: int) -> List[Entry]:
+        """Candidats trop nombreux pour être triés: les premiers acceptés par récence suffisent"""
+        found = []
+        entries = self.entries
+        for rank in self.by_rank:
+            entry = entries[rank[2]]
+            if accepts(entry):
+                found.append(entry)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _ids(self, ranges) -> set:
+        ids = set()
+        for lo, hi in ranges:
+            ids.update(self.token_ids[lo:hi])
+        return ids
+
+    def _match(self, term_ranges: List[list], accepts, limit: int) -> List[Entry]:
+        """term_ranges: pour chaque terme, les plages de token_ids des mots qui le satisfont
+
+        Le terme le plus sélectif fournit les candidats. S'ils sont trop nombreux pour
+        être triés (au-delà de sqrt(limit * N): trier k candidats coûte ~k, parcourir
+        par récence ~limit * N / k), ils sont croisés avec ceux du terme suivant quand
+        c'est moins cher que le parcours, sinon les contacts sont parcourus par récence.
+        """
+        total = max(len(self.entries), 1)
+        threshold = max(SCAN_THRESHOLD_MIN, int((limit * total) ** 0.5))
+        sized = sorted(((sum(hi - lo for lo, hi in ranges), ranges) for ranges in term_ranges), key=itemgetter(0))
+        size, ranges = sized[0]
+        if size <= threshold:
+            candidates = self._ids(ranges)
+        else:
+            estimate = size
+            for other, _ in sized[1:]:
+                estimate = estimate * other / total  # Termes supposés indépendants
+            scan_cost = SCAN_COST * limit * total / max(estimate, 1)
+            if len(sized) == 1 or size + sized[1][0] > scan_cost:
+                return self._scan(accepts, limit)
+            candidates = self._ids(ranges) & self._ids(sized[1][1])
+            if len(candidates) > threshold:
+                return self._scan(lambda entry: entry.id in candidates and accepts(entry), limit)
+        return heapq.nsmallest(limit, filter(accepts, map(self.entries.get, candidates)), key=attrgetter("rank"))
+
+    def search(self, query: str, limit: int) -> List[Tuple[Entry, str]]:
+        query = fold(query).strip()
+        terms = [query.replace(" ", "")] if "@" in query else WORD_PATTERN.findall(query)
+        if not terms:
+            return []
+        needles = ["\0" + term for term in terms]
+        prefix_ranges = [[self._prefix_range(term)] for term in terms]
+
+        found = self._match(prefix_ranges, lambda entry: all(map(entry.text.__contains__, needles)), limit)
+        results = [(entry, PREFIX) for entry in found]
+        if len(found) == limit:
+            return results
+
+        # Moins de limit résultats: found contient toutes les correspondances par préfixe
+        similar = [self._similar_words(term) for term in terms]
+        if not any(similar):
+            return results
+        exclude = {entry.id for entry in found}
+
+        def accepts(entry):
+            return entry.id not in exclude and all(
+                needle in entry.text or not words.isdisjoint(entry.tokens)
+                for needle, words in zip(needles, similar)
+            )
+
+        fuzzy_ranges = [
+            ranges + [self._word_range(word) for word in words]
+            for ranges, words in zip(prefix_ranges, similar)
+        ]
+        results += [(entry, FUZZY) for entry in self._match(fuzzy_ranges, accepts, limit - len(found))]
+        return results
+
+class ContactAutocomplete:
+    """Index des tenants récemment interrogés (LRU, AUTOCOMPLETE_MAX_TENANTS)"""
+
+    def __init__(self, max_tenants: int = AUTOCOMPLETE_MAX_TENANTS):
+        self.max_tenants = max_tenants
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()  # Protège _indexes, chaque index a son propre verrou
+
+    def _index(self, tenant_id: str) -> TenantIndex:
+        with self._lock:
+            index = self._indexes.get(tenant_id)
+            if index is None:
+                # Enregistré avant le chargement: les requêtes concurrentes attendent ce chargement
+                index = self._indexes[tenant_id] = TenantIndex(tenant_id)
+                while len(self._indexes) > self.max_tenants:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(tenant_id)
+            return index
+
+    def search(self, db, tenant_id: str, query: str, limit: int) -> List[Tuple[Entry, str]]:
+        """Bloquante (lecture de la base au chargement et au rafraîchissement): run_in_threadpool"""
+        start = time.perf_counter()
+        index = self._index(tenant_id)
+        with index.lock:
+            if index.since is None:
+                # Pas encore chargé (ou chargement précédent en échec): le chargement inclut les créations
+                index.pending.clear()
+                index.load(db)
+                phase = "load"
+            else:
+                # Avant le rafraîchissement, qui peut relire une version plus récente
+                index.apply_pending()
+                if time.monotonic() - index.refreshed_at >= AUTOCOMPLETE_REFRESH_SECONDS:
+                    index.refresh(db)
+                    phase = "refresh"
+                else:
+                    phase = "search"
+            results = index.search(query, limit)
+        autocomplete_duration.labels(phase=phase).observe(time.perf_counter() - start)
+        return results
+
+    def add(self, tenant_id: str, contact):
+        """Contact créé par ce process: visible à la recherche suivante, sans attendre le rafraîchissement
+
+        Appelée depuis la boucle d'événements: ne prend pas le verrou de l'index.
+        """
+        index = self._indexes.get(tenant_id)
+        if index is not None:
+            index.pending.append(Entry.of(contact))
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+contact_autocomplete = ContactAutocomplete()
@@ -0,0 +1,266 @@
+# app/modules/contacts/importer.py
+# Import CSV de contacts: lecture en flux, normalisation, déduplication, upserts par lots
+#
+# Le fichier est lu ligne à ligne (mémoire bornée, hors ensemble des emails déjà
+# vus). Les doublons du fichier sont écartés sur l'email normalisé; les doublons
+# avec la base sont résolus par INSERT ... ON CONFLICT sur l'index unique
+# (tenant_id, normalized_email): ignorés (skip) ou complétés (update). Chaque lot
+# est écrit et la progression du job mise à jour dans la même transaction.
+# Le shard du tenant est relu avant chaque lot: pendant un déplacement (gel), l'import
+# attend la fin du gel puis continue sur le nouveau shard, où le job a été copié.
+import codecs
+import csv
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from prometheus_client import Counter
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.tenant import TenantMoving, shard_router
+from . import models
+
+IMPORT_BATCH_SIZE = int(os.getenv("CONTACT_IMPORT_BATCH_SIZE", "1000"))
+IMPORT_WORKERS = int(os.getenv("CONTACT_IMPORT_WORKERS", "2"))
+IMPORT_MOVE_TIMEOUT = int(os.getenv("CONTACT_IMPORT_MOVE_TIMEOUT", "1800"))  # Attente max d'un gel (s)
+IMPORT_MAX_ERRORS = 100  # Lignes rejetées conservées sur le job
+PROGRESS_COLUMNS = ("rows_read", "created_count", "updated_count", "skipped_count", "duplicate_count", "invalid_count")
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# En-têtes acceptés (minuscules) -> colonne
+HEADER_ALIASES = {
+    "name": "name", "full name": "name", "nom": "name",
+    "email": "email", "e-mail": "email", "mail": "email", "courriel": "email",
+    "phone": "phone", "telephone": "phone", "téléphone": "phone", "tel": "phone", "mobile": "phone",
+    "company": "company", "organization": "company", "entreprise": "company", "société": "company",
+    "type": "type",
+}
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="contact-import")
+
+contacts_import_rows = Counter(
+    'workos_contacts_import_rows_total',
+    'Rows processed by CSV contact imports',
+    ['result']
+)
+
+def normalize_email(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip().lower()
+    return value or None
+
+def normalize_phone(value: Optional[str]) -> Optional[str]:
+    """Chiffres uniquement, préfixe international conservé ("00" -> "+")"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    international = value.startswith("+") or value.startswith("00")
+    digits = re.sub(r"\D", "", value)
+    if international and value.startswith("00"):
+        digits = digits[2:]
+    if not digits:
+        return None
+    return ("+" if international else "") + digits[:19]
+
+def _insert(db):
+    # ON CONFLICT: Postgres en production, SQLite pour les bancs d'essai locaux
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+
+def _inserted(db, table, now):
+    """Expression RETURNING vraie pour une ligne créée par l'upsert (fausse si mise à jour)"""
+    if db.bind.dialect.name == "sqlite":
+        # Pas de xmax: une ligne mise à jour garde son created_at, une ligne créée a celui du lot
+        return table.c.created_at == now
+    return literal_column("xmax = 0")
+
+def parse_row(row: dict) -> dict:
+    """Ligne CSV -> valeurs du contact; ValueError si la ligne est inutilisable"""
+    values = {column: (row.get(column) or "").strip() for column in ("name", "email", "phone", "company", "type")}
+    normalized = normalize_email(values["email"])
+    if normalized and not EMAIL_PATTERN.match(normalized):
+        raise ValueError(f"invalid email: {values['email'][:100]}")
+    name = values["name"] or (values["email"].split("@")[0] if values["email"] else "")
+    if not name:
+        raise ValueError("missing name and email")
+    return {
+        "name": name[:100],
+        "email": values["email"][:100] or None,
+        "normalized_email": normalized[:100] if normalized else None,
+        "phone": normalize_phone(values["phone"]),
+        "company": values["company"][:100] or None,
+        "type": values["type"][:50] or None,  # "contact" à la création (voir flush)
+    }
+
+def read_rows(path: str):
+    """(numéro de ligne, dict) avec en-têtes ramenés aux colonnes connues"""
+    with open(path, "rb") as raw:
+        text = codecs.getreader("utf-8-sig")(raw, errors="replace")
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            return
+        columns = [HEADER_ALIASES.get(name.strip().lower()) for name in header]
+        if "name" not in columns and "email" not in columns:
+            raise ValueError("CSV header must contain a name or email column")
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield reader.line_num, {column: value for column, value in zip(columns, values) if column}
+
+class ContactImportRunner:
+    def __init__(self, tenant_id: str, job_id: int):
+        self.tenant_id = tenant_id
+        self.job_id = job_id
+        self.shard = None
+        self.db = None
+        self.job = None
+        self.seen = set()
+        self.errors = []
+
+    def follow_tenant(self):
+        """Avant chaque écriture: attend la fin d'un gel, change de session si le tenant a été déplacé
+
+        Les lots précédents sont validés avant le gel, donc copiés avec le tenant; les
+        lignes lues depuis le dernier lot sont reportées sur le job du nouveau shard.
+        """
+        shard = shard_router.writable_shard(self.tenant_id, IMPORT_MOVE_TIMEOUT)
+        if shard == self.shard:
+            return
+        progress = {}
+        if self.db is not None:
+            progress = {column: getattr(self.job, column) for column in PROGRESS_COLUMNS}
+            self.db.close()
+        self.db = shard_router.sessionmaker(shard)()
+        self.shard = shard
+        self.job = self.db.get(models.ContactImport, self.job_id)
+        if self.job is None:
+            raise RuntimeError(f"Contact import {self.job_id} not found on shard '{shard}'")
+        for column, value in progress.items():
+            setattr(self.job, column, value)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+
+    def run(self, path: str):
+        batch = []
+        for line, row in read_rows(path):
+            self.job.rows_read += 1
+            try:
+                contact = parse_row(row)
+            except ValueError as e:
+                self.job.invalid_count += 1
+                contacts_import_rows.labels(result="invalid").inc()
+                if len(self.errors) < IMPORT_MAX_ERRORS:
+                    self.errors.append({"line": line, "error": str(e)})
+                continue
+
+            key = contact["normalized_email"]
+            if key:
+                if key in self.seen:
+                    self.job.duplicate_count += 1
+                    contacts_import_rows.labels(result="duplicate").inc()
+                    continue
+                self.seen.add(key)
+
+            batch.append(contact)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+
+    def upsert(self, table, now, update_type: bool):
+        """INSERT ... ON CONFLICT DO UPDATE: les valeurs vides du fichier n'effacent pas les valeurs existantes"""
+        stmt = _insert(self.db)(table)
+        values = {
+            "name": stmt.excluded.name,
+            "email": stmt.excluded.email,
+            "phone": func.coalesce(stmt.excluded.phone, table.c.phone),
+            "company": func.coalesce(stmt.excluded.company, table.c.company),
+            "updated_at": now,
+        }
+        if update_type:
+            values["type"] = stmt.excluded.type
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.tenant_id, table.c.normalized_email],
+            set_=values
+        )
+
+    def flush(self, batch):
+        """Un lot: upsert (créations et existants comptés par RETURNING), progression, commit"""
+        Contact = models.Contact
+        table = Contact.__table__
+        tenant_id = self.job.tenant_id
+        self.follow_tenant()
+        now = datetime.utcnow()
+
+        if batch:
+            rows = [
+                dict(contact, type=contact["type"] or "contact", tenant_id=tenant_id, created_at=now, updated_at=now)
+                for contact in batch
+            ]
+            # executemany: instruction compilée une fois (cache), lignes envoyées par lots multi-VALUES
+            if self.job.on_duplicate == "update":
+                # Un type vide vaut "contact" à la création seulement: les lignes sans type
+                # passent par une instruction qui ne met pas à jour le type existant
+                typed = [row for row, contact in zip(rows, batch) if contact["type"]]
+                untyped = [row for row, contact in zip(rows, batch) if not contact["type"]]
+                created = 0
+                for group, update_type in ((typed, True), (untyped, False)):
+                    if group:
+                        stmt = self.upsert(table, now, update_type).returning(_inserted(self.db, table, now))
+                        created += sum(1 for (inserted,) in self.db.execute(stmt, group) if inserted)
+                existing = len(batch) - created
+                self.job.updated_count += existing
+                contacts_import_rows.labels(result="updated").inc(existing)
+            else:
+                # Les lignes ignorées (email déjà présent) ne sont pas retournées
+                stmt = _insert(self.db)(table).on_conflict_do_nothing(
+                    index_elements=[table.c.tenant_id, table.c.normalized_email]
+                ).returning(table.c.id)
+                created = len(self.db.execute(stmt, rows).all())
+                existing = len(batch) - created
+                self.job.skipped_count += existing
+                contacts_import_rows.labels(result="skipped").inc(existing)
+            self.job.created_count += created
+            contacts_import_rows.labels(result="created").inc(created)
+
+        self.job.errors = list(self.errors)
+        self.db.commit()
+
+def run_import(tenant_id: str, job_id: int, path: str):
+    """Exécuté dans le pool dédié, avec sa propre session (sur le shard courant du tenant)"""
+    runner = ContactImportRunner(tenant_id, job_id)
+    try:
+        runner.follow_tenant()
+        runner.job.status = "running"
+        runner.job.started_at = datetime.utcnow()
+        runner.db.commit()
+
+        try:
+            runner.run(path)
+            runner.follow_tenant()
+            runner.job.status = "completed"
+        except TenantMoving:
+            raise
+        except Exception as e:
+            runner.db.rollback()
+            print(f"Contact import {job_id} failed for tenant {tenant_id}: {e}")
+            runner.follow_tenant()
+            runner.job.status = "failed"
+            runner.job.errors = (runner.errors + [{"line": None, "error": str(e)[:500]}])[-IMPORT_MAX_ERRORS:]
+        runner.job.finished_at = datetime.utcnow()
+        runner.db.commit()
+    except TenantMoving:
+        # Gel plus long que CONTACT_IMPORT_MOVE_TIMEOUT: aucune écriture possible, même l'échec
+        print(f"Contact import {job_id} abandoned: tenant {tenant_id} still frozen by a shard move")
+    finally:
+        runner.close()
+        os.unlink(path)
+
+def submit_import(tenant_id: str, job_id: int, path: str):
+    return _executor.submit(run_import, tenant_id, job_id, path)
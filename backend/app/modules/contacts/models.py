@@ -1,11 +1,37 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Index
 from app.core.models import BaseModel
 
 class Contact(BaseModel):
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Déduplication par email (NULL autorisé plusieurs fois: contacts sans email)
+        Index("uq_contacts_tenant_normalized_email", "tenant_id", "normalized_email", unique=True),
+        # Rafraîchissement incrémental de l'index d'autocomplétion
+        Index("ix_contacts_tenant_updated_at", "tenant_id", "updated_at"),
+        Index("ix_contacts_tenant_last_interaction_at", "tenant_id", "last_interaction_at"),
+    )
     
     name = Column(String(100), nullable=False)
     email = Column(String(100))
+    normalized_email = Column(String(100))  # Email en minuscules, sans espaces (clé de déduplication)
     phone = Column(String(20))
     company = Column(String(100))
-    type = Column(String(50), default='contact')
\ No newline at end of file
+    type = Column(String(50), default='contact')
+    last_interaction_at = Column(DateTime)  # Dernier message, événement ou tâche (classement de l'autocomplétion)
+
+class ContactImport(BaseModel):
+    """Import CSV de contacts: progression mise à jour après chaque lot"""
+    __tablename__ = "contact_imports"
+    
+    filename = Column(String(255))
+    status = Column(String(20), default="pending", nullable=False)  # pending, running, completed, failed
+    on_duplicate = Column(String(10), default="skip", nullable=False)  # skip, update
+    rows_read = Column(Integer, default=0, nullable=False)
+    created_count = Column(Integer, default=0, nullable=False)
+    updated_count = Column(Integer, default=0, nullable=False)  # Contacts existants mis à jour (update)
+    skipped_count = Column(Integer, default=0, nullable=False)  # Contacts existants ignorés (skip)
+    duplicate_count = Column(Integer, default=0, nullable=False)  # Doublons à l'intérieur du fichier
+    invalid_count = Column(Integer, default=0, nullable=False)
+    errors = Column(JSON, default=list)  # Premières lignes rejetées: {"line", "error"}
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
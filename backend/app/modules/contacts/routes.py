@@ -1,9 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import os
+import tempfile
 
-from app.core.database import get_db
+from app.core.tenant import get_tenant_db
+from app.core.export import ExportFormat, export_response, table_columns
 from . import models, schemas
+from .importer import normalize_email, normalize_phone, submit_import
+from .autocomplete import contact_autocomplete
 
 # Import des métriques pour le monitoring
 from prometheus_client import Counter, Histogram
@@ -25,7 +36,7 @@ contacts_db_query_duration = Histogram(
 )
 
 @router.get("/api/{tenant_id}/contacts", response_model=List[schemas.ContactResponse])
-async def list_contacts(tenant_id: str, db: Session = Depends(get_db)):
+async def list_contacts(tenant_id: str, db: Session = Depends(get_tenant_db)):
     start_time = time.time()
     
     try:
@@ -47,15 +58,22 @@ async def list_contacts(tenant_id: str, db: Session = Depends(get_db)):
 async def create_contact(
     tenant_id: str,
     contact: schemas.ContactCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     start_time = time.time()
     
     try:
-        db_contact = models.Contact(**contact.dict(), tenant_id=tenant_id)
+        contact_data = contact.dict()
+        contact_data["phone"] = normalize_phone(contact_data["phone"])
+        db_contact = models.Contact(
+            **contact_data,
+            normalized_email=normalize_email(contact_data["email"]),
+            tenant_id=tenant_id
+        )
         db.add(db_contact)
         db.commit()
         db.refresh(db_contact)
+        contact_autocomplete.add(tenant_id, db_contact)
         
         # Métriques de succès
         query_duration = time.time() - start_time
@@ -64,14 +82,134 @@ async def create_contact(
         
         return db_contact
     
+    except IntegrityError:
+        # Index unique (tenant_id, normalized_email)
+        db.rollback()
+        contacts_operations.labels(operation="create", tenant_id=tenant_id, status="duplicate").inc()
+        raise HTTPException(status_code=409, detail="A contact with this email already exists")
     except Exception as e:
         # Rollback en cas d'erreur et métrique
         db.rollback()
         contacts_operations.labels(operation="create", tenant_id=tenant_id, status="error").inc()
         raise
 
+# === IMPORT CSV ===
+
+@router.post("/api/{tenant_id}/contacts/import", response_model=schemas.ContactImportResponse, status_code=202)
+async def import_contacts(
+    tenant_id: str,
+    file: UploadFile = File(...),
+    on_duplicate: str = Form("skip", pattern="^(skip|update)$"),
+    wait: bool = Query(False),
+    db: Session = Depends(get_tenant_db)
+):
+    """Import en arrière-plan (progression: GET /contacts/imports/{id}); wait=true attend la fin"""
+    # Copie du fichier reçu par blocs: le traitement continue après la réponse
+    spool = tempfile.NamedTemporaryFile(prefix="contacts-import-", suffix=".csv", delete=False)
+    try:
+        with spool:
+            while chunk := await file.read(1 << 20):
+                spool.write(chunk)
+        
+        job = models.ContactImport(
+            tenant_id=tenant_id,
+            filename=(file.filename or "")[:255] or None,
+            on_duplicate=on_duplicate,
+            errors=[]
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        
+        future = submit_import(tenant_id, job.id, spool.name)
+    except BaseException:
+        # Fichier supprimé par run_import une fois soumis, ici sinon
+        os.unlink(spool.name)
+        raise
+    contacts_operations.labels(operation="import", tenant_id=tenant_id, status="success").inc()
+    if not wait:
+        return job
+    
+    await asyncio.wrap_future(future)
+    db.refresh(job)
+    return JSONResponse(
+        status_code=200,
+        content=schemas.ContactImportResponse.model_validate(job).model_dump(mode="json")
+    )
+
+@router.get("/api/{tenant_id}/contacts/imports", response_model=List[schemas.ContactImportResponse])
+async def list_contact_imports(
+    tenant_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_tenant_db)
+):
+    return db.query(models.ContactImport).filter_by(tenant_id=tenant_id).order_by(
+        models.ContactImport.id.desc()
+    ).limit(limit).all()
+
+@router.get("/api/{tenant_id}/contacts/imports/{import_id}", response_model=schemas.ContactImportResponse)
+async def get_contact_import(
+    tenant_id: str,
+    import_id: int,
+    db: Session = Depends(get_tenant_db)
+):
+    job = db.query(models.ContactImport).filter_by(id=import_id, tenant_id=tenant_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
+
+# Déclarée avant /contacts/{contact_id}
+@router.get("/api/{tenant_id}/contacts/autocomplete", response_model=List[schemas.ContactSuggestion])
+async def autocomplete_contacts(
+    tenant_id: str,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_tenant_db)
+):
+    """Préfixe puis approché sur nom, email et entreprise, interactions récentes d'abord"""
+    # Premier appel d'un tenant: chargement de l'index (secondes), hors de la boucle d'événements
+    results = await run_in_threadpool(contact_autocomplete.search, db, tenant_id, q, limit)
+    contacts_operations.labels(operation="autocomplete", tenant_id=tenant_id, status="success").inc()
+    return [
+        schemas.ContactSuggestion(
+            id=entry.id,
+            name=entry.name,
+            email=entry.email,
+            company=entry.company,
+            last_interaction_at=entry.last_interaction_at,
+            match=match
+        )
+        for entry, match in results
+    ]
+
+# Déclarée avant /contacts/{contact_id}
+@router.get("/api/{tenant_id}/contacts/export")
+async def export_contacts(
+    tenant_id: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    type: Optional[str] = Query(None),
+    company: Optional[str] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    Contact = models.Contact
+    query = select(*table_columns(Contact)).where(Contact.tenant_id == tenant_id)
+    if type:
+        query = query.where(Contact.type == type)
+    if company:
+        query = query.where(Contact.company == company)
+    if created_after:
+        query = query.where(Contact.created_at >= created_after)
+    if created_before:
+        query = query.where(Contact.created_at < created_before)
+    
+    contacts_operations.labels(operation="export", tenant_id=tenant_id, status="success").inc()
+    return export_response(db, query, "contacts", format, gzip)
+
 @router.get("/api/{tenant_id}/contacts/{contact_id}", response_model=schemas.ContactResponse)
-async def get_contact(tenant_id: str, contact_id: int, db: Session = Depends(get_db)):
+async def get_contact(tenant_id: str, contact_id: int, db: Session = Depends(get_tenant_db)):
     start_time = time.time()
     
     try:
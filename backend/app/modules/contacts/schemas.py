@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class ContactBase(BaseModel):
@@ -22,4 +22,36 @@ class ContactResponse(ContactBase):
     updated_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ContactSuggestion(BaseModel):
+    id: int
+    name: str
+    email: Optional[str] = None
+    company: Optional[str] = None
+    last_interaction_at: Optional[datetime] = None
+    match: str  # prefix, fuzzy
+
+class ImportRowError(BaseModel):
+    line: Optional[int] = None
+    error: str
+
+class ContactImportResponse(BaseModel):
+    id: int
+    tenant_id: str
+    filename: Optional[str] = None
+    status: str
+    on_duplicate: str
+    rows_read: int
+    created_count: int
+    updated_count: int
+    skipped_count: int
+    duplicate_count: int
+    invalid_count: int
+    errors: List[ImportRowError] = []
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
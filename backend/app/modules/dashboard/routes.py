@@ -0,0 +1,154 @@
+# app/modules/dashboard/routes.py
+# Dashboard agrégé: les résumés des modules sont calculés en parallèle, chacun sur
+# sa propre session, avec un délai maximum par section. Une section trop lente
+# est renvoyée vide (statut "timeout") sans retarder les autres.
+# contact_id: dashboard personnel (tâches assignées, événements du contact, non-lus
+# des channels); les statistiques des projets et du calendrier restent celles du tenant.
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Request
+from prometheus_client import Histogram
+from pydantic import TypeAdapter
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.core.tenant import shard_router
+from app.core.due_dates import due_tracker, DUE_SOON, OVERDUE, PENDING
+from app.modules.tasks.models import Task
+from app.modules.calendar.models import Event, EventParticipant
+from app.modules.calendar.routes import _calendar_stats
+from app.modules.messages.routes import _channel_summaries
+from app.modules.projects.routes import _project_stats
+from app.modules.calendar.schemas import EventStats
+from app.modules.messages.schemas import ChannelResponse
+from app.modules.projects.schemas import ProjectStats
+from . import schemas
+
+router = APIRouter()
+
+DASHBOARD_SECTION_TIMEOUT = float(os.getenv("DASHBOARD_SECTION_TIMEOUT", "2.0"))
+# Pool dédié: un dashboard lent ne consomme pas les threads des autres routes
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "16"))
+DUE_SOON_LIMIT = 10
+UPCOMING_EVENTS_LIMIT = 10
+
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+dashboard_section_duration = Histogram(
+    'workos_dashboard_section_seconds',
+    'Dashboard section duration',
+    ['section', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+)
+
+def _task_summary(db: Session, tenant_id: str, contact_id: Optional[int]) -> dict:
+    """Tâches du tenant, ou celles assignées à contact_id"""
+    now = datetime.utcnow()
+    scope = [Task.tenant_id == tenant_id]
+    if contact_id is not None:
+        scope.append(Task.assignee_id == contact_id)
+    by_status = dict(db.query(Task.status, func.count(Task.id)).filter(*scope).group_by(Task.status).all())
+
+    # État d'échéance maintenu par le suivi des échéances (index tenant, due_state, due_date)
+    due_state = due_tracker.state_of("task", now)
+    overdue = db.query(func.count(Task.id)).filter(
+        *scope,
+        due_state == OVERDUE
+    ).scalar()
+    due_soon = db.query(Task).filter(
+        *scope,
+        due_state.in_([DUE_SOON, PENDING]),
+        Task.due_date >= now
+    ).order_by(Task.due_date).limit(DUE_SOON_LIMIT).all()
+
+    return {
+        "total": sum(by_status.values()),
+        "by_status": {status or "unknown": count for status, count in by_status.items()},
+        "overdue": overdue,
+        "due_soon": due_soon
+    }
+
+def _upcoming_events(db: Session, tenant_id: str, contact_id: Optional[int]) -> list:
+    """Événements des 7 prochains jours, ou ceux de contact_id (organisateur ou invité, hors refus)"""
+    now = datetime.utcnow()
+    query = db.query(Event).filter(
+        Event.tenant_id == tenant_id,
+        Event.start_time >= now,
+        Event.start_time < now + timedelta(days=7)
+    )
+    if contact_id is not None:
+        query = query.filter(or_(
+            Event.created_by == contact_id,
+            Event.id.in_(select(EventParticipant.event_id).where(
+                EventParticipant.tenant_id == tenant_id,
+                EventParticipant.contact_id == contact_id,
+                EventParticipant.status != "declined"
+            ))
+        ))
+    return query.order_by(Event.start_time).limit(UPCOMING_EVENTS_LIMIT).all()
+
+# section -> (module requis, fonction, type de la section)
+SECTIONS = {
+    "tasks": ("tasks", _task_summary, schemas.TaskSummary),
+    "upcoming_events": ("calendar", _upcoming_events, List[schemas.UpcomingEvent]),
+    "channels": ("messages", lambda db, tenant_id, contact_id: _channel_summaries(db, tenant_id, contact_id), List[ChannelResponse]),
+    "project_stats": ("projects", lambda db, tenant_id, contact_id: _project_stats(db, tenant_id), ProjectStats),
+    "calendar_stats": ("calendar", lambda db, tenant_id, contact_id: _calendar_stats(db, tenant_id), EventStats),
+}
+
+_adapters = {name: TypeAdapter(section_type) for name, (_, _, section_type) in SECTIONS.items()}
+
+def _run_section(sessions, name: str, tenant_id: str, contact_id: Optional[int], timeout: float):
+    """Exécutée dans le pool: session propre, validation avant fermeture (relations chargées)"""
+    _, section, _ = SECTIONS[name]
+    db = sessions()
+    try:
+        if db.bind.dialect.name == "postgresql":
+            # Le thread n'est pas interrompu par le timeout asyncio: borner aussi la requête côté base
+            db.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+        return _adapters[name].validate_python(section(db, tenant_id, contact_id), from_attributes=True)
+    finally:
+        db.close()
+
+@router.get("/api/{tenant_id}/dashboard", response_model=schemas.DashboardResponse)
+async def get_dashboard(
+    tenant_id: str,
+    request: Request,
+    contact_id: Optional[int] = Query(None),
+    timeout: float = Query(DASHBOARD_SECTION_TIMEOUT, gt=0, le=10),
+):
+    shard, _ = shard_router.resolve(tenant_id)
+    sessions = shard_router.sessionmaker(shard)
+    loop = asyncio.get_running_loop()
+    enabled = getattr(request.app.state, "modules", None)
+
+    async def run(name):
+        start = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(
+                loop.run_in_executor(_executor, _run_section, sessions, name, tenant_id, contact_id, timeout),
+                timeout
+            )
+            status = "ok"
+        except asyncio.TimeoutError:
+            data, status = None, "timeout"
+        except Exception as e:
+            print(f"Dashboard section '{name}' failed for tenant {tenant_id}: {e}")
+            data, status = None, "error"
+        elapsed = time.perf_counter() - start
+        dashboard_section_duration.labels(section=name, status=status).observe(elapsed)
+        return name, data, {"status": status, "duration_ms": round(elapsed * 1000, 2)}
+
+    names = [name for name, (module, _, _) in SECTIONS.items() if enabled is None or module in enabled]
+    results = await asyncio.gather(*(run(name) for name in names))
+
+    response = {"generated_at": datetime.utcnow(), "sections": {}}
+    for name, data, section_status in results:
+        response[name] = data
+        response["sections"][name] = section_status
+    return response
@@ -0,0 +1,49 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+from datetime import datetime
+
+from app.modules.calendar.schemas import EventTypeEnum, EventStats
+from app.modules.messages.schemas import ChannelResponse
+from app.modules.projects.schemas import ProjectStats
+
+class DashboardTask(BaseModel):
+    id: int
+    title: str
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    assignee_id: Optional[int] = None
+    due_date: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class TaskSummary(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    overdue: int
+    due_soon: List[DashboardTask]
+
+class UpcomingEvent(BaseModel):
+    id: int
+    title: str
+    start_time: datetime
+    end_time: datetime
+    event_type: EventTypeEnum
+    location: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class SectionStatus(BaseModel):
+    status: str  # ok, timeout, error
+    duration_ms: float
+
+class DashboardResponse(BaseModel):
+    generated_at: datetime
+    # Une section absente (None) a expiré, échoué ou appartient à un module désactivé
+    tasks: Optional[TaskSummary] = None
+    upcoming_events: Optional[List[UpcomingEvent]] = None
+    channels: Optional[List[ChannelResponse]] = None
+    project_stats: Optional[ProjectStats] = None
+    calendar_stats: Optional[EventStats] = None
+    sections: Dict[str, SectionStatus]
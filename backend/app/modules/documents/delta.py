@@ -0,0 +1,111 @@
+# app/modules/documents/delta.py
+# Deltas binaires entre versions de documents (algorithme type rsync, sans dépendance)
+import struct
+import zlib
+
+BLOCK_SIZE = 1024
+_MAGIC = b"WDL1"
+_MOD = 1 << 16
+
+def _weak_hash(block: bytes) -> tuple[int, int]:
+    a = 0
+    b = 0
+    length = len(block)
+    for i, byte in enumerate(block):
+        a += byte
+        b += (length - i) * byte
+    return a % _MOD, b % _MOD
+
+def make_delta(source: bytes, target: bytes, block_size: int = BLOCK_SIZE) -> bytes:
+    """Encode target comme une suite de copies depuis source et d'insertions littérales.
+
+    Le résultat est compressé avec zlib: les insertions profitent aussi de la compression.
+    """
+    ops = []
+    literal = bytearray()
+
+    def copy(offset, length):
+        if literal:
+            ops.append(("I", bytes(literal)))
+            literal.clear()
+        # Fusionner avec la copie précédente si contiguë
+        if ops and ops[-1][0] == "C" and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = ("C", ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append(("C", offset, length))
+
+    # Index des blocs de la source: hash faible -> offsets
+    index = {}
+    for offset in range(0, len(source) - block_size + 1, block_size):
+        a, b = _weak_hash(source[offset:offset + block_size])
+        index.setdefault(a | (b << 16), []).append(offset)
+
+    position = 0
+    end = len(target)
+    a = b = None
+    while position + block_size <= end:
+        if a is None:
+            a, b = _weak_hash(target[position:position + block_size])
+
+        match = None
+        for offset in index.get(a | (b << 16), ()):
+            if source[offset:offset + block_size] == target[position:position + block_size]:
+                match = offset
+                break
+
+        if match is not None:
+            copy(match, block_size)
+            position += block_size
+            a = None
+            continue
+
+        # Pas de correspondance: avancer d'un octet avec le hash roulant
+        out_byte = target[position]
+        literal.append(out_byte)
+        position += 1
+        if position + block_size <= end:
+            in_byte = target[position + block_size - 1]
+            a = (a - out_byte + in_byte) % _MOD
+            b = (b - block_size * out_byte + a) % _MOD
+
+    literal.extend(target[position:])
+    if literal:
+        ops.append(("I", bytes(literal)))
+
+    encoded = bytearray(_MAGIC)
+    encoded += struct.pack(">Q", end)
+    for op in ops:
+        if op[0] == "C":
+            encoded += b"C" + struct.pack(">QI", op[1], op[2])
+        else:
+            encoded += b"I" + struct.pack(">I", len(op[1])) + op[1]
+
+    return zlib.compress(bytes(encoded), 6)
+
+def apply_delta(source: bytes, delta: bytes) -> bytes:
+    data = zlib.decompress(delta)
+    if data[:4] != _MAGIC:
+        raise ValueError("Invalid delta format")
+
+    (size,) = struct.unpack_from(">Q", data, 4)
+    result = bytearray()
+    position = 12
+    while position < len(data):
+        op = data[position:position + 1]
+        position += 1
+        if op == b"C":
+            offset, length = struct.unpack_from(">QI", data, position)
+            position += 12
+            result += source[offset:offset + length]
+        elif op == b"I":
+            (length,) = struct.unpack_from(">I", data, position)
+            position += 4
+            result += data[position:position + length]
+            position += length
+        else:
+            raise ValueError("Invalid delta operation")
+
+    if len(result) != size:
+        raise ValueError("Delta produced unexpected size")
+
+    return bytes(result)
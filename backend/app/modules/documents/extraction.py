@@ -0,0 +1,408 @@
+# app/modules/documents/extraction.py
+# Extraction du texte des documents, hors du chemin des requêtes
+#
+# Chaque document a une ligne document_texts (statut, tentatives, texte extrait).
+# Les routes la (re)mettent en attente dans leur transaction (track) puis confient
+# le document au pipeline (submit), qui rend la main tout de suite.
+#
+# Le texte est lu en flux (text.py) dans un pool de threads: pdftotext tourne
+# dans son propre processus, les archives bureautiques sont décompressées et
+# parsées par morceaux. Un thread répartit les documents en attente entre les
+# tenants à tour de rôle, chacun limité par un token bucket (EXTRACTION_TENANT_RATE
+# documents/seconde): un import massif d'un tenant ne retarde pas les autres.
+#
+# Durabilité: une ligne en attente porte next_attempt_at, bail du process qui la
+# traite ou heure de la prochaine tentative après un échec (délai doublé à chaque
+# tentative, "failed" après EXTRACTION_MAX_ATTEMPTS). Le rattrapage périodique
+# (sweep) réclame sur chaque shard les lignes dont l'échéance est passée: reprises,
+# documents perdus par un redémarrage ou une file pleine. La réclamation est un
+# UPDATE conditionnel: un seul process la gagne. Les documents antérieurs à
+# l'extraction (sans ligne document_texts) sont ajoutés une fois pour toutes par
+# scripts/backfill_document_texts.py (exécuté aussi par init_db).
+#
+# Seuls les SEARCH_INDEX_CHARS premiers caractères du texte sont indexés (limite de
+# taille d'un tsvector): la recherche ne trouve pas un mot qui n'apparaît qu'au-delà.
+import os
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import and_, func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.database import ilike_contains
+from app.core.admission import TokenBucket
+from app.core.storage import storage_backend
+from app.core.tenant import TenantMoving, shard_router
+from . import models, text
+
+EXTRACTION_ENABLED = os.getenv("EXTRACTION_ENABLED", "true").lower() == "true"
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_QUEUE_LIMIT = int(os.getenv("EXTRACTION_QUEUE_LIMIT", "500"))
+EXTRACTION_MAX_BYTES = int(os.getenv("EXTRACTION_MAX_BYTES", str(200 * 1024 * 1024)))
+EXTRACTION_MAX_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", "1000000"))
+EXTRACTION_MAX_ATTEMPTS = int(os.getenv("EXTRACTION_MAX_ATTEMPTS", "4"))
+EXTRACTION_RETRY_DELAY = float(os.getenv("EXTRACTION_RETRY_DELAY", "30"))  # Doublé à chaque tentative
+EXTRACTION_TENANT_RATE = float(os.getenv("EXTRACTION_TENANT_RATE", "2"))  # Documents/seconde par tenant
+EXTRACTION_TENANT_BURST = int(os.getenv("EXTRACTION_TENANT_BURST", "10"))
+EXTRACTION_SWEEP_INTERVAL = float(os.getenv("EXTRACTION_SWEEP_INTERVAL", "30"))
+EXTRACTION_LEASE = float(os.getenv("EXTRACTION_LEASE", "600"))  # Secondes réservées au process qui extrait
+
+PENDING, READY, FAILED, UNSUPPORTED = "pending", "ready", "failed", "unsupported"
+
+Job = namedtuple("Job", "tenant_id document_id version file_path mime_type")
+
+extraction_queue = Gauge(
+    'workos_document_extraction_queue',
+    'Documents queued or being extracted in this process',
+    multiprocess_mode='livesum'
+)
+
+extraction_backlog = Gauge(
+    'workos_document_extraction_backlog',
+    'Pending document texts across shards (last sweep)',
+    multiprocess_mode='livemax'
+)
+
+extraction_seconds = Histogram(
+    'workos_document_extraction_seconds',
+    'Text extraction duration (read + parse), by MIME type',
+    ['mime_type'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+)
+
+extraction_jobs = Counter(
+    'workos_document_extraction_jobs_total',
+    'Text extraction jobs by outcome',
+    ['result']  # extracted, retried, failed, unsupported, stale, dropped, deferred
+)
+
+def initial_status(mime_type: Optional[str], file_size: Optional[int]) -> str:
+    if not EXTRACTION_ENABLED or not text.supports(mime_type) or (file_size or 0) > EXTRACTION_MAX_BYTES:
+        return UNSUPPORTED
+    return PENDING
+
+def _insert(db):
+    # ON CONFLICT: Postgres en production, SQLite pour les bancs d'essai locaux
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+
+def content_match(db, query: str):
+    """Condition sur DocumentText.content: plein texte sur Postgres (index GIN), LIKE ailleurs"""
+    content = models.DocumentText.content
+    if db.bind.dialect.name == "postgresql":
+        return models.search_vector(content).op("@@")(
+            func.plainto_tsquery(literal_column("'simple'"), query)
+        )
+    return ilike_contains(content, query)
+
+def backfill_texts(db, batch_size: int = 5000) -> int:
+    """Lignes document_texts des documents antérieurs à l'extraction (reprises ensuite par le sweep)
+
+    Parcours unique de documents par id croissant, un lot validé à la fois; sans effet
+    sur les documents qui ont déjà leur ligne. Retourne le nombre de lignes ajoutées.
+    """
+    Document, DocumentText = models.Document, models.DocumentText
+    added = last_id = 0
+    while True:
+        documents = db.execute(
+            select(Document.id, Document.tenant_id, Document.version, Document.mime_type, Document.file_size,
+                   DocumentText.id)
+            .outerjoin(DocumentText, DocumentText.document_id == Document.id)
+            .where(Document.id > last_id)
+            .order_by(Document.id)
+            .limit(batch_size)
+        ).all()
+        if not documents:
+            return added
+        last_id = documents[-1][0]
+        now = datetime.utcnow()
+        rows = [{
+            "document_id": document_id, "tenant_id": tenant_id, "version": version or 1,
+            "status": initial_status(mime_type, file_size), "attempts": 0,
+            "created_at": now, "updated_at": now,
+        } for document_id, tenant_id, version, mime_type, file_size, text_id in documents if text_id is None]
+        if rows:
+            stmt = _insert(db)(DocumentText.__table__).on_conflict_do_nothing(index_elements=["document_id"])
+            db.execute(stmt, rows)
+            db.commit()
+            added += len(rows)
+
+class TextExtractionPipeline:
+    def __init__(self, workers: int = EXTRACTION_WORKERS, queue_limit: int = EXTRACTION_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._condition = threading.Condition()
+        self._queues = OrderedDict()  # tenant_id -> deque de Job, parcourus à tour de rôle
+        self._jobs = set()  # (tenant_id, document_id, version) en file ou en cours
+        self._buckets = {}
+        self._running = 0
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._next_sweep = 0.0
+
+    # === ÉCRITURES DES ROUTES ===
+
+    def track(self, db, document):
+        """Dans la transaction de la route: texte du document (nouveau ou nouvelle version) à extraire.
+
+        Le texte précédent reste cherchable jusqu'à l'extraction de la nouvelle version.
+        """
+        status = initial_status(document.mime_type, document.file_size)
+        row = db.query(models.DocumentText).filter_by(document_id=document.id).first() if document.id else None
+        if row is None:
+            row = models.DocumentText(document=document, tenant_id=document.tenant_id)
+            db.add(row)
+        row.version = document.version or 1
+        row.status = status
+        row.attempts = 0
+        row.error = None
+        # Bail du process de la requête, qui soumet le document après le commit
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=EXTRACTION_LEASE) if status == PENDING else None
+
+    def submit(self, tenant_id: str, document) -> bool:
+        """Non bloquant; False si le document n'est pas mis en file (le rattrapage le reprendra)"""
+        if not EXTRACTION_ENABLED or initial_status(document.mime_type, document.file_size) != PENDING:
+            return False
+        job = Job(tenant_id, document.id, document.version or 1, document.file_path, document.mime_type)
+        return self._enqueue(job)
+
+    def _enqueue(self, job: Job) -> bool:
+        key = job[:3]
+        with self._condition:
+            if key in self._jobs:
+                return True
+            if len(self._jobs) >= self.queue_limit:
+                extraction_jobs.labels(result="dropped").inc()
+                return False
+            self._start()
+            self._jobs.add(key)
+            self._queues.setdefault(job.tenant_id, deque()).append(job)
+            extraction_queue.inc()
+            self._condition.notify()
+        return True
+
+    # === RÉPARTITION ===
+
+    def start(self):
+        if EXTRACTION_ENABLED:
+            with self._condition:
+                self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="document-text")
+            self._thread = threading.Thread(target=self._dispatch, name="document-text-dispatcher", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._thread = self._executor = None
+
+    def _bucket(self, tenant_id: str) -> TokenBucket:
+        bucket = self._buckets.get(tenant_id)
+        if bucket is None:
+            bucket = self._buckets[tenant_id] = TokenBucket(EXTRACTION_TENANT_RATE, EXTRACTION_TENANT_BURST)
+        return bucket
+
+    def _next_job(self):
+        """(job, None) ou (None, attente avant le prochain jeton d'un tenant); verrou tenu"""
+        if self._running >= self.workers:
+            return None, None
+        wait = None
+        for tenant_id in list(self._queues):
+            delay = self._bucket(tenant_id).try_acquire()
+            if delay:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            queue = self._queues[tenant_id]
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(tenant_id)
+            else:
+                del self._queues[tenant_id]
+            return job, None
+        return None, wait
+
+    def _dispatch(self):
+        while not self._stop.is_set():
+            if time.monotonic() >= self._next_sweep:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error in document text sweep: {e}")
+                self._next_sweep = time.monotonic() + EXTRACTION_SWEEP_INTERVAL
+
+            with self._condition:
+                job, wait = self._next_job()
+                if job is None:
+                    until_sweep = self._next_sweep - time.monotonic()
+                    self._condition.wait(max(min(wait or until_sweep, until_sweep), 0.01))
+                    continue
+                self._running += 1
+            self._executor.submit(self._run, job)
+
+    # === EXTRACTION ===
+
+    def _run(self, job: Job):
+        start = time.perf_counter()
+        try:
+            try:
+                with storage_backend.open_file(job.file_path) as stream:
+                    result = text.extract(stream, job.mime_type, EXTRACTION_MAX_CHARS)
+                extraction_seconds.labels(mime_type=job.mime_type).observe(time.perf_counter() - start)
+                self._store(job, result)
+            except text.UnsupportedText:
+                self._update(job, status=UNSUPPORTED, next_attempt_at=None)
+                extraction_jobs.labels(result="unsupported").inc()
+            except TenantMoving:
+                raise
+            except Exception as e:
+                print(f"Text extraction failed for document {job.document_id} (tenant {job.tenant_id}): {e}")
+                self._retry(job, e)
+        except TenantMoving:
+            # Tenant gelé par un déplacement: le bail expire, la ligne copiée est reprise sur son shard
+            extraction_jobs.labels(result="deferred").inc()
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._jobs.discard(job[:3])
+                extraction_queue.dec()
+                self._condition.notify()
+
+    def _update(self, job: Job, *conditions, **values) -> int:
+        """UPDATE de la ligne si elle porte toujours la version extraite (sinon le résultat est jeté)"""
+        DocumentText = models.DocumentText
+        db = shard_router.sessionmaker(shard_router.writable_shard(job.tenant_id))()
+        try:
+            updated = db.execute(
+                update(DocumentText).where(
+                    DocumentText.document_id == job.document_id,
+                    DocumentText.tenant_id == job.tenant_id,
+                    DocumentText.version == job.version,
+                    *conditions
+                ).values(updated_at=datetime.utcnow(), **values).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        return updated
+
+    def _store(self, job: Job, result: dict):
+        updated = self._update(
+            job,
+            status=READY,
+            next_attempt_at=None,
+            error=None,
+            content=result["content"],
+            char_count=result["char_count"],
+            page_count=result["page_count"],
+            truncated=result["truncated"]
+        )
+        extraction_jobs.labels(result="extracted" if updated else "stale").inc()
+
+    def _retry(self, job: Job, error: Exception):
+        DocumentText = models.DocumentText
+        db = shard_router.session_for(job.tenant_id)
+        try:
+            attempts = db.execute(
+                select(DocumentText.attempts).where(
+                    DocumentText.document_id == job.document_id,
+                    DocumentText.tenant_id == job.tenant_id,
+                    DocumentText.version == job.version
+                )
+            ).scalar()
+        finally:
+            db.close()
+        if attempts is None:
+            return
+
+        attempts += 1
+        if attempts >= EXTRACTION_MAX_ATTEMPTS:
+            status, next_attempt_at = FAILED, None
+        else:
+            status = PENDING
+            next_attempt_at = datetime.utcnow() + timedelta(seconds=EXTRACTION_RETRY_DELAY * 2 ** (attempts - 1))
+        self._update(
+            job,
+            DocumentText.attempts == attempts - 1,
+            status=status,
+            attempts=attempts,
+            next_attempt_at=next_attempt_at,
+            error=str(error)[:500]
+        )
+        extraction_jobs.labels(result="failed" if status == FAILED else "retried").inc()
+
+    # === RATTRAPAGE ===
+
+    def sweep(self) -> int:
+        """Réclame sur chaque shard les textes en attente arrivés à échéance; retourne le nombre mis en file"""
+        queued = backlog = 0
+        for shard in shard_router.shards():
+            db = shard_router.sessionmaker(shard)()
+            try:
+                backlog += db.execute(
+                    select(func.count()).select_from(models.DocumentText).where(models.DocumentText.status == PENDING)
+                ).scalar()
+                for job in self._claim(db, shard):
+                    queued += self._enqueue(job)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        extraction_backlog.set(backlog)
+        return queued
+
+    def _capacity(self) -> int:
+        with self._condition:
+            return self.queue_limit - len(self._jobs)
+
+    def _claim(self, db, shard: str):
+        Document, DocumentText = models.Document, models.DocumentText
+        capacity = self._capacity()
+        if capacity <= 0:
+            return []
+        now = datetime.utcnow()
+        due = and_(
+            DocumentText.status == PENDING,
+            or_(DocumentText.next_attempt_at.is_(None), DocumentText.next_attempt_at <= now)
+        )
+        ids = db.execute(
+            select(DocumentText.id).where(due).order_by(DocumentText.next_attempt_at.nullsfirst()).limit(capacity)
+        ).scalars().all()
+        if not ids:
+            return []
+
+        # Bail posé par un UPDATE conditionnel: les lignes réclamées entre-temps par un autre process sont exclues
+        claimed = db.execute(
+            update(DocumentText)
+            .where(DocumentText.id.in_(ids), due)
+            .values(next_attempt_at=now + timedelta(seconds=EXTRACTION_LEASE))
+            .returning(DocumentText.document_id, DocumentText.version)
+        ).all()
+        db.commit()
+
+        versions = dict(claimed)
+        jobs = []
+        for document_id, tenant_id, file_path, mime_type in db.execute(
+            select(Document.id, Document.tenant_id, Document.file_path, Document.mime_type)
+            .where(Document.id.in_(list(versions)))
+        ).all():
+            # Lignes restées sur un ancien shard après un déplacement, tenant gelé: ignorées
+            if shard_router.resolve(tenant_id) == (shard, False):
+                jobs.append(Job(tenant_id, document_id, versions[document_id], file_path, mime_type))
+        return jobs
+
+text_extraction = TextExtractionPipeline()
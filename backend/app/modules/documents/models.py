@@ -1,12 +1,24 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, BigInteger
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, BigInteger, Index, UniqueConstraint, Text, func, literal_column
 from sqlalchemy.orm import relationship
 from app.core.models import BaseModel
 
 class Folder(BaseModel):
     __tablename__ = "folders"  # Correction: double underscore
+    __table_args__ = (
+        # Requêtes de sous-arbre: path LIKE '/1/5/%'
+        Index("ix_folders_tenant_path", "tenant_id", "path", postgresql_ops={"path": "text_pattern_ops"}),
+    )
     
     name = Column(String(255), nullable=False)
     parent_id = Column(Integer, ForeignKey("folders.id"))
+    
+    # Chemin matérialisé des ids ancêtres, dossier inclus: "/1/5/12/"
+    path = Column(String(1000), nullable=False, default="/")
+    depth = Column(Integer, nullable=False, default=0)  # 0 = dossier racine
+    
+    # Cumuls récursifs (sous-arbre inclus), maintenus par deltas sur la chaîne d'ancêtres
+    total_size = Column(BigInteger, nullable=False, default=0)
+    document_count = Column(Integer, nullable=False, default=0)
     description = Column(String(500))
     is_shared = Column(Boolean, default=False)
     created_by = Column(Integer, ForeignKey("contacts.id"), nullable=False)
@@ -17,6 +29,9 @@ class Folder(BaseModel):
 
 class Document(BaseModel):
     __tablename__ = "documents"  # Correction: double underscore
+    __table_args__ = (
+        Index("ix_documents_tenant_folder", "tenant_id", "folder_id"),
+    )
     
     name = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)  # Chemin GCS
@@ -28,12 +43,22 @@ class Document(BaseModel):
     is_public = Column(Boolean, default=False)
     download_count = Column(Integer, default=0)
     
+    # Aperçus générés en arrière-plan (previews.py): pending, ready, failed, unsupported
+    preview_status = Column(String(20))
+    preview_version = Column(Integer)  # Version du document rendue dans les aperçus
+    thumbnail_path = Column(String(500))
+    preview_path = Column(String(500))
+    
     # Relations
     folder = relationship("Folder")
     uploader = relationship("Contact", foreign_keys=[uploaded_by])
 
 class DocumentShare(BaseModel):
     __tablename__ = "document_shares"  # Correction: double underscore
+    __table_args__ = (
+        # "Partagés avec moi" et résolution des ACL par contact
+        Index("ix_document_shares_tenant_shared_with_document", "tenant_id", "shared_with", "document_id"),
+    )
     
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
     shared_with = Column(Integer, ForeignKey("contacts.id"), nullable=False)
@@ -45,8 +70,21 @@ class DocumentShare(BaseModel):
     contact = relationship("Contact", foreign_keys=[shared_with])
     sharer = relationship("Contact", foreign_keys=[shared_by])
 
+class DocumentACLGeneration(BaseModel):
+    """Génération des droits d'un tenant, incrémentée dans la transaction de tout changement
+    de partage: les caches d'ACL des process (permissions.py) comparent la leur à celle-ci"""
+    __tablename__ = "document_acl_generations"
+    __table_args__ = (
+        UniqueConstraint("tenant_id", name="uq_document_acl_generations_tenant"),
+    )
+    
+    generation = Column(BigInteger, nullable=False, default=0)
+
 class DocumentVersion(BaseModel):
     __tablename__ = "document_versions"  # Correction: double underscore
+    __table_args__ = (
+        UniqueConstraint("document_id", "version_number", name="uq_document_versions_document_number"),
+    )
     
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
     version_number = Column(Integer, nullable=False)
@@ -54,6 +92,52 @@ class DocumentVersion(BaseModel):
     uploaded_by = Column(Integer, ForeignKey("contacts.id"), nullable=False)
     change_notes = Column(String(500))
     
+    # Stockage: "full" = contenu complet, "delta" = delta binaire contre la version précédente
+    storage_kind = Column(String(10), nullable=False, default="full")
+    file_size = Column(BigInteger)  # Taille reconstruite en bytes
+    stored_size = Column(BigInteger)  # Taille réellement stockée
+    mime_type = Column(String(100))
+    
+    # Relations
+    document = relationship("Document")
+    uploader = relationship("Contact", foreign_keys=[uploaded_by])
+
+# Caractères indexés pour la recherche plein texte: Postgres refuse un tsvector de plus
+# de 1 Mo, atteint bien avant EXTRACTION_MAX_CHARS sur un texte riche en mots distincts
+SEARCH_INDEX_CHARS = 100000
+
+def search_vector(content):
+    """Expression de l'index GIN, à reprendre telle quelle dans les requêtes pour qu'il serve"""
+    return func.to_tsvector(literal_column("'simple'"), func.left(content, literal_column(str(SEARCH_INDEX_CHARS))))
+
+class DocumentText(BaseModel):
+    """Texte extrait d'un document (extraction.py); table à part: listes et exports ne le chargent pas"""
+    __tablename__ = "document_texts"
+    __table_args__ = (
+        # Recherche plein texte (Postgres): to_tsvector('simple', left(content, N)) @@ plainto_tsquery(...)
+        Index(
+            "ix_document_texts_search_prefix",
+            search_vector(literal_column("content")),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        # Reprises et rattrapage: textes en attente dont l'échéance est passée
+        Index("ix_document_texts_status_next_attempt", "status", "next_attempt_at"),
+    )
+    
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, unique=True)
+    version = Column(Integer, nullable=False)  # Version du document à extraire / extraite
+    
+    # pending, ready, failed, unsupported
+    status = Column(String(20), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Pending: prochaine tentative (ou fin du bail du process qui la traite)
+    next_attempt_at = Column(DateTime)
+    error = Column(String(500))
+    
+    content = Column(Text)
+    char_count = Column(Integer)
+    page_count = Column(Integer)  # PDF uniquement
+    truncated = Column(Boolean, default=False)  # Texte coupé à EXTRACTION_MAX_CHARS
+    
     # Relations
     document = relationship("Document")
-    uploader = relationship("Contact", foreign_keys=[uploaded_by])
\ No newline at end of file
@@ -0,0 +1,165 @@
+# app/modules/documents/permissions.py
+# Résolution groupée des droits sur les documents, avec cache par tenant
+#
+# Le cache est local au process. Chaque changement de droits (partage, révocation,
+# suppression) incrémente la génération du tenant en base, dans sa transaction: une
+# résolution relit cette génération (une ligne) et ignore les entrées d'une autre
+# génération, dans tous les workers. La génération lue avant le chargement des droits
+# est attachée aux entrées: un chargement antérieur à une révocation n'est jamais servi.
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import Depends
+from prometheus_client import Counter
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.tenant import get_tenant_db
+from . import models
+
+PERMISSION_LEVELS = {"read": 1, "write": 2, "admin": 3}
+
+# Durée de vie des entrées d'un tenant (mémoire), la génération garantit la fraîcheur
+ACL_CACHE_TTL = 60
+ACL_CACHE_MAX_ENTRIES = 50000
+
+acl_cache_lookups = Counter(
+    'workos_document_acl_cache_total',
+    'Document ACL cache lookups',
+    ['result']
+)
+
+def max_permission(*permissions: Optional[str]) -> Optional[str]:
+    granted = [p for p in permissions if p in PERMISSION_LEVELS]
+    return max(granted, key=PERMISSION_LEVELS.get) if granted else None
+
+def _insert(db):
+    # ON CONFLICT: Postgres en production, SQLite pour les bancs d'essai locaux
+    return sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+
+def acl_generation(db: Session, tenant_id: str) -> int:
+    generation = db.query(models.DocumentACLGeneration.generation).filter_by(tenant_id=tenant_id).scalar()
+    return generation or 0
+
+def bump_acl_generation(db: Session, tenant_id: str):
+    """À appeler dans la transaction qui modifie les droits du tenant, avant son commit"""
+    table = models.DocumentACLGeneration.__table__
+    now = datetime.utcnow()
+    statement = _insert(db)(table).values(tenant_id=tenant_id, generation=1, created_at=now, updated_at=now)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.tenant_id],
+        set_={"generation": table.c.generation + 1, "updated_at": now}
+    ))
+
+class TenantACLCache:
+    """ACL résolues par tenant: {(contact_id, document_id): permission}, pour une génération"""
+
+    def __init__(self, ttl: int = ACL_CACHE_TTL, max_entries: int = ACL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._tenants = {}  # tenant_id -> (expires_at, génération, entries)
+        self._lock = threading.Lock()
+
+    def get_many(self, tenant_id: str, keys: Iterable[tuple], generation: int) -> Dict[tuple, Optional[str]]:
+        with self._lock:
+            cached = self._tenants.get(tenant_id)
+            if not cached or cached[0] < time.monotonic() or cached[1] != generation:
+                self._tenants.pop(tenant_id, None)
+                return {}
+            entries = cached[2]
+            return {key: entries[key] for key in keys if key in entries}
+
+    def set_many(self, tenant_id: str, values: Dict[tuple, Optional[str]], generation: int):
+        """generation: lue avant le chargement des valeurs; plus ancienne que celle du cache, écriture ignorée"""
+        with self._lock:
+            cached = self._tenants.get(tenant_id)
+            if cached and cached[0] >= time.monotonic() and cached[1] > generation:
+                return
+            if not cached or cached[0] < time.monotonic() or cached[1] != generation:
+                cached = (time.monotonic() + self.ttl, generation, {})
+                self._tenants[tenant_id] = cached
+            entries = cached[2]
+            if len(entries) + len(values) > self.max_entries:
+                entries.clear()
+            entries.update(values)
+
+    def invalidate(self, tenant_id: str):
+        """Libère les entrées du tenant (les autres process les écartent à la génération suivante)"""
+        with self._lock:
+            self._tenants.pop(tenant_id, None)
+
+acl_cache = TenantACLCache()
+
+class DocumentPermissionResolver:
+    """Résout read/write/admin pour une page de documents en deux requêtes au plus.
+
+    Règles: l'auteur de l'upload est admin, un document public est lisible par tous,
+    sinon la permission la plus forte parmi les partages s'applique.
+    """
+
+    def __init__(self, db: Session, cache: TenantACLCache = acl_cache):
+        self.db = db
+        self.cache = cache
+
+    def resolve(self, tenant_id: str, contact_id: int, document_ids: List[int]) -> Dict[int, Optional[str]]:
+        keys = [(contact_id, document_id) for document_id in set(document_ids)]
+        # Avant le chargement: une révocation validée entre-temps rend ces valeurs inutilisables
+        generation = acl_generation(self.db, tenant_id)
+        cached = self.cache.get_many(tenant_id, keys, generation)
+        acl_cache_lookups.labels(result="hit").inc(len(cached))
+
+        missing = [document_id for (_, document_id) in keys if (contact_id, document_id) not in cached]
+        resolved = {document_id: cached[(contact_id, document_id)] for (_, document_id) in cached}
+
+        if missing:
+            acl_cache_lookups.labels(result="miss").inc(len(missing))
+            fresh = self._load(tenant_id, contact_id, missing)
+            resolved.update(fresh)
+            self.cache.set_many(tenant_id, {
+                (contact_id, document_id): permission for document_id, permission in fresh.items()
+            }, generation)
+
+        return resolved
+
+    def has_permission(self, tenant_id: str, contact_id: int, document_id: int, permission: str) -> bool:
+        granted = self.resolve(tenant_id, contact_id, [document_id]).get(document_id)
+        return granted is not None and PERMISSION_LEVELS[granted] >= PERMISSION_LEVELS[permission]
+
+    def _load(self, tenant_id: str, contact_id: int, document_ids: List[int]) -> Dict[int, Optional[str]]:
+        documents = self.db.query(
+            models.Document.id,
+            models.Document.uploaded_by,
+            models.Document.is_public
+        ).filter(
+            models.Document.tenant_id == tenant_id,
+            models.Document.id.in_(document_ids)
+        ).all()
+
+        shares = self.db.query(
+            models.DocumentShare.document_id,
+            models.DocumentShare.permission
+        ).filter(
+            models.DocumentShare.tenant_id == tenant_id,
+            models.DocumentShare.shared_with == contact_id,
+            models.DocumentShare.document_id.in_(document_ids)
+        ).all()
+
+        shared = {}
+        for document_id, permission in shares:
+            shared[document_id] = max_permission(shared.get(document_id), permission)
+
+        result = {document_id: None for document_id in document_ids}
+        for document_id, uploaded_by, is_public in documents:
+            result[document_id] = max_permission(
+                "admin" if uploaded_by == contact_id else None,
+                "read" if is_public else None,
+                shared.get(document_id)
+            )
+
+        return result
+
+def get_permission_resolver(db: Session = Depends(get_tenant_db)) -> DocumentPermissionResolver:
+    return DocumentPermissionResolver(db)
@@ -0,0 +1,195 @@
+# app/modules/documents/previews.py
+# Aperçus des documents générés hors du chemin des requêtes
+#
+# Après un upload (direct ou confirmé) et après chaque nouvelle version, submit()
+# rend la main tout de suite. Un thread du pool "document-preview" confie le rendu
+# à un processus (render.render, ProcessPoolExecutor en spawn: pas de fork d'un
+# process qui a des threads et des connexions ouvertes), enregistre les images à
+# côté du document (storage_backend) puis met à jour la ligne si la version rendue
+# est toujours la version courante (sinon le rendu est jeté).
+#
+# Concurrence bornée: PREVIEW_WORKERS rendus simultanés, PREVIEW_QUEUE_LIMIT rendus
+# en attente au plus. File pleine: la demande est abandonnée, le document reste
+# "pending" et son rendu est relancé à la première consultation de l'aperçu.
+# Même chose si le tenant est gelé par un déplacement de shard au moment d'écrire.
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import select, update
+
+from app.core.storage import storage_backend
+from app.core.tenant import TenantMoving, shard_router
+from . import models, render
+
+PREVIEW_ENABLED = os.getenv("PREVIEW_ENABLED", "true").lower() == "true"
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", "2"))
+PREVIEW_QUEUE_LIMIT = int(os.getenv("PREVIEW_QUEUE_LIMIT", "200"))
+PREVIEW_MAX_BYTES = int(os.getenv("PREVIEW_MAX_BYTES", str(50 * 1024 * 1024)))
+
+PENDING, READY, FAILED, UNSUPPORTED = "pending", "ready", "failed", "unsupported"
+
+preview_queue_depth = Gauge(
+    'workos_preview_queue_depth',
+    'Document previews waiting for or being rendered',
+    multiprocess_mode='livesum'
+)
+
+preview_render_seconds = Histogram(
+    'workos_preview_render_seconds',
+    'Preview render duration in the worker process (read + decode + encode)',
+    ['kind'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+preview_jobs = Counter(
+    'workos_preview_jobs_total',
+    'Preview jobs by outcome',
+    ['result']  # rendered, failed, unsupported, stale, dropped, deferred
+)
+
+def initial_status(mime_type: str, file_size: int) -> str:
+    """Statut à l'enregistrement du document (aucun rendu tenté pour un type non pris en charge)"""
+    if not PREVIEW_ENABLED or not render.supports(mime_type) or (file_size or 0) > PREVIEW_MAX_BYTES:
+        return UNSUPPORTED
+    return PENDING
+
+def _kind(mime_type: str) -> str:
+    return "pdf" if mime_type in render.PDF_TYPES else "image"
+
+class PreviewPipeline:
+    def __init__(self, workers: int = PREVIEW_WORKERS, queue_limit: int = PREVIEW_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._lock = threading.Lock()
+        self._jobs = set()  # (tenant_id, document_id, version) en attente ou en cours
+        self._threads = None
+        self._processes = None
+
+    def _start(self):
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="document-preview")
+            self._processes = self._process_pool()
+
+    def _process_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _replace_broken(self, broken):
+        # Un processus tué (mémoire, signal) rend le pool inutilisable: remplacé pour les rendus suivants
+        with self._lock:
+            if self._processes is broken:
+                self._processes = self._process_pool()
+                broken.shutdown(wait=False, cancel_futures=True)
+
+    def in_flight(self, tenant_id: str, document_id: int, version: int) -> bool:
+        return (tenant_id, document_id, version) in self._jobs
+
+    def submit(self, tenant_id: str, document) -> bool:
+        """Non bloquant; False si le rendu n'a pas été mis en file (désactivé ou file pleine)"""
+        if document.preview_status != PENDING:
+            return False
+        key = (tenant_id, document.id, document.version)
+        with self._lock:
+            if key in self._jobs:
+                return True
+            if len(self._jobs) >= self.queue_limit:
+                preview_jobs.labels(result="dropped").inc()
+                return False
+            self._start()
+            self._jobs.add(key)
+            preview_queue_depth.inc()
+        self._threads.submit(self._run, key, document.file_path, document.mime_type)
+        return True
+
+    def _run(self, key, file_path: str, mime_type: str):
+        tenant_id, document_id, version = key
+        processes = self._processes
+        try:
+            try:
+                result = processes.submit(render.render, file_path, mime_type).result()
+                preview_render_seconds.labels(kind=_kind(mime_type)).observe(result["seconds"])
+                self._store(tenant_id, document_id, version, result)
+            except render.UnsupportedPreview:
+                self._set_status(tenant_id, document_id, version, UNSUPPORTED)
+                preview_jobs.labels(result="unsupported").inc()
+            except TenantMoving:
+                raise
+            except Exception as e:
+                print(f"Preview failed for document {document_id} (tenant {tenant_id}): {e}")
+                if isinstance(e, BrokenProcessPool):
+                    self._replace_broken(processes)
+                self._set_status(tenant_id, document_id, version, FAILED)
+                preview_jobs.labels(result="failed").inc()
+        except TenantMoving:
+            # Document resté "pending": rendu relancé à la première consultation après le déplacement
+            preview_jobs.labels(result="deferred").inc()
+        finally:
+            with self._lock:
+                self._jobs.discard(key)
+                preview_queue_depth.dec()
+
+    def _store(self, tenant_id: str, document_id: int, version: int, result: dict):
+        Document = models.Document
+        # Vérifié avant d'enregistrer les images: pas de fichiers orphelins si le tenant est gelé
+        shard = shard_router.writable_shard(tenant_id)
+        thumbnail_path, _ = storage_backend.save_file(result["thumbnail"], tenant_id, "thumbnail.webp")
+        preview_path, _ = storage_backend.save_file(result["preview"], tenant_id, "preview.webp")
+
+        db = shard_router.sessionmaker(shard)()
+        try:
+            previous = db.execute(
+                select(Document.thumbnail_path, Document.preview_path).where(
+                    Document.id == document_id, Document.tenant_id == tenant_id
+                )
+            ).first()
+            # Version courante uniquement: un rendu d'une version remplacée entre-temps est jeté
+            updated = db.execute(
+                update(Document).where(
+                    Document.id == document_id,
+                    Document.tenant_id == tenant_id,
+                    Document.version == version
+                ).values(
+                    preview_status=READY,
+                    preview_version=version,
+                    thumbnail_path=thumbnail_path,
+                    preview_path=preview_path
+                ).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+
+        if updated:
+            obsolete = [path for path in (previous or ()) if path]
+            preview_jobs.labels(result="rendered").inc()
+        else:
+            obsolete = [thumbnail_path, preview_path]
+            preview_jobs.labels(result="stale").inc()
+        for path in obsolete:
+            storage_backend.delete_file(path)
+
+    def _set_status(self, tenant_id: str, document_id: int, version: int, status: str):
+        Document = models.Document
+        db = shard_router.sessionmaker(shard_router.writable_shard(tenant_id))()
+        try:
+            db.execute(
+                update(Document).where(
+                    Document.id == document_id,
+                    Document.tenant_id == tenant_id,
+                    Document.version == version
+                ).values(preview_status=status).execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def close(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._threads = self._processes = None
+
+preview_pipeline = PreviewPipeline()
@@ -0,0 +1,85 @@
+# app/modules/documents/render.py
+# Rendu des aperçus: vignette et aperçu de la première page (WebP)
+#
+# Exécuté dans les processus du pool de previews.py. Module volontairement léger:
+# chaque processus lancé (spawn) l'importe sans charger l'application, SQLAlchemy
+# ni prometheus_client. Images: Pillow, avec décodage réduit (draft) pour les JPEG;
+# PDF: première page rastérisée par pdftoppm (poppler-utils), sans lui les PDF
+# n'ont pas d'aperçu.
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from PIL import Image, ImageOps
+
+from app.core.storage import storage_backend
+
+THUMBNAIL_SIZE = (256, 256)
+PREVIEW_SIZE = (1024, 1024)
+WEBP_QUALITY = 80
+PDF_TIMEOUT = 30  # Secondes par page rastérisée
+
+# Au-delà, Pillow refuse l'image (bombe de décompression)
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff"}
+PDF_TYPES = {"application/pdf"}
+
+class UnsupportedPreview(Exception):
+    pass
+
+def supports(mime_type: str) -> bool:
+    if mime_type in PDF_TYPES:
+        return shutil.which("pdftoppm") is not None
+    return mime_type in IMAGE_TYPES
+
+def _open_image(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", PREVIEW_SIZE)  # JPEG: décodage directement à une échelle proche de l'aperçu
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        transparent = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if transparent else "RGB")
+    return image
+
+def _open_pdf_page(data: bytes) -> Image.Image:
+    with tempfile.TemporaryDirectory(prefix="preview-") as workdir:
+        source = os.path.join(workdir, "source.pdf")
+        with open(source, "wb") as f:
+            f.write(data)
+        subprocess.run(
+            ["pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-png",
+             "-scale-to", str(max(PREVIEW_SIZE)), source, os.path.join(workdir, "page")],
+            check=True, capture_output=True, timeout=PDF_TIMEOUT
+        )
+        image = Image.open(os.path.join(workdir, "page.png"))
+        image.load()
+        return image
+
+def _encode(image: Image.Image, size) -> bytes:
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, "WEBP", quality=WEBP_QUALITY)
+    return buffer.getvalue()
+
+def render(storage_path: str, mime_type: str) -> dict:
+    """{"thumbnail", "preview": octets WebP, "seconds": durée du rendu}"""
+    start = time.perf_counter()
+    data = storage_backend.read_file(storage_path)
+    if mime_type in PDF_TYPES:
+        image = _open_pdf_page(data)
+    elif mime_type in IMAGE_TYPES:
+        image = _open_image(data)
+    else:
+        raise UnsupportedPreview(mime_type)
+
+    with image:
+        return {
+            "thumbnail": _encode(image, THUMBNAIL_SIZE),
+            "preview": _encode(image, PREVIEW_SIZE),
+            "seconds": time.perf_counter() - start,
+        }
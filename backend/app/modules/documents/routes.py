@@ -1,21 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, literal, select, String
+from starlette.concurrency import run_in_threadpool
+from prometheus_client import Counter
 from typing import List, Optional
+from datetime import datetime
+import os
 
-from app.core.database import get_db
+from app.core.database import ilike_contains
+from app.core.tenant import get_tenant_db
 from app.core.storage import storage_backend
+from app.core.export import ExportFormat, export_response, table_columns
+from app.core.jobs import job_queue
 from app.modules.contacts.models import Contact
 from . import models, schemas
+from .delta import make_delta, apply_delta
+from .permissions import DocumentPermissionResolver, get_permission_resolver, acl_cache, bump_acl_generation
+from .previews import preview_pipeline, initial_status, PENDING
+from .extraction import text_extraction, content_match
 
 router = APIRouter()
 
+@job_queue.handler("documents.delete_files", queue="storage")
+def _delete_files(job):
+    """Fichiers d'un document supprimé ou devenus orphelins (idempotent: un fichier absent est ignoré)"""
+    for path in job.payload["paths"]:
+        if not storage_backend.delete_file(path):
+            raise RuntimeError(f"Could not delete {path}")
+
+# Versionnement: une version complète toutes les N versions borne la reconstruction
+SNAPSHOT_INTERVAL = 10
+# Au-delà de ce ratio delta/contenu, stocker la version complète
+DELTA_MAX_RATIO = 0.8
+# make_delta est du Python pur (~1 s/Mo dans le pire cas) et garde le GIL même dans le
+# pool de threads: au-delà de cette taille, la version est stockée complète
+DELTA_MAX_BYTES = int(os.getenv("DOCUMENT_DELTA_MAX_BYTES", str(256 * 1024)))
+
+# Croissance du stockage des versions (octets reconstruits vs octets stockés)
+document_version_bytes = Counter(
+    'workos_document_version_bytes_total',
+    'Bytes written by document versions',
+    ['tenant_id', 'storage_kind', 'measure']
+)
+
 # === FOLDERS ===
 
 @router.get("/api/{tenant_id}/folders", response_model=List[schemas.FolderResponse])
 async def list_folders(
     tenant_id: str, 
     parent_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     query = db.query(models.Folder).filter_by(tenant_id=tenant_id).options(
         joinedload(models.Folder.creator)
@@ -33,7 +68,7 @@ async def list_folders(
 async def create_folder(
     tenant_id: str,
     folder: schemas.FolderCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier que creator existe
     creator = db.query(Contact).filter_by(
@@ -45,6 +80,7 @@ async def create_folder(
         raise HTTPException(status_code=404, detail="Creator not found")
     
     # Vérifier parent folder si spécifié
+    parent = None
     if folder.parent_id:
         parent = db.query(models.Folder).filter_by(
             id=folder.parent_id,
@@ -60,6 +96,12 @@ async def create_folder(
     )
     
     db.add(db_folder)
+    db.flush()  # Pour obtenir l'ID
+    
+    # Chemin matérialisé
+    db_folder.path = _child_path(parent, db_folder.id)
+    db_folder.depth = parent.depth + 1 if parent else 0
+    
     db.commit()
     db.refresh(db_folder)
     
@@ -74,7 +116,7 @@ async def create_folder(
 async def get_folder_contents(
     tenant_id: str,
     folder_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier que le dossier existe
     folder = db.query(models.Folder).filter_by(
@@ -108,13 +150,227 @@ async def get_folder_contents(
         "total_items": len(subfolders) + len(documents)
     }
 
+# === HIERARCHIE (chemin matérialisé) ===
+
+def _child_path(parent, folder_id: int) -> str:
+    return f"{parent.path if parent else '/'}{folder_id}/"
+
+def _path_ids(path: str) -> List[int]:
+    return [int(part) for part in path.strip("/").split("/") if part]
+
+def _propagate_folder_stats(db: Session, tenant_id: str, folder_ids: List[int], size_delta: int, count_delta: int):
+    """Applique un delta de taille/nombre de documents à une chaîne d'ancêtres en une requête"""
+    if not folder_ids or (not size_delta and not count_delta):
+        return
+    
+    db.query(models.Folder).filter(
+        models.Folder.tenant_id == tenant_id,
+        models.Folder.id.in_(folder_ids)
+    ).update({
+        models.Folder.total_size: models.Folder.total_size + size_delta,
+        models.Folder.document_count: models.Folder.document_count + count_delta
+    }, synchronize_session=False)
+
+def _get_folder(db: Session, tenant_id: str, folder_id: int, for_update: bool = False):
+    """Dossier du tenant ou 404
+    
+    for_update: verrouille la ligne et relit son chemin avant de propager des cumuls
+    (sinon un move_folder concurrent peut changer la chaîne d'ancêtres entre-temps).
+    """
+    query = db.query(models.Folder).filter_by(
+        id=folder_id,
+        tenant_id=tenant_id
+    )
+    if for_update:
+        query = query.with_for_update().populate_existing()
+    
+    folder = query.first()
+    
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    
+    return folder
+
+@router.put("/api/{tenant_id}/folders/{folder_id}/move", response_model=schemas.FolderResponse)
+async def move_folder(
+    tenant_id: str,
+    folder_id: int,
+    move: schemas.FolderMove,
+    db: Session = Depends(get_tenant_db)
+):
+    folder = db.query(models.Folder).filter_by(
+        id=folder_id,
+        tenant_id=tenant_id
+    ).with_for_update().first()
+    
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    
+    parent = None
+    if move.parent_id:
+        parent = db.query(models.Folder).filter_by(
+            id=move.parent_id,
+            tenant_id=tenant_id
+        ).with_for_update().first()
+        
+        if not parent:
+            raise HTTPException(status_code=404, detail="Parent folder not found")
+        
+        # Détection de cycle: le nouveau parent ne doit pas être dans le sous-arbre
+        if parent.path.startswith(folder.path):
+            raise HTTPException(status_code=400, detail="Cannot move a folder into its own subtree")
+    
+    old_path = folder.path
+    new_path = _child_path(parent, folder.id)
+    
+    # Déplacer les cumuls du sous-arbre de l'ancienne vers la nouvelle chaîne d'ancêtres
+    if new_path != old_path:
+        _propagate_folder_stats(db, tenant_id, _path_ids(old_path)[:-1], -folder.total_size, -folder.document_count)
+        _propagate_folder_stats(db, tenant_id, _path_ids(parent.path) if parent else [], folder.total_size, folder.document_count)
+    depth_delta = (parent.depth + 1 if parent else 0) - folder.depth
+    
+    # Réécrire le préfixe de tout le sous-arbre en une requête
+    if new_path != old_path:
+        db.query(models.Folder).filter(
+            models.Folder.tenant_id == tenant_id,
+            models.Folder.path.like(f"{old_path}%")
+        ).update({
+            models.Folder.path: literal(new_path, String) + func.substr(models.Folder.path, len(old_path) + 1),
+            models.Folder.depth: models.Folder.depth + depth_delta
+        }, synchronize_session=False)
+    
+    folder.parent_id = move.parent_id
+    db.commit()
+    
+    # Recharger avec relations
+    folder = db.query(models.Folder).options(
+        joinedload(models.Folder.creator)
+    ).filter_by(id=folder_id).first()
+    
+    return folder
+
+@router.delete("/api/{tenant_id}/folders/{folder_id}")
+async def delete_folder(
+    tenant_id: str,
+    folder_id: int,
+    db: Session = Depends(get_tenant_db)
+):
+    folder = _get_folder(db, tenant_id, folder_id)
+    
+    # Refuser si des documents restent dans le sous-arbre
+    has_documents = db.query(models.Document.id).join(models.Folder).filter(
+        models.Document.tenant_id == tenant_id,
+        models.Folder.path.like(f"{folder.path}%")
+    ).first()
+    
+    if has_documents:
+        raise HTTPException(status_code=400, detail="Folder subtree still contains documents")
+    
+    # Supprimer tout le sous-arbre, les plus profonds d'abord (FK parent_id)
+    subtree = db.query(models.Folder).filter(
+        models.Folder.tenant_id == tenant_id,
+        models.Folder.path.like(f"{folder.path}%")
+    ).order_by(models.Folder.depth.desc()).all()
+    
+    for subfolder in subtree:
+        db.delete(subfolder)
+        db.flush()
+    
+    db.commit()
+    
+    return {"message": "Folder deleted successfully", "deleted_folders": len(subtree)}
+
+@router.get("/api/{tenant_id}/folders/{folder_id}/breadcrumb", response_model=List[schemas.FolderResponse])
+async def get_folder_breadcrumb(
+    tenant_id: str,
+    folder_id: int,
+    db: Session = Depends(get_tenant_db)
+):
+    folder = _get_folder(db, tenant_id, folder_id)
+    
+    # Les ancêtres sont encodés dans le chemin: une seule requête par ids
+    ancestors = db.query(models.Folder).options(
+        joinedload(models.Folder.creator)
+    ).filter(
+        models.Folder.tenant_id == tenant_id,
+        models.Folder.id.in_(_path_ids(folder.path))
+    ).order_by(models.Folder.depth).all()
+    
+    return ancestors
+
+@router.get("/api/{tenant_id}/folders/{folder_id}/subtree", response_model=schemas.FolderSubtree)
+async def get_folder_subtree(
+    tenant_id: str,
+    folder_id: int,
+    db: Session = Depends(get_tenant_db)
+):
+    folder = _get_folder(db, tenant_id, folder_id)
+    
+    # Tous les descendants (ordre du chemin = parcours en profondeur)
+    folders = db.query(models.Folder).options(
+        joinedload(models.Folder.creator)
+    ).filter(
+        models.Folder.tenant_id == tenant_id,
+        models.Folder.path.like(f"{folder.path}%"),
+        models.Folder.id != folder.id
+    ).order_by(models.Folder.path).all()
+    
+    # Tous les documents du sous-arbre
+    documents = db.query(models.Document).join(
+        models.Folder, models.Document.folder_id == models.Folder.id
+    ).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.folder)
+    ).filter(
+        models.Document.tenant_id == tenant_id,
+        models.Folder.path.like(f"{folder.path}%")
+    ).order_by(models.Document.name).all()
+    
+    return {
+        "folder": folder,
+        "folders": folders,
+        "documents": documents
+    }
+
+def _name_or_content_match(db: Session, tenant_id: str, q: str):
+    """Nom du document ou texte extrait (document_texts)"""
+    return ilike_contains(models.Document.name, q) | models.Document.id.in_(
+        select(models.DocumentText.document_id).where(
+            models.DocumentText.tenant_id == tenant_id,
+            content_match(db, q)
+        )
+    )
+
+@router.get("/api/{tenant_id}/folders/{folder_id}/search", response_model=List[schemas.DocumentResponse])
+async def search_folder_subtree(
+    tenant_id: str,
+    folder_id: int,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, le=200),
+    db: Session = Depends(get_tenant_db)
+):
+    folder = _get_folder(db, tenant_id, folder_id)
+    
+    documents = db.query(models.Document).join(
+        models.Folder, models.Document.folder_id == models.Folder.id
+    ).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.folder)
+    ).filter(
+        models.Document.tenant_id == tenant_id,
+        models.Folder.path.like(f"{folder.path}%"),
+        _name_or_content_match(db, tenant_id, q)
+    ).order_by(models.Document.name).limit(limit).all()
+    
+    return documents
+
 # === DOCUMENTS ===
 
 @router.get("/api/{tenant_id}/documents", response_model=List[schemas.DocumentResponse])
 async def list_documents(
     tenant_id: str,
     folder_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     query = db.query(models.Document).filter_by(tenant_id=tenant_id).options(
         joinedload(models.Document.uploader),
@@ -127,6 +383,98 @@ async def list_documents(
     documents = query.order_by(models.Document.created_at.desc()).all()
     return documents
 
+@router.get("/api/{tenant_id}/documents/search", response_model=List[schemas.DocumentResponse])
+async def search_documents(
+    tenant_id: str,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, le=200),
+    db: Session = Depends(get_tenant_db)
+):
+    """Recherche sur le nom et le contenu extrait, documents les plus récents d'abord"""
+    documents = db.query(models.Document).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.folder)
+    ).filter(
+        models.Document.tenant_id == tenant_id,
+        _name_or_content_match(db, tenant_id, q)
+    ).order_by(models.Document.updated_at.desc()).limit(limit).all()
+    
+    return documents
+
+@router.get("/api/{tenant_id}/documents/export")
+async def export_documents(
+    tenant_id: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    folder_id: Optional[int] = Query(None),
+    uploaded_by: Optional[int] = Query(None),
+    mime_type: Optional[str] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    """Métadonnées uniquement (chemins de stockage du fichier et des aperçus exclus)"""
+    Document = models.Document
+    columns = table_columns(Document, exclude=("file_path", "thumbnail_path", "preview_path"))
+    query = select(*columns).where(Document.tenant_id == tenant_id)
+    if folder_id is not None:
+        query = query.where(Document.folder_id == folder_id)
+    if uploaded_by:
+        query = query.where(Document.uploaded_by == uploaded_by)
+    if mime_type:
+        query = query.where(Document.mime_type == mime_type)
+    if created_after:
+        query = query.where(Document.created_at >= created_after)
+    if created_before:
+        query = query.where(Document.created_at < created_before)
+    return export_response(db, query, "documents", format, gzip)
+
+@router.get("/api/{tenant_id}/documents/shared-with-me", response_model=List[schemas.SharedDocumentResponse])
+async def list_shared_with_me(
+    tenant_id: str,
+    contact_id: int = Query(...),
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_tenant_db)
+):
+    # Index (tenant_id, shared_with, document_id), pagination par id de partage
+    query = db.query(models.DocumentShare).options(
+        joinedload(models.DocumentShare.document).joinedload(models.Document.uploader),
+        joinedload(models.DocumentShare.document).joinedload(models.Document.folder)
+    ).filter(
+        models.DocumentShare.tenant_id == tenant_id,
+        models.DocumentShare.shared_with == contact_id
+    )
+    
+    if cursor:
+        query = query.filter(models.DocumentShare.id < cursor)
+    
+    shares = query.order_by(models.DocumentShare.id.desc()).limit(limit).all()
+    
+    return [
+        {
+            "share_id": share.id,
+            "permission": share.permission,
+            "shared_by": share.shared_by,
+            "shared_at": share.created_at,
+            "document": share.document
+        }
+        for share in shares
+    ]
+
+@router.post("/api/{tenant_id}/documents/permissions", response_model=schemas.PermissionCheckResponse)
+async def check_document_permissions(
+    tenant_id: str,
+    check: schemas.PermissionCheckRequest,
+    resolver: DocumentPermissionResolver = Depends(get_permission_resolver)
+):
+    permissions = resolver.resolve(tenant_id, check.contact_id, check.document_ids)
+    
+    return {
+        "contact_id": check.contact_id,
+        "permissions": permissions
+    }
+
 @router.post("/api/{tenant_id}/documents/upload", response_model=schemas.DocumentResponse)
 async def upload_document(
     tenant_id: str,
@@ -134,7 +482,7 @@ async def upload_document(
     folder_id: Optional[int] = Form(None),
     uploaded_by: int = Form(...),
     is_public: bool = Form(False),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier uploader
     uploader = db.query(Contact).filter_by(
@@ -146,14 +494,9 @@ async def upload_document(
         raise HTTPException(status_code=404, detail="Uploader not found")
     
     # Vérifier folder si spécifié
+    folder = None
     if folder_id:
-        folder = db.query(models.Folder).filter_by(
-            id=folder_id,
-            tenant_id=tenant_id
-        ).first()
-        
-        if not folder:
-            raise HTTPException(status_code=404, detail="Folder not found")
+        folder = _get_folder(db, tenant_id, folder_id)
     
     # Lire et sauvegarder le fichier
     try:
@@ -171,18 +514,26 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
     
     # Créer document en DB
+    mime_type = file.content_type or "application/octet-stream"
     db_document = models.Document(
         name=file.filename,
         file_path=storage_path,
         file_size=file_size,
-        mime_type=file.content_type or "application/octet-stream",
+        mime_type=mime_type,
         folder_id=folder_id,
         uploaded_by=uploaded_by,
         is_public=is_public,
+        preview_status=initial_status(mime_type, file_size),
         tenant_id=tenant_id
     )
     
     db.add(db_document)
+    text_extraction.track(db, db_document)
+    
+    if folder:
+        folder = _get_folder(db, tenant_id, folder.id, for_update=True)
+        _propagate_folder_stats(db, tenant_id, _path_ids(folder.path), file_size, 1)
+    
     db.commit()
     db.refresh(db_document)
     
@@ -192,13 +543,17 @@ async def upload_document(
         joinedload(models.Document.folder)
     ).filter_by(id=db_document.id).first()
     
+    # Aperçus et texte en arrière-plan: la réponse n'attend ni le rendu ni l'extraction
+    preview_pipeline.submit(tenant_id, db_document)
+    text_extraction.submit(tenant_id, db_document)
+    
     return db_document
 
 @router.get("/api/{tenant_id}/documents/{document_id}", response_model=schemas.DocumentResponse)
 async def get_document(
     tenant_id: str,
     document_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     document = db.query(models.Document).options(
         joinedload(models.Document.uploader),
@@ -217,7 +572,7 @@ async def get_document(
 async def download_document(
     tenant_id: str,
     document_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     document = db.query(models.Document).filter_by(
         id=document_id,
@@ -243,28 +598,424 @@ async def download_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
+@router.get("/api/{tenant_id}/documents/{document_id}/text", response_model=schemas.DocumentTextResponse)
+async def get_document_text(
+    tenant_id: str,
+    document_id: int,
+    include_content: bool = Query(False),
+    db: Session = Depends(get_tenant_db)
+):
+    """État de l'extraction et, sur demande, texte extrait"""
+    document = _get_document(db, tenant_id, document_id)
+    document_text = db.query(models.DocumentText).filter_by(
+        document_id=document.id,
+        tenant_id=tenant_id
+    ).first()
+    
+    if not document_text:
+        # Document antérieur à l'extraction, pas encore rattrapé
+        raise HTTPException(status_code=404, detail="Text extraction not scheduled yet")
+    
+    response = schemas.DocumentTextResponse.model_validate(document_text)
+    if not include_content:
+        response.content = None
+    return response
+
+# === APERÇUS ===
+
+async def _preview_response(request: Request, db: Session, tenant_id: str, document_id: int, kind: str,
+                            version: Optional[int]) -> Response:
+    document = _get_document(db, tenant_id, document_id)
+    path = document.thumbnail_path if kind == "thumbnail" else document.preview_path
+    
+    if not path:
+        if document.preview_status != PENDING:
+            raise HTTPException(status_code=404, detail="No preview available for this document")
+        # Rendu perdu (file pleine, redémarrage): relancé à la demande
+        if not preview_pipeline.in_flight(tenant_id, document.id, document.version):
+            preview_pipeline.submit(tenant_id, document)
+        return JSONResponse(status_code=202, content={"status": PENDING}, headers={"Retry-After": "2"})
+    
+    # ?v=<preview_version>: URL propre à un rendu, mise en cache sans revalidation
+    etag = f'"preview-{document.id}-{document.preview_version}-{kind}"'
+    if version is not None and version == document.preview_version:
+        cache_control = "private, max-age=31536000, immutable"
+    else:
+        cache_control = "private, no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    content = await run_in_threadpool(storage_backend.read_file, path)
+    return Response(content=content, media_type="image/webp", headers=headers)
+
+@router.get("/api/{tenant_id}/documents/{document_id}/thumbnail")
+async def get_document_thumbnail(
+    request: Request,
+    tenant_id: str,
+    document_id: int,
+    v: Optional[int] = Query(None, description="preview_version du document"),
+    db: Session = Depends(get_tenant_db)
+):
+    """Vignette (256 px, WebP); 202 tant que le rendu est en cours"""
+    return await _preview_response(request, db, tenant_id, document_id, "thumbnail", v)
+
+@router.get("/api/{tenant_id}/documents/{document_id}/preview")
+async def get_document_preview(
+    request: Request,
+    tenant_id: str,
+    document_id: int,
+    v: Optional[int] = Query(None, description="preview_version du document"),
+    db: Session = Depends(get_tenant_db)
+):
+    """Aperçu de la première page (1024 px, WebP); 202 tant que le rendu est en cours"""
+    return await _preview_response(request, db, tenant_id, document_id, "preview", v)
+
 @router.delete("/api/{tenant_id}/documents/{document_id}")
 async def delete_document(
     tenant_id: str,
     document_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
-    document = db.query(models.Document).filter_by(
+    # Verrou avant de lire dossier et taille: un déplacement ou une nouvelle version
+    # concurrents fausseraient les cumuls retirés
+    document = _get_document(db, tenant_id, document_id, for_update=True)
+    
+    # Fichiers (historique des versions et aperçus inclus) supprimés de GCS en arrière-plan,
+    # seulement si la suppression en base est validée
+    versions = db.query(models.DocumentVersion).filter_by(
+        document_id=document_id,
+        tenant_id=tenant_id
+    ).all()
+    
+    # Retirer le document des cumuls de ses dossiers ancêtres
+    if document.folder_id:
+        folder = _get_folder(db, tenant_id, document.folder_id, for_update=True)
+        _propagate_folder_stats(db, tenant_id, _path_ids(folder.path), -(document.file_size or 0), -1)
+    
+    paths = {document.file_path, document.thumbnail_path, document.preview_path}
+    for version in versions:
+        paths.add(version.file_path)
+        db.delete(version)
+    
+    # Supprimer de la DB (partages et texte extrait inclus)
+    db.query(models.DocumentShare).filter_by(
+        document_id=document_id,
+        tenant_id=tenant_id
+    ).delete(synchronize_session=False)
+    db.query(models.DocumentText).filter_by(
+        document_id=document_id,
+        tenant_id=tenant_id
+    ).delete(synchronize_session=False)
+    db.delete(document)
+    job_queue.enqueue(db, tenant_id, "documents.delete_files", {"paths": sorted(path for path in paths if path)})
+    bump_acl_generation(db, tenant_id)
+    db.commit()
+    
+    acl_cache.invalidate(tenant_id)
+    
+    return {"message": "Document deleted successfully"}
+
+@router.put("/api/{tenant_id}/documents/{document_id}/move", response_model=schemas.DocumentResponse)
+async def move_document(
+    tenant_id: str,
+    document_id: int,
+    move: schemas.DocumentMove,
+    db: Session = Depends(get_tenant_db)
+):
+    # Verrou avant de lire le dossier d'origine: deux déplacements simultanés le retireraient deux fois
+    document = _get_document(db, tenant_id, document_id, for_update=True)
+    
+    if move.folder_id != document.folder_id:
+        # Verrous pris dans l'ordre des ids: deux déplacements croisés ne s'interbloquent pas
+        folder_ids = sorted(folder_id for folder_id in (document.folder_id, move.folder_id) if folder_id)
+        folders = {folder_id: _get_folder(db, tenant_id, folder_id, for_update=True) for folder_id in folder_ids}
+        file_size = document.file_size or 0
+        
+        if document.folder_id:
+            _propagate_folder_stats(db, tenant_id, _path_ids(folders[document.folder_id].path), -file_size, -1)
+        if move.folder_id:
+            _propagate_folder_stats(db, tenant_id, _path_ids(folders[move.folder_id].path), file_size, 1)
+        
+        document.folder_id = move.folder_id
+        db.commit()
+    
+    # Recharger avec relations
+    document = db.query(models.Document).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.folder)
+    ).filter_by(id=document_id).first()
+    
+    return document
+
+# === VERSIONS ===
+
+def _get_document(db: Session, tenant_id: str, document_id: int, for_update: bool = False):
+    query = db.query(models.Document).filter_by(
         id=document_id,
         tenant_id=tenant_id
-    ).first()
+    )
+    if for_update:
+        query = query.with_for_update().populate_existing()
+    
+    document = query.first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Supprimer de GCS
-    storage_backend.delete_file(document.file_path)
+    return document
+
+def _ensure_initial_version(db: Session, document):
+    """Le contenu d'origine devient la première version complète (sans copie)"""
+    exists = db.query(models.DocumentVersion.id).filter_by(
+        document_id=document.id
+    ).first()
+    
+    if not exists:
+        db.add(models.DocumentVersion(
+            document_id=document.id,
+            version_number=document.version or 1,
+            file_path=document.file_path,
+            uploaded_by=document.uploaded_by,
+            change_notes="Initial version",
+            storage_kind="full",
+            file_size=document.file_size,
+            stored_size=document.file_size,
+            mime_type=document.mime_type,
+            tenant_id=document.tenant_id
+        ))
+        db.flush()
+
+async def _append_version(db: Session, document, content: bytes, mime_type: str, uploaded_by: int, change_notes: Optional[str]):
+    """Ajoute une version au document et retourne le chemin de l'ancien contenu courant s'il est devenu orphelin.
+    
+    Document.file_path pointe toujours vers le contenu complet de la dernière version.
+    Les versions intermédiaires sont stockées en delta contre la précédente.
+    """
+    tenant_id = document.tenant_id
+    _ensure_initial_version(db, document)
+    
+    previous_path = document.file_path
+    previous_size = document.file_size or 0
+    number = (document.version or 1) + 1
+    
+    current_path, _ = await run_in_threadpool(storage_backend.save_file, content, tenant_id, document.name)
+    
+    storage_kind = "full"
+    version_path = current_path
+    stored_size = len(content)
+    
+    if (number - 1) % SNAPSHOT_INTERVAL != 0 and max(previous_size, len(content)) <= DELTA_MAX_BYTES:
+        previous_content = await run_in_threadpool(storage_backend.read_file, previous_path)
+        delta = await run_in_threadpool(make_delta, previous_content, content)
+        
+        if len(delta) < len(content) * DELTA_MAX_RATIO:
+            version_path, _ = await run_in_threadpool(
+                storage_backend.save_file, delta, tenant_id, f"{document.name}.v{number}.delta"
+            )
+            storage_kind = "delta"
+            stored_size = len(delta)
+    
+    db.add(models.DocumentVersion(
+        document_id=document.id,
+        version_number=number,
+        file_path=version_path,
+        uploaded_by=uploaded_by,
+        change_notes=change_notes,
+        storage_kind=storage_kind,
+        file_size=len(content),
+        stored_size=stored_size,
+        mime_type=mime_type,
+        tenant_id=tenant_id
+    ))
+    
+    # Répercuter la variation de taille sur les dossiers ancêtres
+    if document.folder_id:
+        folder = _get_folder(db, tenant_id, document.folder_id, for_update=True)
+        _propagate_folder_stats(db, tenant_id, _path_ids(folder.path), len(content) - previous_size, 0)
+    
+    document.file_path = current_path
+    document.file_size = len(content)
+    document.mime_type = mime_type
+    document.version = number
+    # Les aperçus et le texte de la version précédente restent servis jusqu'au nouveau rendu
+    document.preview_status = initial_status(mime_type, len(content))
+    text_extraction.track(db, document)
+    
+    document_version_bytes.labels(tenant_id=tenant_id, storage_kind=storage_kind, measure="logical").inc(len(content))
+    document_version_bytes.labels(tenant_id=tenant_id, storage_kind=storage_kind, measure="stored").inc(stored_size)
+    
+    # L'ancien contenu courant reste utile seulement s'il sert de version complète
+    referenced = db.query(models.DocumentVersion.id).filter_by(
+        document_id=document.id,
+        file_path=previous_path
+    ).first()
+    
+    return None if referenced else previous_path
+
+def _version_chain(db: Session, document, version_number: int) -> List[str]:
+    """Fichiers à lire pour reconstruire une version: dernière version complète puis
+    au plus SNAPSHOT_INTERVAL - 1 deltas (lectures en base sur le thread de la requête)"""
+    if version_number == document.version:
+        return [document.file_path]
+    
+    base = db.query(models.DocumentVersion).filter(
+        models.DocumentVersion.document_id == document.id,
+        models.DocumentVersion.storage_kind == "full",
+        models.DocumentVersion.version_number <= version_number
+    ).order_by(models.DocumentVersion.version_number.desc()).first()
+    
+    if not base:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    deltas = db.query(models.DocumentVersion.file_path).filter(
+        models.DocumentVersion.document_id == document.id,
+        models.DocumentVersion.version_number > base.version_number,
+        models.DocumentVersion.version_number <= version_number
+    ).order_by(models.DocumentVersion.version_number).all()
+    
+    if len(deltas) != version_number - base.version_number:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    return [base.file_path] + [path for (path,) in deltas]
+
+def _rebuild_version(paths: List[str]) -> bytes:
+    """Applique les deltas de _version_chain; lectures de stockage bloquantes, via run_in_threadpool"""
+    content = storage_backend.read_file(paths[0])
+    for path in paths[1:]:
+        content = apply_delta(content, storage_backend.read_file(path))
+    
+    return content
+
+@router.post("/api/{tenant_id}/documents/{document_id}/versions", response_model=schemas.DocumentResponse)
+async def upload_document_version(
+    tenant_id: str,
+    document_id: int,
+    file: UploadFile = File(...),
+    uploaded_by: int = Form(...),
+    change_notes: Optional[str] = Form(None),
+    db: Session = Depends(get_tenant_db)
+):
+    document = _get_document(db, tenant_id, document_id, for_update=True)
+    
+    uploader = db.query(Contact).filter_by(
+        id=uploaded_by,
+        tenant_id=tenant_id
+    ).first()
+    
+    if not uploader:
+        raise HTTPException(status_code=404, detail="Uploader not found")
+    
+    try:
+        content = await file.read()
+        obsolete_path = await _append_version(
+            db,
+            document,
+            content,
+            file.content_type or document.mime_type or "application/octet-stream",
+            uploaded_by,
+            change_notes
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Version upload failed: {str(e)}")
+    
+    if obsolete_path:
+        job_queue.enqueue(db, tenant_id, "documents.delete_files", {"paths": [obsolete_path]})
     
-    # Supprimer de la DB
-    db.delete(document)
     db.commit()
     
-    return {"message": "Document deleted successfully"}
+    # Recharger avec relations
+    document = db.query(models.Document).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.folder)
+    ).filter_by(id=document_id).first()
+    
+    preview_pipeline.submit(tenant_id, document)
+    text_extraction.submit(tenant_id, document)
+    
+    return document
+
+@router.get("/api/{tenant_id}/documents/{document_id}/versions", response_model=schemas.DocumentVersionHistory)
+async def list_document_versions(
+    tenant_id: str,
+    document_id: int,
+    db: Session = Depends(get_tenant_db)
+):
+    document = _get_document(db, tenant_id, document_id)
+    
+    versions = db.query(models.DocumentVersion).options(
+        joinedload(models.DocumentVersion.uploader)
+    ).filter_by(
+        document_id=document_id,
+        tenant_id=tenant_id
+    ).order_by(models.DocumentVersion.version_number.desc()).all()
+    
+    return {
+        "document_id": document_id,
+        "current_version": document.version or 1,
+        "versions": versions,
+        "total_file_size": sum(v.file_size or 0 for v in versions),
+        "total_stored_size": sum(v.stored_size or 0 for v in versions)
+    }
+
+@router.post("/api/{tenant_id}/documents/{document_id}/versions/{version_number}/restore", response_model=schemas.DocumentResponse)
+async def restore_document_version(
+    tenant_id: str,
+    document_id: int,
+    version_number: int,
+    restore: schemas.DocumentVersionRestore,
+    db: Session = Depends(get_tenant_db)
+):
+    document = _get_document(db, tenant_id, document_id, for_update=True)
+    
+    contact = db.query(Contact).filter_by(
+        id=restore.restored_by,
+        tenant_id=tenant_id
+    ).first()
+    
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    _ensure_initial_version(db, document)
+    
+    # La restauration ajoute une nouvelle version, l'historique n'est jamais réécrit
+    version = db.query(models.DocumentVersion).filter_by(
+        document_id=document_id,
+        version_number=version_number,
+        tenant_id=tenant_id
+    ).first()
+    
+    if not version:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    content = await run_in_threadpool(_rebuild_version, _version_chain(db, document, version_number))
+    obsolete_path = await _append_version(
+        db,
+        document,
+        content,
+        version.mime_type or document.mime_type,
+        restore.restored_by,
+        restore.change_notes or f"Restored from version {version_number}"
+    )
+    
+    if obsolete_path:
+        job_queue.enqueue(db, tenant_id, "documents.delete_files", {"paths": [obsolete_path]})
+    
+    db.commit()
+    
+    # Recharger avec relations
+    document = db.query(models.Document).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.folder)
+    ).filter_by(id=document_id).first()
+    
+    preview_pipeline.submit(tenant_id, document)
+    text_extraction.submit(tenant_id, document)
+    
+    return document
 
 # === UPLOAD DIRECT ===
 
@@ -274,7 +1025,7 @@ async def get_upload_url(
     filename: str,
     uploaded_by: int,
     folder_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     """Génère URL signée pour upload direct depuis le frontend"""
     
@@ -306,10 +1057,14 @@ async def confirm_upload(
     uploaded_by: int = Form(...),
     folder_id: Optional[int] = Form(None),
     is_public: bool = Form(False),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     """Confirme l'upload après upload direct et crée l'entrée DB"""
     
+    folder = None
+    if folder_id:
+        folder = _get_folder(db, tenant_id, folder_id)
+    
     # Créer document en DB
     db_document = models.Document(
         name=filename,
@@ -319,10 +1074,17 @@ async def confirm_upload(
         folder_id=folder_id,
         uploaded_by=uploaded_by,
         is_public=is_public,
+        preview_status=initial_status(mime_type, file_size),
         tenant_id=tenant_id
     )
     
     db.add(db_document)
+    text_extraction.track(db, db_document)
+    
+    if folder:
+        folder = _get_folder(db, tenant_id, folder.id, for_update=True)
+        _propagate_folder_stats(db, tenant_id, _path_ids(folder.path), file_size, 1)
+    
     db.commit()
     db.refresh(db_document)
     
@@ -332,6 +1094,10 @@ async def confirm_upload(
         joinedload(models.Document.folder)
     ).filter_by(id=db_document.id).first()
     
+    # Aperçus et texte en arrière-plan: la réponse n'attend ni le rendu ni l'extraction
+    preview_pipeline.submit(tenant_id, db_document)
+    text_extraction.submit(tenant_id, db_document)
+    
     return db_document
 
 # === PARTAGE ===
@@ -341,7 +1107,7 @@ async def share_document(
     tenant_id: str,
     document_id: int,
     share_data: schemas.DocumentShareCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier document
     document = db.query(models.Document).filter_by(
@@ -376,9 +1142,12 @@ async def share_document(
     )
     
     db.add(db_share)
+    bump_acl_generation(db, tenant_id)
     db.commit()
     db.refresh(db_share)
     
+    acl_cache.invalidate(tenant_id)
+    
     # Recharger avec relations
     db_share = db.query(models.DocumentShare).options(
         joinedload(models.DocumentShare.contact),
@@ -391,7 +1160,7 @@ async def share_document(
 async def list_document_shares(
     tenant_id: str,
     document_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     shares = db.query(models.DocumentShare).options(
         joinedload(models.DocumentShare.contact),
@@ -401,4 +1170,28 @@ async def list_document_shares(
         tenant_id=tenant_id
     ).all()
     
-    return shares
\ No newline at end of file
+    return shares
+
+@router.delete("/api/{tenant_id}/documents/{document_id}/shares/{share_id}")
+async def revoke_document_share(
+    tenant_id: str,
+    document_id: int,
+    share_id: int,
+    db: Session = Depends(get_tenant_db)
+):
+    share = db.query(models.DocumentShare).filter_by(
+        id=share_id,
+        document_id=document_id,
+        tenant_id=tenant_id
+    ).first()
+    
+    if not share:
+        raise HTTPException(status_code=404, detail="Share not found")
+    
+    db.delete(share)
+    bump_acl_generation(db, tenant_id)
+    db.commit()
+    
+    acl_cache.invalidate(tenant_id)
+    
+    return {"message": "Share revoked successfully"}
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 class ContactInfo(BaseModel):
@@ -20,6 +20,10 @@ class FolderResponse(FolderBase):
     id: int
     tenant_id: str
     created_by: int
+    path: Optional[str] = None
+    depth: Optional[int] = 0
+    total_size: Optional[int] = 0
+    document_count: Optional[int] = 0
     created_at: datetime
     creator: Optional[ContactInfo] = None
     
@@ -51,6 +55,8 @@ class DocumentResponse(DocumentBase):
     uploaded_by: int
     version: int
     download_count: int
+    preview_status: Optional[str] = None
+    preview_version: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     uploader: Optional[ContactInfo] = None
@@ -79,6 +85,74 @@ class DocumentShareResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class FolderMove(BaseModel):
+    parent_id: Optional[int] = None  # None = déplacer à la racine
+
+class DocumentMove(BaseModel):
+    folder_id: Optional[int] = None  # None = racine
+
+class FolderSubtree(BaseModel):
+    folder: FolderResponse
+    folders: List[FolderResponse]
+    documents: List[DocumentResponse]
+
+class DocumentVersionResponse(BaseModel):
+    id: int
+    document_id: int
+    version_number: int
+    uploaded_by: int
+    change_notes: Optional[str] = None
+    storage_kind: str
+    file_size: Optional[int] = None
+    stored_size: Optional[int] = None
+    mime_type: Optional[str] = None
+    created_at: datetime
+    uploader: Optional[ContactInfo] = None
+    
+    class Config:
+        from_attributes = True
+
+class DocumentVersionHistory(BaseModel):
+    document_id: int
+    current_version: int
+    versions: List[DocumentVersionResponse]
+    total_file_size: int  # Somme des tailles reconstruites
+    total_stored_size: int  # Octets réellement stockés pour l'historique
+
+class DocumentTextResponse(BaseModel):
+    document_id: int
+    version: int
+    status: str  # pending, ready, failed, unsupported
+    attempts: int
+    error: Optional[str] = None
+    char_count: Optional[int] = None
+    page_count: Optional[int] = None
+    truncated: Optional[bool] = None
+    content: Optional[str] = None
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class DocumentVersionRestore(BaseModel):
+    restored_by: int
+    change_notes: Optional[str] = None
+
+class SharedDocumentResponse(BaseModel):
+    share_id: int
+    permission: str
+    shared_by: int
+    shared_at: datetime
+    document: DocumentResponse
+
+class PermissionCheckRequest(BaseModel):
+    contact_id: int
+    document_ids: List[int]
+
+class PermissionCheckResponse(BaseModel):
+    contact_id: int
+    permissions: Dict[int, Optional[str]]  # None = aucun accès
+
 class FolderContents(BaseModel):
     folders: List[FolderResponse]
     documents: List[DocumentResponse]
@@ -0,0 +1,168 @@
+# app/modules/documents/text.py
+# Lecture du texte brut des fichiers: PDF, documents bureautiques, fichiers texte
+#
+# Chaque lecteur produit le texte par morceaux (bloc de sortie de pdftotext,
+# paragraphe, bloc de fichier texte) sans charger le fichier ni le texte complet:
+# la mémoire reste bornée quelle que soit la taille du fichier, et extract()
+# s'arrête dès max_chars atteint.
+# PDF: pdftotext (poppler-utils) rend les pages une à une sur sa sortie standard
+# (séparées par \f). Office Open XML (docx, xlsx, pptx) et OpenDocument: archives
+# zip dont les parties XML sont décompressées et parsées en flux (iterparse).
+# Formats binaires anciens (.doc, .xls, .ppt): non pris en charge.
+import codecs
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+from xml.etree import ElementTree
+
+CHUNK_SIZE = 64 * 1024
+PDF_TIMEOUT = 120  # Secondes pour l'ensemble du document
+
+TEXT_TYPES = {"text/plain", "text/csv", "text/markdown", "text/tab-separated-values", "application/json"}
+PDF_TYPES = {"application/pdf"}
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+# Type MIME -> (parties XML de l'archive, balises de paragraphe)
+OFFICE_TYPES = {
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        (re.compile(r"word/document\.xml"), {_W + "p"}),
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation":
+        (re.compile(r"ppt/slides/slide(\d+)\.xml"), {_A + "p"}),
+    # Cellules texte uniquement (table des chaînes partagées), pas les nombres
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
+        (re.compile(r"xl/sharedStrings\.xml"), {_S + "si"}),
+    "application/vnd.oasis.opendocument.text": (re.compile(r"content\.xml"), {_TEXT + "p", _TEXT + "h"}),
+    "application/vnd.oasis.opendocument.spreadsheet": (re.compile(r"content\.xml"), {_TEXT + "p"}),
+    "application/vnd.oasis.opendocument.presentation": (re.compile(r"content\.xml"), {_TEXT + "p"}),
+}
+
+_SPACES = re.compile(r"[ \t\r\v\xa0]+")
+_BLANK_LINES = re.compile(r"\n\s*\n\s*\n+")
+
+class UnsupportedText(Exception):
+    pass
+
+class ExtractionError(Exception):
+    pass
+
+def supports(mime_type: str) -> bool:
+    if mime_type in PDF_TYPES:
+        return shutil.which("pdftotext") is not None
+    return mime_type in TEXT_TYPES or mime_type in OFFICE_TYPES
+
+@contextmanager
+def _local_path(stream: BinaryIO):
+    """Chemin d'un fichier local pour pdftotext (copie temporaire si le stockage n'est pas local)"""
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        yield name
+        return
+    with tempfile.NamedTemporaryFile(prefix="extract-", suffix=".pdf") as copy:
+        shutil.copyfileobj(stream, copy, CHUNK_SIZE)
+        copy.flush()
+        yield copy.name
+
+def _read_text(stream: BinaryIO) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    for block in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+def _read_pdf(stream: BinaryIO) -> Iterator[str]:
+    with _local_path(stream) as path:
+        process = subprocess.Popen(
+            ["pdftotext", "-q", "-enc", "UTF-8", path, "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        timer = threading.Timer(PDF_TIMEOUT, process.kill)
+        timer.start()
+        try:
+            yield from _read_text(process.stdout)
+            process.wait()
+        finally:
+            # Arrêt anticipé (max_chars atteint) ou erreur: le processus ne doit pas survivre
+            timer.cancel()
+            if process.returncode is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        if process.returncode < 0:
+            raise ExtractionError(f"pdftotext timed out after {PDF_TIMEOUT}s")
+        if process.returncode > 0:
+            raise ExtractionError(f"pdftotext exited with status {process.returncode}")
+
+def _xml_paragraphs(stream: BinaryIO, paragraph_tags) -> Iterator[str]:
+    # Les paragraphes lus sont retirés de leur parent: l'arbre ne grossit pas
+    parents = []
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag in paragraph_tags:
+            text = "".join(element.itertext())
+            if text:
+                yield text + "\n"
+            if parents:
+                parents[-1].remove(element)
+
+def _read_office(stream: BinaryIO, mime_type: str) -> Iterator[str]:
+    parts, paragraph_tags = OFFICE_TYPES[mime_type]
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile as e:
+        raise ExtractionError(f"invalid office document: {e}")
+    with archive:
+        names = [(match, name) for name in archive.namelist() for match in [parts.fullmatch(name)] if match]
+        # Diapositives dans l'ordre de leur numéro
+        names.sort(key=lambda item: int(item[0].group(1)) if item[0].groups() else 0)
+        for _, name in names:
+            with archive.open(name) as part:
+                yield from _xml_paragraphs(part, paragraph_tags)
+
+def read_chunks(stream: BinaryIO, mime_type: str) -> Iterator[str]:
+    if mime_type in PDF_TYPES:
+        return _read_pdf(stream)
+    if mime_type in OFFICE_TYPES:
+        return _read_office(stream, mime_type)
+    if mime_type in TEXT_TYPES:
+        return _read_text(stream)
+    raise UnsupportedText(mime_type)
+
+def extract(stream: BinaryIO, mime_type: str, max_chars: int) -> dict:
+    """{"content", "char_count", "page_count" (PDF), "truncated"}; espaces normalisés"""
+    pieces, size, pages, truncated = [], 0, 0, False
+    chunks = read_chunks(stream, mime_type)
+    try:
+        for chunk in chunks:
+            pages += chunk.count("\f")
+            # Postgres refuse le caractère NUL dans une colonne texte
+            chunk = _SPACES.sub(" ", chunk.replace("\f", "\n").replace("\x00", ""))
+            if size + len(chunk) > max_chars:
+                pieces.append(chunk[:max_chars - size])
+                truncated = True
+                break
+            pieces.append(chunk)
+            size += len(chunk)
+    except ElementTree.ParseError as e:
+        raise ExtractionError(f"invalid XML: {e}")
+    finally:
+        chunks.close()
+
+    content = _BLANK_LINES.sub("\n\n", "".join(pieces)).strip()
+    return {
+        "content": content,
+        "char_count": len(content),
+        "page_count": pages if mime_type in PDF_TYPES else None,
+        "truncated": truncated,
+    }
@@ -1,19 +1,44 @@
-from sqlalchemy import Column, String, Integer, Boolean, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, Text, DateTime, ForeignKey, Index, UniqueConstraint, JSON
 from sqlalchemy.orm import relationship
 from app.core.models import BaseModel
 
 class Message(BaseModel):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Comptage des non-lus: range count sur (tenant, channel, id > curseur)
+        Index("ix_messages_tenant_channel_id", "tenant_id", "channel", "id"),
+        # Pagination des threads par curseur (id)
+        Index("ix_messages_tenant_thread_id", "tenant_id", "thread_id", "id"),
+    )
     
     content = Column(Text, nullable=False)
     sender_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
     recipient_id = Column(Integer, ForeignKey("contacts.id"))  # Null = message broadcast/channel
     channel = Column(String(100), default="general")  # general, project-specific, etc.
     thread_id = Column(Integer, ForeignKey("messages.id"))  # Pour les réponses
-    is_read = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False)  # Obsolète: voir MessageReadCursor (lecture par contact)
     message_type = Column(String(20), default="text")  # text, file, system
     
+    # Statistiques de thread (dénormalisées sur le message racine)
+    reply_count = Column(Integer, default=0, nullable=False)
+    last_reply_at = Column(DateTime)
+    recent_participant_ids = Column(JSON, default=list)  # Derniers contacts ayant répondu, plus récent en premier
+    
     # Relations
     sender = relationship("Contact", foreign_keys=[sender_id])
     recipient = relationship("Contact", foreign_keys=[recipient_id])
-    thread_parent = relationship("Message", remote_side="Message.id")
\ No newline at end of file
+    thread_parent = relationship("Message", remote_side="Message.id")
+
+class MessageReadCursor(BaseModel):
+    __tablename__ = "message_read_cursors"
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "contact_id", "channel", name="uq_read_cursor_tenant_contact_channel"),
+    )
+    
+    contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
+    channel = Column(String(100), nullable=False)
+    last_read_message_id = Column(Integer, nullable=False, default=0)  # Dernier message lu (inclus)
+    last_read_at = Column(DateTime)
+    
+    # Relations
+    contact = relationship("Contact")
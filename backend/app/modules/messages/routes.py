@@ -1,20 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
+from datetime import datetime
 
-from app.core.database import get_db
+from app.core.tenant import get_tenant_db
+from app.core.export import ExportFormat, export_response, table_columns
 from app.modules.contacts.models import Contact
+from app.modules.contacts.autocomplete import record_interaction
 from . import models, schemas
 
 router = APIRouter()
 
+# Nombre de participants récents conservés sur le message racine d'un thread
+RECENT_PARTICIPANTS_LIMIT = 5
+
 @router.get("/api/{tenant_id}/messages", response_model=List[schemas.MessageResponse])
 async def list_messages(
     tenant_id: str,
     channel: Optional[str] = Query("general"),
     thread_id: Optional[int] = Query(None),
     limit: int = Query(50, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     query = db.query(models.Message).filter_by(
         tenant_id=tenant_id,
@@ -33,11 +41,35 @@ async def list_messages(
     messages = query.order_by(models.Message.created_at.desc()).limit(limit).all()
     return messages
 
+@router.get("/api/{tenant_id}/messages/export")
+async def export_messages(
+    tenant_id: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    channel: Optional[str] = Query(None),
+    sender_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    Message = models.Message
+    # is_read: obsolète (curseurs de lecture par contact)
+    query = select(*table_columns(Message, exclude=("is_read",))).where(Message.tenant_id == tenant_id)
+    if channel:
+        query = query.where(Message.channel == channel)
+    if sender_id:
+        query = query.where(Message.sender_id == sender_id)
+    if since:
+        query = query.where(Message.created_at >= since)
+    if until:
+        query = query.where(Message.created_at < until)
+    return export_response(db, query, "messages", format, gzip)
+
 @router.post("/api/{tenant_id}/messages", response_model=schemas.MessageResponse)
 async def create_message(
     tenant_id: str,
     message: schemas.MessageCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier que sender existe dans ce tenant
     sender = db.query(Contact).filter_by(
@@ -58,12 +90,35 @@ async def create_message(
         if not recipient:
             raise HTTPException(status_code=404, detail="Recipient not found")
     
+    # Verrouiller le message racine pour maintenir les stats du thread
+    root = None
+    if message.thread_id:
+        root = db.query(models.Message).filter_by(
+            id=message.thread_id,
+            tenant_id=tenant_id
+        ).with_for_update().first()
+        
+        if not root:
+            raise HTTPException(status_code=404, detail="Thread not found")
+    
     db_message = models.Message(
         **message.dict(),
-        tenant_id=tenant_id
+        tenant_id=tenant_id,
+        created_at=datetime.utcnow()
     )
     
     db.add(db_message)
+    
+    if root:
+        participants = [message.sender_id] + [
+            contact_id for contact_id in (root.recent_participant_ids or [])
+            if contact_id != message.sender_id
+        ]
+        root.reply_count = (root.reply_count or 0) + 1
+        root.last_reply_at = db_message.created_at
+        root.recent_participant_ids = participants[:RECENT_PARTICIPANTS_LIMIT]
+    
+    record_interaction(db, tenant_id, [message.sender_id, message.recipient_id], db_message.created_at)
     db.commit()
     db.refresh(db_message)
     
@@ -76,8 +131,16 @@ async def create_message(
     return db_message
 
 @router.get("/api/{tenant_id}/messages/channels", response_model=List[schemas.ChannelResponse])
-async def list_channels(tenant_id: str, db: Session = Depends(get_db)):
-    from sqlalchemy import func, desc
+async def list_channels(
+    tenant_id: str,
+    contact_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    return _channel_summaries(db, tenant_id, contact_id)
+
+def _channel_summaries(db: Session, tenant_id: str, contact_id: Optional[int] = None) -> list:
+    """Résumé par channel (aussi utilisé par le dashboard)"""
+    from sqlalchemy import desc
     
     # Statistiques basiques par channel
     channels_stats = db.query(
@@ -89,14 +152,25 @@ async def list_channels(tenant_id: str, db: Session = Depends(get_db)):
         models.Message.channel
     ).all()
     
+    # Non-lus par contact via les curseurs de lecture (une seule requête)
+    unread_by_channel = {}
+    if contact_id:
+        unread_by_channel = {
+            row.channel: row.unread_count
+            for row in _unread_counts(db, tenant_id, contact_id)
+        }
+    
     result = []
     for channel, msg_count in channels_stats:
-        # Compter manuellement les non-lus
-        unread_count = db.query(models.Message).filter_by(
-            tenant_id=tenant_id,
-            channel=channel,
-            is_read=False
-        ).count()
+        if contact_id:
+            unread_count = unread_by_channel.get(channel, 0)
+        else:
+            # Compter manuellement les non-lus (flag global is_read)
+            unread_count = db.query(models.Message).filter_by(
+                tenant_id=tenant_id,
+                channel=channel,
+                is_read=False
+            ).count()
         
         # Récupérer le dernier message du channel
         last_message = db.query(models.Message).options(
@@ -119,7 +193,8 @@ async def list_channels(tenant_id: str, db: Session = Depends(get_db)):
 async def mark_as_read(
     tenant_id: str,
     message_id: int,
-    db: Session = Depends(get_db)
+    contact_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
     message = db.query(models.Message).filter_by(
         id=message_id,
@@ -129,20 +204,33 @@ async def mark_as_read(
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    message.is_read = True
+    if contact_id:
+        contact = db.query(Contact.id).filter_by(id=contact_id, tenant_id=tenant_id).first()
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        # Lecture par contact: avancer le curseur du channel
+        _advance_read_cursor(db, tenant_id, contact_id, message.channel, message.id)
+    else:
+        message.is_read = True
     db.commit()
     db.refresh(message)
     
     return message
 
-@router.get("/api/{tenant_id}/messages/{message_id}/thread", response_model=List[schemas.MessageResponse])
+@router.get("/api/{tenant_id}/messages/{message_id}/thread", response_model=schemas.ThreadPage)
 async def get_thread(
     tenant_id: str,
     message_id: int,
-    db: Session = Depends(get_db)
+    cursor: Optional[int] = Query(None),
+    direction: str = Query("after", pattern="^(before|after|around)$"),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_tenant_db)
 ):
     # Récupérer le message principal
-    main_message = db.query(models.Message).filter_by(
+    main_message = db.query(models.Message).options(
+        joinedload(models.Message.sender),
+        joinedload(models.Message.recipient)
+    ).filter_by(
         id=message_id,
         tenant_id=tenant_id
     ).first()
@@ -150,13 +238,157 @@ async def get_thread(
     if not main_message:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    # Récupérer toutes les réponses
-    thread_messages = db.query(models.Message).options(
+    # Réponses paginées par id (index tenant_id, thread_id, id)
+    replies_query = db.query(models.Message).options(
         joinedload(models.Message.sender),
         joinedload(models.Message.recipient)
     ).filter_by(
         tenant_id=tenant_id,
         thread_id=message_id
-    ).order_by(models.Message.created_at.asc()).all()
+    )
+    
+    def fetch_after(after_id, inclusive, size):
+        query = replies_query
+        if after_id is not None:
+            query = query.filter(
+                models.Message.id >= after_id if inclusive else models.Message.id > after_id
+            )
+        rows = query.order_by(models.Message.id.asc()).limit(size + 1).all()
+        return rows[:size], len(rows) > size
+    
+    def fetch_before(before_id, size):
+        rows = replies_query.filter(
+            models.Message.id < before_id
+        ).order_by(models.Message.id.desc()).limit(size + 1).all()
+        return list(reversed(rows[:size])), len(rows) > size
+    
+    def exists(condition):
+        # Réponse au-delà de la page, sans la lire (index tenant_id, thread_id, id)
+        return db.query(replies_query.filter(condition).exists()).scalar()
     
-    return [main_message] + thread_messages
\ No newline at end of file
+    if direction == "before" and cursor is not None:
+        replies, has_more_before = fetch_before(cursor, limit)
+        has_more_after = exists(models.Message.id >= cursor)
+    elif direction == "around" and cursor is not None:
+        before, has_more_before = fetch_before(cursor, limit // 2)
+        after, has_more_after = fetch_after(cursor, True, limit - len(before))
+        replies = before + after
+    else:
+        replies, has_more_after = fetch_after(cursor, False, limit)
+        has_more_before = cursor is not None and exists(models.Message.id <= cursor)
+    
+    return {
+        "root": main_message,
+        "replies": replies,
+        "prev_cursor": replies[0].id if replies else cursor,
+        "next_cursor": replies[-1].id if replies else cursor,
+        "has_more_before": has_more_before,
+        "has_more_after": has_more_after
+    }
+
+# === CURSEURS DE LECTURE ===
+
+def _advance_read_cursor(db: Session, tenant_id: str, contact_id: int, channel: str, message_id: int):
+    """Upsert du curseur: ne recule jamais (GREATEST sur l'existant)"""
+    now = datetime.utcnow()
+    cursors = models.MessageReadCursor.__table__
+    stmt = pg_insert(cursors).values(
+        tenant_id=tenant_id,
+        contact_id=contact_id,
+        channel=channel,
+        last_read_message_id=message_id,
+        last_read_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[cursors.c.tenant_id, cursors.c.contact_id, cursors.c.channel],
+        set_={
+            "last_read_message_id": func.greatest(cursors.c.last_read_message_id, stmt.excluded.last_read_message_id),
+            "last_read_at": now,
+            "updated_at": now
+        }
+    )
+    db.execute(stmt)
+
+def _unread_counts(db: Session, tenant_id: str, contact_id: int):
+    """Non-lus de tous les channels du tenant pour un contact, en une requête.
+    
+    Chaque compteur est un range count sur ix_messages_tenant_channel_id
+    (id > curseur), les messages envoyés par le contact lui-même sont exclus.
+    """
+    Message = models.Message
+    Cursor = models.MessageReadCursor
+    
+    channels = select(Message.channel).where(
+        Message.tenant_id == tenant_id
+    ).distinct().subquery()
+    
+    last_read = func.coalesce(Cursor.last_read_message_id, 0)
+    unread = select(func.count(Message.id)).where(
+        Message.tenant_id == tenant_id,
+        Message.channel == channels.c.channel,
+        Message.id > last_read,
+        Message.sender_id != contact_id
+    ).correlate(channels, Cursor).scalar_subquery()
+    
+    stmt = select(
+        channels.c.channel,
+        last_read.label("last_read_message_id"),
+        unread.label("unread_count")
+    ).select_from(channels).outerjoin(
+        Cursor,
+        (Cursor.tenant_id == tenant_id)
+        & (Cursor.contact_id == contact_id)
+        & (Cursor.channel == channels.c.channel)
+    ).order_by(channels.c.channel)
+    
+    return db.execute(stmt).all()
+
+@router.put("/api/{tenant_id}/messages/channels/{channel}/read", response_model=schemas.ReadCursorResponse)
+async def mark_channel_read(
+    tenant_id: str,
+    channel: str,
+    read_request: schemas.ChannelReadRequest,
+    db: Session = Depends(get_tenant_db)
+):
+    contact = db.query(Contact).filter_by(
+        id=read_request.contact_id,
+        tenant_id=tenant_id
+    ).first()
+    
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    
+    if read_request.up_to_message_id:
+        # Le message cible doit appartenir au channel
+        up_to = db.query(models.Message.id).filter_by(
+            id=read_request.up_to_message_id,
+            tenant_id=tenant_id,
+            channel=channel
+        ).scalar()
+    else:
+        up_to = db.query(func.max(models.Message.id)).filter_by(
+            tenant_id=tenant_id,
+            channel=channel
+        ).scalar()
+    
+    if not up_to:
+        raise HTTPException(status_code=404, detail="Message not found")
+    
+    _advance_read_cursor(db, tenant_id, read_request.contact_id, channel, up_to)
+    db.commit()
+    
+    cursor = db.query(models.MessageReadCursor).filter_by(
+        tenant_id=tenant_id,
+        contact_id=read_request.contact_id,
+        channel=channel
+    ).first()
+    
+    return cursor
+
+@router.get("/api/{tenant_id}/messages/unread", response_model=List[schemas.UnreadCountResponse])
+async def get_unread_counts(
+    tenant_id: str,
+    contact_id: int = Query(...),
+    db: Session = Depends(get_tenant_db)
+):
+    return _unread_counts(db, tenant_id, contact_id)
\ No newline at end of file
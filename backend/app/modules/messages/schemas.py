@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class MessageBase(BaseModel):
@@ -27,14 +27,43 @@ class MessageResponse(MessageBase):
     is_read: bool
     created_at: datetime
     updated_at: datetime
+    reply_count: Optional[int] = 0
+    last_reply_at: Optional[datetime] = None
+    recent_participant_ids: Optional[List[int]] = []
     sender: Optional[ContactInfo] = None
     recipient: Optional[ContactInfo] = None
     
     class Config:
         from_attributes = True
 
+class ThreadPage(BaseModel):
+    root: MessageResponse
+    replies: List[MessageResponse]
+    prev_cursor: Optional[int] = None  # A utiliser avec direction=before
+    next_cursor: Optional[int] = None  # A utiliser avec direction=after
+    has_more_before: bool
+    has_more_after: bool
+
 class ChannelResponse(BaseModel):
     channel: str
     message_count: int
     last_message: Optional[MessageResponse] = None
+    unread_count: int
+
+class ChannelReadRequest(BaseModel):
+    contact_id: int
+    up_to_message_id: Optional[int] = None  # None = jusqu'au dernier message du channel
+
+class ReadCursorResponse(BaseModel):
+    contact_id: int
+    channel: str
+    last_read_message_id: int
+    last_read_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class UnreadCountResponse(BaseModel):
+    channel: str
+    last_read_message_id: int
     unread_count: int
\ No newline at end of file
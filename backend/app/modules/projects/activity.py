@@ -0,0 +1,152 @@
+# app/modules/projects/activity.py
+# Journal d'activité des projets: file en mémoire vidée par lots dans project_activities
+#
+# Les routes enregistrent l'activité après leur propre commit, sans écriture
+# supplémentaire dans la requête. Un thread par process regroupe les événements
+# et les insère par lots (un INSERT multi-lignes par shard). La file est bornée:
+# au-delà, les événements sont comptés comme perdus plutôt que de ralentir l'API.
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core.tenant import shard_router
+from . import models
+
+ACTIVITY_FLUSH_INTERVAL = 1.0  # Secondes entre deux vidages
+ACTIVITY_BATCH_SIZE = 500
+ACTIVITY_MAX_QUEUE = 10000
+
+activity_events = Counter(
+    'workos_project_activity_events_total',
+    'Project activity events by outcome',
+    ['result']
+)
+
+activity_flush_duration = Histogram(
+    'workos_project_activity_flush_seconds',
+    'Duration of batched project activity inserts',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+class ActivityWriter:
+    def __init__(self, flush_interval: float = ACTIVITY_FLUSH_INTERVAL,
+                 batch_size: int = ACTIVITY_BATCH_SIZE, max_queue: int = ACTIVITY_MAX_QUEUE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, tenant_id: str, project_id: int, contact_id: int, activity_type: str,
+               description: str, metadata: Optional[dict] = None):
+        now = datetime.utcnow()
+        row = {
+            "tenant_id": tenant_id,
+            "project_id": project_id,
+            "contact_id": contact_id,
+            "activity_type": activity_type,
+            "description": description,
+            "activity_metadata": json.dumps(metadata) if metadata else None,
+            "created_at": now,  # Heure de l'événement, pas du vidage
+            "updated_at": now,
+        }
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                activity_events.labels(result="dropped").inc()
+                return
+            self._queue.append(row)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="project-activity-writer", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.set()
+        activity_events.labels(result="queued").inc()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Écrit le contenu de la file, retourne le nombre de lignes insérées"""
+        with self._lock:
+            rows = list(self._queue)
+            self._queue.clear()
+        if not rows:
+            return 0
+
+        by_shard = {}
+        deferred = []
+        for row in rows:
+            shard, read_only = shard_router.resolve(row["tenant_id"])
+            if read_only:
+                # Tenant en cours de déplacement: réessayer au prochain vidage
+                deferred.append(row)
+            else:
+                by_shard.setdefault(shard, []).append(row)
+
+        if deferred:
+            with self._lock:
+                self._queue.extendleft(reversed(deferred))
+
+        written = 0
+        for shard, shard_rows in by_shard.items():
+            start = time.perf_counter()
+            db = shard_router.sessionmaker(shard)()
+            try:
+                written += self._write(db, shard_rows)
+            except Exception as e:
+                db.rollback()
+                activity_events.labels(result="failed").inc(len(shard_rows))
+                print(f"Error writing project activity: {e}")
+            finally:
+                db.close()
+            activity_flush_duration.observe(time.perf_counter() - start)
+
+        activity_events.labels(result="written").inc(written)
+        return written
+
+    def _write(self, db, rows) -> int:
+        table = models.ProjectActivity.__table__
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                db.execute(insert(table), rows[start:start + self.batch_size])
+            db.commit()
+            return len(rows)
+        except IntegrityError:
+            # Une ligne invalide (projet supprimé...) ne doit pas faire perdre tout le lot
+            db.rollback()
+            written = 0
+            for row in rows:
+                try:
+                    db.execute(insert(table), [row])
+                    db.commit()
+                    written += 1
+                except IntegrityError:
+                    db.rollback()
+                    activity_events.labels(result="failed").inc()
+            return written
+
+    def close(self):
+        """Arrêt du thread et dernier vidage (fin du process)"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+# Instance globale (une par process)
+activity_writer = ActivityWriter()
+atexit.register(activity_writer.close)
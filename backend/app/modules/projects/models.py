@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Enum, Numeric
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Text, Enum, Numeric, Index
 from sqlalchemy.orm import relationship
 from app.core.models import BaseModel
 import enum
@@ -24,6 +24,11 @@ class MemberRole(enum.Enum):
 
 class Project(BaseModel):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Projets en retard / échéance proche (lectures par tenant, file du suivi des échéances)
+        Index("ix_projects_tenant_due_state_deadline", "tenant_id", "due_state", "deadline"),
+        Index("ix_projects_due_state_deadline", "due_state", "deadline"),
+    )
     
     name = Column(String(255), nullable=False)
     description = Column(Text)
@@ -34,6 +39,7 @@ class Project(BaseModel):
     start_date = Column(DateTime)
     end_date = Column(DateTime)
     deadline = Column(DateTime)
+    due_state = Column(String(20))  # pending, due_soon, overdue (maintenu par app.core.due_dates)
     
     # Budget et métrics
     budget = Column(Numeric(10, 2))
@@ -92,6 +98,10 @@ class ProjectDocument(BaseModel):
 
 class ProjectEvent(BaseModel):
     __tablename__ = "project_events"
+    __table_args__ = (
+        # Flux .ics du projet
+        Index("ix_project_events_tenant_project_event", "tenant_id", "project_id", "event_id"),
+    )
     
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
@@ -102,6 +112,11 @@ class ProjectEvent(BaseModel):
 
 class ProjectActivity(BaseModel):
     __tablename__ = "project_activities"
+    __table_args__ = (
+        # Fil d'un projet et fil du tenant, du plus récent au plus ancien
+        Index("ix_project_activities_tenant_project_created", "tenant_id", "project_id", "created_at"),
+        Index("ix_project_activities_tenant_created", "tenant_id", "created_at"),
+    )
     
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     contact_id = Column(Integer, ForeignKey("contacts.id"), nullable=False)
@@ -1,18 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, func, desc, select, tuple_
 from typing import List, Optional
 from datetime import datetime
+import json
 
-from app.core.database import get_db
+from app.core.tenant import TenantMoving, get_tenant_db, shard_router
+from app.core.jobs import job_queue
+from app.core.coalesce import single_flight
+from app.core.due_dates import due_tracker, Tracker, DUE_SOON, OVERDUE
+from app.core.export import ExportFormat, export_response, table_columns
 from app.modules.contacts.models import Contact
 from app.modules.tasks.models import Task
 from app.modules.documents.models import Document
 from app.modules.calendar.models import Event
+from app.modules.calendar import ics
 from . import models, schemas
+from .activity import activity_writer
 
 router = APIRouter()
 
+due_tracker.track(Tracker(
+    "project", models.Project, "deadline",
+    open_clause=and_(models.Project.status.in_(["planning", "active"]), models.Project.is_archived == False),
+    payload=("created_by", "name")
+))
+
+def _record_deadline_events(events):
+    """Transitions d'échéance des projets -> fil d'activité (notifications), via la file durable"""
+    for event in events:
+        if event["kind"] != "project":
+            continue
+        deadline = event["due"].isoformat()
+        try:
+            job_queue.enqueue_now(
+                event["tenant_id"], "projects.deadline_activity",
+                {"project_id": event["id"], "created_by": event["created_by"], "name": event["name"],
+                 "state": event["state"], "deadline": deadline},
+                key=f"{event['id']}:{event['state']}:{deadline}"
+            )
+        except TenantMoving:
+            # Gel survenu entre la transition et l'ajout (le moteur exclut les tenants gelés)
+            print(f"Deadline activity of project {event['id']} skipped: tenant {event['tenant_id']} is moving")
+
+@job_queue.handler("projects.deadline_activity", queue="notifications")
+def _deadline_activity(job):
+    """Écrit l'activité d'échéance (idempotent: une activité déjà écrite n'est pas dupliquée)"""
+    payload = job.payload
+    if payload["state"] == OVERDUE:
+        activity_type, description = "deadline_overdue", f"Deadline of '{payload['name']}' has passed"
+    else:
+        activity_type, description = "deadline_due_soon", f"Deadline of '{payload['name']}' is approaching"
+    metadata = json.dumps({"deadline": payload["deadline"]})
+    
+    db = shard_router.session_for(job.tenant_id)
+    try:
+        project = db.query(models.Project.id).filter_by(id=payload["project_id"], tenant_id=job.tenant_id).first()
+        written = db.query(models.ProjectActivity.id).filter_by(
+            tenant_id=job.tenant_id,
+            project_id=payload["project_id"],
+            activity_type=activity_type,
+            activity_metadata=metadata
+        ).first()
+        # Projet supprimé entre-temps: rien à notifier
+        if project and not written:
+            db.add(models.ProjectActivity(
+                tenant_id=job.tenant_id,
+                project_id=payload["project_id"],
+                contact_id=payload["created_by"],
+                activity_type=activity_type,
+                description=description,
+                activity_metadata=metadata
+            ))
+            db.commit()
+    finally:
+        db.close()
+
+due_tracker.subscribe(_record_deadline_events)
+
+def _get_actor(db: Session, tenant_id: str, actor_id: Optional[int], default_id: int) -> int:
+    """Auteur d'une activité: actor_id s'il est fourni (et valide), sinon le créateur du projet"""
+    if actor_id is None:
+        return default_id
+    if not db.query(Contact.id).filter_by(id=actor_id, tenant_id=tenant_id).first():
+        raise HTTPException(status_code=404, detail="Actor not found")
+    return actor_id
+
+def _activity_feed(query, cursor: Optional[int], limit: int):
+    """Pagination par curseur (id de la dernière activité reçue), ordre (created_at, id) décroissant"""
+    Activity = models.ProjectActivity
+    if cursor:
+        cursor_created_at = select(Activity.created_at).where(Activity.id == cursor).scalar_subquery()
+        query = query.filter(tuple_(Activity.created_at, Activity.id) < tuple_(cursor_created_at, cursor))
+    return query.options(joinedload(Activity.contact)).order_by(
+        Activity.created_at.desc(), Activity.id.desc()
+    ).limit(limit).all()
+
 # === PROJECTS ===
 
 @router.get("/api/{tenant_id}/projects", response_model=List[schemas.ProjectResponse])
@@ -22,7 +105,8 @@ async def list_projects(
     priority: Optional[str] = Query(None),
     archived: bool = Query(False),
     member_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    due_state: Optional[str] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
     query = db.query(models.Project).filter_by(
         tenant_id=tenant_id,
@@ -39,6 +123,9 @@ async def list_projects(
     if priority:
         query = query.filter(models.Project.priority == priority)
     
+    if due_state:
+        query = query.filter(due_tracker.state_of("project") == due_state)
+    
     if member_id:
         query = query.join(models.ProjectMember).filter(
             models.ProjectMember.contact_id == member_id
@@ -51,7 +138,7 @@ async def list_projects(
 async def create_project(
     tenant_id: str,
     project: schemas.ProjectCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifier que creator existe
     creator = db.query(Contact).filter_by(
@@ -112,9 +199,16 @@ async def create_project(
         )
         db.add(owner)
     
+    db.flush()
+    due_tracker.sync(db, "project", tenant_id, [db_project.id])
     db.commit()
     db.refresh(db_project)
     
+    activity_writer.record(
+        tenant_id, db_project.id, project.created_by, "project_created",
+        f"Project '{db_project.name}' created", {"member_ids": member_ids}
+    )
+    
     # Recharger avec relations
     db_project = db.query(models.Project).options(
         joinedload(models.Project.creator),
@@ -124,12 +218,64 @@ async def create_project(
     
     return db_project
 
+@router.get("/api/{tenant_id}/projects/activity", response_model=List[schemas.ProjectActivity])
+async def get_tenant_activity(
+    tenant_id: str,
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    activity_type: Optional[str] = Query(None),
+    contact_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    # Déclarée avant /projects/{project_id}; index (tenant_id, created_at)
+    query = db.query(models.ProjectActivity).filter(models.ProjectActivity.tenant_id == tenant_id)
+    
+    if activity_type:
+        query = query.filter(models.ProjectActivity.activity_type == activity_type)
+    
+    if contact_id:
+        query = query.filter(models.ProjectActivity.contact_id == contact_id)
+    
+    return _activity_feed(query, cursor, limit)
+
+# Déclarée avant /projects/{project_id}
+@router.get("/api/{tenant_id}/projects/export")
+async def export_projects(
+    tenant_id: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    status: Optional[str] = Query(None),
+    archived: Optional[bool] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    Project = models.Project
+    query = select(*table_columns(Project)).where(Project.tenant_id == tenant_id)
+    if status:
+        query = query.where(Project.status == status)
+    if archived is not None:
+        query = query.where(Project.is_archived == archived)
+    return export_response(db, query, "projects", format, gzip)
+
+# Déclarée avant /projects/{project_id}
+@router.get("/api/{tenant_id}/projects/stats", response_model=schemas.ProjectStats)
+async def get_project_stats(
+    tenant_id: str,
+    db: Session = Depends(get_tenant_db)
+):
+    return _project_stats(db, tenant_id)
+
 @router.get("/api/{tenant_id}/projects/{project_id}", response_model=schemas.ProjectDetails)
 async def get_project_details(
     tenant_id: str,
-    project_id: int,
-    db: Session = Depends(get_db)
+    project_id: int
 ):
+    # Ouvertures simultanées du même projet: une seule série de requêtes
+    return await single_flight.response(
+        "project_details", tenant_id, project_id,
+        lambda db: _project_details(db, tenant_id, project_id)
+    )
+
+def _project_details(db: Session, tenant_id: str, project_id: int) -> bytes:
     project = db.query(models.Project).options(
         joinedload(models.Project.creator),
         joinedload(models.Project.client),
@@ -174,14 +320,15 @@ async def get_project_details(
         "event_count": len(events)
     }
     
-    return project_dict
+    return schemas.ProjectDetails.model_validate(project_dict, from_attributes=True).model_dump_json().encode()
 
 @router.put("/api/{tenant_id}/projects/{project_id}", response_model=schemas.ProjectResponse)
 async def update_project(
     tenant_id: str,
     project_id: int,
     project_update: schemas.ProjectUpdate,
-    db: Session = Depends(get_db)
+    actor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
     project = db.query(models.Project).filter_by(
         id=project_id,
@@ -191,13 +338,32 @@ async def update_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    actor = _get_actor(db, tenant_id, actor_id, project.created_by)
+    changes = project_update.dict(exclude_unset=True)
+    previous_status = project.status
+    
     # Mettre à jour les champs fournis
-    for field, value in project_update.dict(exclude_unset=True).items():
+    for field, value in changes.items():
         setattr(project, field, value)
     
+    if changes.keys() & {"deadline", "status", "is_archived"}:
+        db.flush()
+        due_tracker.sync(db, "project", tenant_id, [project.id])
     db.commit()
     db.refresh(project)
     
+    if changes.get("status") and changes["status"] != previous_status:
+        activity_writer.record(
+            tenant_id, project.id, actor, "status_changed",
+            f"Status changed from {previous_status} to {project.status}",
+            {"from": previous_status, "to": project.status}
+        )
+    elif changes:
+        activity_writer.record(
+            tenant_id, project.id, actor, "project_updated",
+            f"Project updated: {', '.join(sorted(changes))}", {"fields": sorted(changes)}
+        )
+    
     return project
 
 # === MEMBRES ===
@@ -207,7 +373,8 @@ async def add_project_member(
     tenant_id: str,
     project_id: int,
     member: schemas.ProjectMemberCreate,
-    db: Session = Depends(get_db)
+    actor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifications
     project = db.query(models.Project).filter_by(
@@ -235,6 +402,8 @@ async def add_project_member(
     if existing:
         raise HTTPException(status_code=400, detail="Contact is already a member")
     
+    actor = _get_actor(db, tenant_id, actor_id, project.created_by)
+    
     # Créer membre
     db_member = models.ProjectMember(
         project_id=project_id,
@@ -249,6 +418,11 @@ async def add_project_member(
     db.commit()
     db.refresh(db_member)
     
+    activity_writer.record(
+        tenant_id, project_id, actor, "member_added",
+        f"{contact.name} joined as {member.role}", {"contact_id": contact.id, "role": member.role}
+    )
+    
     return db_member
 
 # === LIENS AVEC AUTRES MODULES ===
@@ -258,7 +432,8 @@ async def link_task_to_project(
     tenant_id: str,
     project_id: int,
     task_id: int,
-    db: Session = Depends(get_db)
+    actor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifications
     project = db.query(models.Project).filter_by(
@@ -283,6 +458,8 @@ async def link_task_to_project(
     if existing:
         raise HTTPException(status_code=400, detail="Task already linked to project")
     
+    actor = _get_actor(db, tenant_id, actor_id, project.created_by)
+    
     # Créer lien
     link = models.ProjectTask(
         project_id=project_id,
@@ -293,6 +470,10 @@ async def link_task_to_project(
     db.add(link)
     db.commit()
     
+    activity_writer.record(
+        tenant_id, project_id, actor, "task_linked", f"Task '{task.title}' linked", {"task_id": task_id}
+    )
+    
     return {"message": "Task linked to project successfully"}
 
 @router.post("/api/{tenant_id}/projects/{project_id}/documents/{document_id}")
@@ -300,7 +481,8 @@ async def link_document_to_project(
     tenant_id: str,
     project_id: int,
     document_id: int,
-    db: Session = Depends(get_db)
+    actor_id: Optional[int] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
     # Vérifications
     project = db.query(models.Project).filter_by(
@@ -316,6 +498,8 @@ async def link_document_to_project(
     if not project or not document:
         raise HTTPException(status_code=404, detail="Project or document not found")
     
+    actor = _get_actor(db, tenant_id, actor_id, project.created_by)
+    
     # Créer lien
     link = models.ProjectDocument(
         project_id=project_id,
@@ -326,15 +510,61 @@ async def link_document_to_project(
     db.add(link)
     db.commit()
     
+    activity_writer.record(
+        tenant_id, project_id, actor, "document_linked", f"Document '{document.name}' linked", {"document_id": document_id}
+    )
+    
     return {"message": "Document linked to project successfully"}
 
-# === STATISTIQUES ===
+# === ACTIVITÉ ===
 
-@router.get("/api/{tenant_id}/projects/stats", response_model=schemas.ProjectStats)
-async def get_project_stats(
+@router.get("/api/{tenant_id}/projects/{project_id}/activity", response_model=List[schemas.ProjectActivity])
+async def get_project_activity(
     tenant_id: str,
-    db: Session = Depends(get_db)
+    project_id: int,
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    activity_type: Optional[str] = Query(None),
+    db: Session = Depends(get_tenant_db)
 ):
+    # Index (tenant_id, project_id, created_at); les activités sont écrites par lots (~1s de délai)
+    query = db.query(models.ProjectActivity).filter(
+        models.ProjectActivity.tenant_id == tenant_id,
+        models.ProjectActivity.project_id == project_id
+    )
+    
+    if activity_type:
+        query = query.filter(models.ProjectActivity.activity_type == activity_type)
+    
+    return _activity_feed(query, cursor, limit)
+
+@router.get("/api/{tenant_id}/projects/{project_id}/calendar.ics")
+async def get_project_feed(
+    tenant_id: str,
+    project_id: int,
+    request: Request,
+    db: Session = Depends(get_tenant_db)
+):
+    """Abonnement .ics aux événements liés au projet"""
+    project = db.query(models.Project).filter_by(id=project_id, tenant_id=tenant_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    criteria = (
+        models.ProjectEvent.tenant_id == tenant_id,
+        models.ProjectEvent.project_id == project_id,
+    )
+    etag = ics.compute_etag(db, f"project:{tenant_id}:{project_id}", select(
+        func.count(Event.id), func.max(Event.updated_at), func.max(models.ProjectEvent.updated_at)
+    ).join(models.ProjectEvent, models.ProjectEvent.event_id == Event.id).where(*criteria))
+    
+    query = ics.feed_query(*criteria).join(models.ProjectEvent, models.ProjectEvent.event_id == Event.id)
+    return ics.feed_response(request, db, project.name, f"project-{project_id}", etag, query)
+
+# === STATISTIQUES ===
+
+def _project_stats(db: Session, tenant_id: str) -> dict:
+    """Compteurs des projets (aussi utilisés par le dashboard)"""
     total_projects = db.query(models.Project).filter_by(
         tenant_id=tenant_id,
         is_archived=False
@@ -351,14 +581,15 @@ async def get_project_stats(
         status="completed"
     ).count()
     
-    # Projets en retard
-    now = datetime.now()
-    overdue_projects = db.query(models.Project).filter(
+    # Projets en retard / échéance proche (état maintenu par le suivi des échéances)
+    due_state = due_tracker.state_of("project")
+    deadline_states = dict(db.query(
+        due_state,
+        func.count(models.Project.id)
+    ).filter(
         models.Project.tenant_id == tenant_id,
-        models.Project.deadline < now,
-        models.Project.status.in_(["planning", "active"]),
-        models.Project.is_archived == False
-    ).count()
+        due_state.in_([DUE_SOON, OVERDUE])
+    ).group_by(due_state).all())
     
     # Répartition par statut
     projects_by_status = db.query(
@@ -382,7 +613,8 @@ async def get_project_stats(
         "total_projects": total_projects,
         "active_projects": active_projects,
         "completed_projects": completed_projects,
-        "overdue_projects": overdue_projects,
+        "overdue_projects": deadline_states.get(OVERDUE, 0),
+        "due_soon_projects": deadline_states.get(DUE_SOON, 0),
         "projects_by_status": {status: count for status, count in projects_by_status},
         "projects_by_priority": {priority: count for priority, count in projects_by_priority}
     }
\ No newline at end of file
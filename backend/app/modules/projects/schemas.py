@@ -61,6 +61,7 @@ class ProjectResponse(ProjectBase):
     tenant_id: str
     created_by: int
     is_archived: bool
+    due_state: Optional[str] = None  # pending, due_soon, overdue
     created_at: datetime
     updated_at: datetime
     creator: ContactInfo
@@ -85,6 +86,7 @@ class TaskSimple(BaseModel):
     status: str
     assignee_id: Optional[int]
     due_date: Optional[datetime]
+    due_state: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -123,6 +125,7 @@ class ProjectStats(BaseModel):
     active_projects: int
     completed_projects: int
     overdue_projects: int
+    due_soon_projects: int = 0
     projects_by_status: dict
     projects_by_priority: dict
 
@@ -131,7 +134,7 @@ class ProjectActivity(BaseModel):
     project_id: int
     contact_id: int
     activity_type: str
-    description: str
+    description: Optional[str] = None
     activity_metadata: Optional[str] = None  # Renommé ici aussi
     created_at: datetime
     contact: ContactInfo
@@ -1,12 +1,23 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Index
 from app.core.models import BaseModel
 
 class Task(BaseModel):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Filtres de list_tasks et colonnes du board (statut puis échéance)
+        Index("ix_tasks_tenant_status_due", "tenant_id", "status", "due_date"),
+        Index("ix_tasks_tenant_assignee_status", "tenant_id", "assignee_id", "status"),
+        Index("ix_tasks_tenant_priority_due", "tenant_id", "priority", "due_date"),
+        Index("ix_tasks_tenant_due", "tenant_id", "due_date"),
+        # Retards et échéances proches (lectures par tenant, file du suivi des échéances)
+        Index("ix_tasks_tenant_due_state_due", "tenant_id", "due_state", "due_date"),
+        Index("ix_tasks_due_state_due", "due_state", "due_date"),
+    )
     
     title = Column(String(200), nullable=False)
     description = Column(String(1000))
     assignee_id = Column(Integer, ForeignKey("contacts.id"))
     status = Column(String(20), default="todo")  # todo, in_progress, done
     priority = Column(String(10), default="medium")  # low, medium, high
-    due_date = Column(DateTime)
\ No newline at end of file
+    due_date = Column(DateTime)
+    due_state = Column(String(20))  # pending, due_soon, overdue (maintenu par app.core.due_dates)
\ No newline at end of file
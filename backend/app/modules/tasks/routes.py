@@ -1,25 +1,153 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session, aliased
+from typing import List, Optional
+from datetime import datetime
 
-from app.core.database import get_db
+from app.core.tenant import get_tenant_db
+from app.core.due_dates import due_tracker, Tracker
+from app.core.export import ExportFormat, export_response, table_columns
+from app.modules.contacts.autocomplete import record_interaction
 from . import models, schemas
 
 router = APIRouter()
 
+due_tracker.track(Tracker(
+    "task", models.Task, "due_date",
+    open_clause=or_(models.Task.status.is_(None), models.Task.status != "done"),
+    payload=("assignee_id", "title")
+))
+
+BOARD_COLUMNS = ["todo", "in_progress", "done"]
+PRIORITY_RANK = {"high": 0, "medium": 1, "low": 2}
+SORT_PATTERN = "^-?(due_date|created_at|updated_at|priority|title|status)$"
+
+def _filter_tasks(query, tenant_id: str, status: Optional[List[str]], assignee_id: Optional[int],
+                  unassigned: bool, priority: Optional[List[str]], due_before: Optional[datetime],
+                  due_after: Optional[datetime], due_state: Optional[List[str]] = None):
+    Task = models.Task
+    query = query.filter(Task.tenant_id == tenant_id)
+    if status:
+        query = query.filter(Task.status.in_(status))
+    if assignee_id:
+        query = query.filter(Task.assignee_id == assignee_id)
+    elif unassigned:
+        query = query.filter(Task.assignee_id.is_(None))
+    if priority:
+        query = query.filter(Task.priority.in_(priority))
+    if due_before:
+        query = query.filter(Task.due_date < due_before)
+    if due_after:
+        query = query.filter(Task.due_date >= due_after)
+    if due_state:
+        query = query.filter(due_tracker.state_of("task").in_(due_state))
+    return query
+
+def _order_by(sort: str):
+    """"due_date", "-created_at", "priority"... Les échéances vides en dernier, id pour départager"""
+    Task = models.Task
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field == "priority":
+        column = case(PRIORITY_RANK, value=Task.priority, else_=len(PRIORITY_RANK))
+    else:
+        column = getattr(Task, field)
+    column = column.desc() if descending else column.asc()
+    if field == "due_date":
+        column = column.nulls_last()
+    return [column, Task.id.desc() if descending else Task.id.asc()]
+
 @router.get("/api/{tenant_id}/tasks", response_model=List[schemas.TaskResponse])
-async def list_tasks(tenant_id: str, db: Session = Depends(get_db)):
-    tasks = db.query(models.Task).filter_by(tenant_id=tenant_id).all()
-    return tasks
+async def list_tasks(
+    tenant_id: str,
+    status: Optional[List[str]] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    unassigned: bool = Query(False),
+    priority: Optional[List[str]] = Query(None),
+    due_before: Optional[datetime] = Query(None),
+    due_after: Optional[datetime] = Query(None),
+    due_state: Optional[List[str]] = Query(None),
+    sort: str = Query("created_at", pattern=SORT_PATTERN),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_tenant_db)
+):
+    query = _filter_tasks(
+        db.query(models.Task), tenant_id, status, assignee_id, unassigned, priority, due_before, due_after, due_state
+    ).order_by(*_order_by(sort))
+
+    if limit:
+        query = query.limit(limit).offset(offset)
+
+    return query.all()
+
+@router.get("/api/{tenant_id}/tasks/board", response_model=schemas.TaskBoard)
+async def get_task_board(
+    tenant_id: str,
+    per_column: int = Query(20, ge=1, le=200),
+    status: Optional[List[str]] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    unassigned: bool = Query(False),
+    priority: Optional[List[str]] = Query(None),
+    due_before: Optional[datetime] = Query(None),
+    due_after: Optional[datetime] = Query(None),
+    due_state: Optional[List[str]] = Query(None),
+    sort: str = Query("due_date", pattern=SORT_PATTERN),
+    db: Session = Depends(get_tenant_db)
+):
+    # Une seule requête: rang et total par colonne via fonctions de fenêtre
+    Task = models.Task
+    rank = func.row_number().over(partition_by=Task.status, order_by=_order_by(sort)).label("rank")
+    total = func.count().over(partition_by=Task.status).label("total")
+    ranked = _filter_tasks(
+        db.query(Task, rank, total), tenant_id, status, assignee_id, unassigned, priority, due_before, due_after, due_state
+    ).subquery()
+
+    task = aliased(Task, ranked)
+    rows = db.query(task, ranked.c.total).filter(
+        ranked.c.rank <= per_column
+    ).order_by(ranked.c.status, ranked.c.rank).all()
+
+    columns = {name: {"status": name, "total": 0, "tasks": []} for name in (status or BOARD_COLUMNS)}
+    for row_task, row_total in rows:
+        column = columns.setdefault(row_task.status, {"status": row_task.status, "total": 0, "tasks": []})
+        column["total"] = row_total
+        column["tasks"].append(row_task)
+
+    return {"columns": list(columns.values())}
+
+@router.get("/api/{tenant_id}/tasks/export")
+async def export_tasks(
+    tenant_id: str,
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+    gzip: bool = Query(False),
+    status: Optional[List[str]] = Query(None),
+    assignee_id: Optional[int] = Query(None),
+    unassigned: bool = Query(False),
+    priority: Optional[List[str]] = Query(None),
+    due_before: Optional[datetime] = Query(None),
+    due_after: Optional[datetime] = Query(None),
+    due_state: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_tenant_db)
+):
+    # Mêmes filtres que list_tasks, sans tri ni pagination
+    query = _filter_tasks(
+        select(*table_columns(models.Task)), tenant_id, status, assignee_id, unassigned,
+        priority, due_before, due_after, due_state
+    )
+    return export_response(db, query, "tasks", format, gzip)
 
 @router.post("/api/{tenant_id}/tasks", response_model=schemas.TaskResponse)
 async def create_task(
     tenant_id: str,
     task: schemas.TaskCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_tenant_db)
 ):
     db_task = models.Task(**task.dict(), tenant_id=tenant_id)
     db.add(db_task)
+    db.flush()
+    due_tracker.sync(db, "task", tenant_id, [db_task.id])
+    record_interaction(db, tenant_id, [db_task.assignee_id])
     db.commit()
     db.refresh(db_task)
-    return db_task
\ No newline at end of file
+    return db_task
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class TaskBase(BaseModel):
@@ -16,8 +16,17 @@ class TaskCreate(TaskBase):
 class TaskResponse(TaskBase):
     id: int
     tenant_id: str
+    due_state: Optional[str] = None  # pending, due_soon, overdue
     created_at: datetime
     updated_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BoardColumn(BaseModel):
+    status: str
+    total: int  # Nombre total de tâches de la colonne (filtres appliqués)
+    tasks: List[TaskResponse]
+
+class TaskBoard(BaseModel):
+    columns: List[BoardColumn]
@@ -0,0 +1,151 @@
+# backend/app/server.py
+# Point d'entrée de production: N workers uvicorn et métriques Prometheus agrégées
+#
+#   python -m app.server                 # un worker par cœur disponible
+#   WEB_CONCURRENCY=4 python -m app.server --port 8000
+#
+# Les workers écrivent leurs métriques dans PROMETHEUS_MULTIPROC_DIR (vidé au
+# démarrage), /metrics agrège tous les processus. Un worker mort est remplacé et
+# ses gauges "live" sont retirées. Un worker mort peu après son démarrage (import,
+# base indisponible au lifespan) est remplacé après un délai doublé à chaque échec;
+# le superviseur s'arrête (code 1) après WORKER_MAX_FAST_FAILURES échecs rapides de suite.
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+from uvicorn.supervisors import Multiprocess
+from prometheus_client import multiprocess
+
+# Intervalle de surveillance des workers (secondes)
+WORKER_CHECK_INTERVAL = 1.0
+# Durée de vie en deçà de laquelle une sortie est un échec rapide, premier délai de
+# remplacement (doublé à chaque échec rapide) et plafond (secondes)
+WORKER_MIN_UPTIME = float(os.getenv("WORKER_MIN_UPTIME", "10"))
+WORKER_RESTART_DELAY = float(os.getenv("WORKER_RESTART_DELAY", "1"))
+WORKER_RESTART_MAX_DELAY = float(os.getenv("WORKER_RESTART_MAX_DELAY", "60"))
+WORKER_MAX_FAST_FAILURES = int(os.getenv("WORKER_MAX_FAST_FAILURES", "5"))
+
+def available_cpus() -> int:
+    """Cœurs utilisables: affinité CPU puis quota cgroup (conteneurs)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "max 100000" ou "200000 100000"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota:
+        cpus = min(cpus, max(1, int(quota)))
+    return max(1, cpus)
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+
+def prepare_metrics_dir(path=None) -> str:
+    """Répertoire multiprocess propre: des fichiers d'une exécution précédente fausseraient les compteurs"""
+    path = path or os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.path.join(tempfile.gettempdir(), "workos-metrics")
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    # Doit être défini avant l'import de prometheus_client dans les workers
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+class Supervisor(Multiprocess):
+    """Superviseur uvicorn qui remplace les workers morts"""
+
+    def run(self) -> int:
+        """Retourne le code de sortie du process: 1 si les workers ne démarrent pas"""
+        self.exit_code = 0
+        self.startup()
+        # Par worker: démarrage, échecs rapides consécutifs, heure de remplacement prévue
+        self.started_at = [time.monotonic()] * len(self.processes)
+        self.fast_failures = [0] * len(self.processes)
+        self.restart_at = [None] * len(self.processes)
+        while not self.should_exit.wait(WORKER_CHECK_INTERVAL):
+            self.restart_dead_workers()
+        self.shutdown()
+        for process in self.processes:
+            multiprocess.mark_process_dead(process.pid)
+        return self.exit_code
+
+    def restart_dead_workers(self):
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+
+            if self.restart_at[index] is None:
+                # Les compteurs du worker mort restent agrégés, ses gauges live sont retirées
+                multiprocess.mark_process_dead(process.pid)
+                if now - self.started_at[index] < WORKER_MIN_UPTIME:
+                    self.fast_failures[index] += 1
+                else:
+                    self.fast_failures[index] = 0
+                failures = self.fast_failures[index]
+                if failures >= WORKER_MAX_FAST_FAILURES:
+                    print(f"Worker {process.pid} exited with code {process.exitcode}, "
+                          f"{failures} failures right after startup: stopping")
+                    self.exit_code = 1
+                    self.should_exit.set()
+                    return
+                delay = min(WORKER_RESTART_DELAY * 2 ** (failures - 1), WORKER_RESTART_MAX_DELAY) if failures else 0
+                print(f"Worker {process.pid} exited with code {process.exitcode}, restarting in {delay:g}s")
+                self.restart_at[index] = now + delay
+
+            if now >= self.restart_at[index]:
+                replacement = get_subprocess(config=self.config, target=self.target, sockets=self.sockets)
+                replacement.start()
+                self.processes[index] = replacement
+                self.started_at[index] = time.monotonic()
+                self.restart_at[index] = None
+
+def main():
+    parser = argparse.ArgumentParser(description="WorkOS API server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--metrics-dir", default=None, help="PROMETHEUS_MULTIPROC_DIR")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+
+    metrics_dir = prepare_metrics_dir(args.metrics_dir)
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level,
+        proxy_headers=True,
+    )
+    server = uvicorn.Server(config)
+    print(f"Starting {args.workers} worker(s) on {args.host}:{args.port} (metrics in {metrics_dir})")
+
+    # Toujours supervisé, même avec un seul worker: redémarrage et métriques multiprocess
+    sock = config.bind_socket()
+    sys.exit(Supervisor(config, target=server.run, sockets=[sock]).run())
+
+if __name__ == "__main__":
+    main()
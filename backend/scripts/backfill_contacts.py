@@ -0,0 +1,92 @@
+# backend/scripts/backfill_contacts.py
+# Mise à niveau des contacts existants pour la déduplication par email et l'autocomplétion
+#
+#   python scripts/backfill_contacts.py
+#
+# Étape obligatoire sur une base antérieure à normalized_email (exécutée aussi par
+# init_db, sans effet sur une base à jour): create_all ne modifie pas une table
+# existante. Sur chaque shard: ajout de la colonne, déduplication, remplissage depuis
+# email puis création de l'index unique (tenant_id, normalized_email). Autocomplétion:
+# ajout de last_interaction_at (vide jusqu'à la prochaine interaction) et de ses index.
+#
+# Les doublons existants d'un tenant ne sont pas fusionnés (messages, tâches et
+# événements y font référence): le plus ancien garde la clé de déduplication, les
+# autres restent des contacts sans clé (ignorés par l'import CSV) et sont comptés.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.core.tenant import shard_router
+
+# Même normalisation que importer.normalize_email (minuscules, sans espaces autour)
+NORMALIZED = "NULLIF(LOWER(BTRIM(email, E' \\t\\r\\n')), '')"
+
+def backfill_contacts(engine):
+    """Retourne (contacts remplis, contacts en doublon laissés sans clé)"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS normalized_email VARCHAR(100)"))
+        conn.execute(text("ALTER TABLE contacts ADD COLUMN IF NOT EXISTS last_interaction_at TIMESTAMP"))
+
+        # Doublons déjà présents (écrits avant la création de l'index): seul le plus ancien garde sa clé
+        conn.execute(text("""
+            UPDATE contacts SET normalized_email = NULL
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY tenant_id, normalized_email ORDER BY id) AS rank
+                    FROM contacts
+                    WHERE normalized_email IS NOT NULL
+                ) ranked
+                WHERE rank > 1
+            )
+        """))
+
+        # Un email par tenant: le plus ancien contact, si la clé n'est pas déjà prise (relance idempotente)
+        filled = conn.execute(text(f"""
+            UPDATE contacts
+            SET normalized_email = ranked.normalized
+            FROM (
+                SELECT id, tenant_id, normalized,
+                       ROW_NUMBER() OVER (PARTITION BY tenant_id, normalized ORDER BY id) AS rank
+                FROM (
+                    SELECT id, tenant_id, {NORMALIZED} AS normalized
+                    FROM contacts
+                    WHERE normalized_email IS NULL AND email IS NOT NULL
+                ) pending
+                WHERE normalized IS NOT NULL
+            ) ranked
+            WHERE contacts.id = ranked.id
+              AND ranked.rank = 1
+              AND NOT EXISTS (
+                  SELECT 1 FROM contacts other
+                  WHERE other.tenant_id = ranked.tenant_id AND other.normalized_email = ranked.normalized
+              )
+        """)).rowcount
+
+        duplicates = conn.execute(text(f"""
+            SELECT COUNT(*) FROM contacts
+            WHERE normalized_email IS NULL AND {NORMALIZED} IS NOT NULL
+        """)).scalar()
+
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_contacts_tenant_normalized_email "
+            "ON contacts (tenant_id, normalized_email)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_contacts_tenant_updated_at ON contacts (tenant_id, updated_at)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_contacts_tenant_last_interaction_at "
+            "ON contacts (tenant_id, last_interaction_at)"
+        ))
+
+    return filled, duplicates
+
+def backfill_all_shards():
+    for shard in shard_router.shards():
+        filled, duplicates = backfill_contacts(shard_router.engine(shard))
+        print(f"✅ Contacts on shard '{shard}': {filled} normalized emails filled, {duplicates} duplicates left without key")
+
+if __name__ == "__main__":
+    backfill_all_shards()
@@ -0,0 +1,39 @@
+# backend/scripts/backfill_document_texts.py
+# Mise à niveau des documents existants pour l'extraction de texte
+#
+#   python scripts/backfill_document_texts.py
+#
+# À exécuter une fois (exécuté aussi par init_db, un seul parcours par id sur une
+# base à jour): crée la ligne document_texts des documents antérieurs à
+# l'extraction, que le rattrapage périodique des process extrait ensuite, et
+# remplace l'index de recherche sur tout le contenu par l'index sur son préfixe
+# (create_all ne modifie pas une table existante).
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.tenant import shard_router
+from app.modules.documents.extraction import backfill_texts
+from app.modules.documents.models import DocumentText
+
+def backfill_document_texts(engine) -> int:
+    """Retourne le nombre de documents ajoutés à l'extraction"""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX IF EXISTS ix_document_texts_search"))
+            for index in DocumentText.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+    with Session(bind=engine) as db:
+        return backfill_texts(db)
+
+def backfill_all_shards():
+    for shard in shard_router.shards():
+        added = backfill_document_texts(shard_router.engine(shard))
+        print(f"✅ Document texts on shard '{shard}': {added} documents queued for extraction")
+
+if __name__ == "__main__":
+    backfill_all_shards()
@@ -0,0 +1,90 @@
+# backend/scripts/backfill_documents.py
+# Mise à niveau des documents existants pour l'historique des versions et les aperçus
+#
+#   python scripts/backfill_documents.py
+#
+# Étape obligatoire sur une base antérieure au stockage en delta (exécutée aussi par
+# init_db, sans effet sur une base à jour): create_all ne modifie pas une table
+# existante. Sur chaque shard: ajout des colonnes de document_versions, les versions
+# existantes étant des copies complètes (storage_kind 'full', tailles inconnues), puis
+# création de la contrainte (document_id, version_number) si l'historique la respecte.
+# Aperçus: ajout des colonnes de documents et statut initial des documents qui n'en ont
+# pas (initial_status: "pending" est rendu à la première consultation de l'aperçu).
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+
+from app.core.tenant import shard_router
+from app.modules.documents.previews import initial_status
+
+BATCH_SIZE = 5000
+
+def backfill_documents(engine):
+    """Retourne (versions mises à niveau, numéros de version en double empêchant la contrainte)"""
+    with engine.begin() as conn:
+        upgraded = 0
+        if "storage_kind" not in {column["name"] for column in inspect(conn).get_columns("document_versions")}:
+            conn.execute(text(
+                "ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS storage_kind VARCHAR(10) NOT NULL DEFAULT 'full'"
+            ))
+            conn.execute(text("ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS file_size BIGINT"))
+            conn.execute(text("ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS stored_size BIGINT"))
+            conn.execute(text("ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS mime_type VARCHAR(100)"))
+            upgraded = conn.execute(text("SELECT COUNT(*) FROM document_versions")).scalar()
+
+        duplicates = conn.execute(text("""
+            SELECT COUNT(*) FROM (
+                SELECT document_id, version_number FROM document_versions
+                GROUP BY document_id, version_number HAVING COUNT(*) > 1
+            ) duplicated
+        """)).scalar()
+        if not duplicates:
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_document_versions_document_number "
+                "ON document_versions (document_id, version_number)"
+            ))
+
+    return upgraded, duplicates
+
+def backfill_previews(engine) -> int:
+    """Retourne le nombre de documents dont le statut d'aperçu a été initialisé"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS preview_status VARCHAR(20)"))
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS preview_version INTEGER"))
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS thumbnail_path VARCHAR(500)"))
+        conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS preview_path VARCHAR(500)"))
+
+    filled = last_id = 0
+    while True:
+        # Un lot par transaction: pas de verrou long sur une grosse table
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, mime_type, file_size FROM documents "
+                "WHERE preview_status IS NULL AND id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+            if not rows:
+                return filled
+
+            statuses = {}
+            for document_id, mime_type, file_size in rows:
+                statuses.setdefault(initial_status(mime_type, file_size), []).append(document_id)
+            for status, ids in statuses.items():
+                conn.execute(
+                    text("UPDATE documents SET preview_status = :status WHERE id = ANY(:ids) AND preview_status IS NULL"),
+                    {"status": status, "ids": ids}
+                )
+            filled += len(rows)
+            last_id = rows[-1][0]
+
+def backfill_all_shards():
+    for shard in shard_router.shards():
+        engine = shard_router.engine(shard)
+        upgraded, duplicates = backfill_documents(engine)
+        filled = backfill_previews(engine)
+        print(f"✅ Documents on shard '{shard}': {upgraded} versions upgraded, {duplicates} duplicated version numbers, "
+              f"{filled} preview statuses set")
+
+if __name__ == "__main__":
+    backfill_all_shards()
@@ -0,0 +1,90 @@
+# backend/scripts/backfill_folders.py
+# Mise à niveau des dossiers existants: chemin matérialisé et cumuls récursifs
+#
+#   python scripts/backfill_folders.py
+#
+# Étape obligatoire sur une base antérieure à folders.path (exécutée aussi par init_db,
+# sans effet sur une base à jour): create_all ne modifie pas une table existante et les
+# dossiers déjà présents garderaient le chemin "/", que les filtres de sous-arbre et de
+# recherche (path LIKE '/%') lisent comme tout le tenant. Sur chaque shard: ajout des
+# colonnes, calcul de path/depth depuis parent_id (CTE récursive, racines d'abord) puis
+# création de l'index (tenant_id, path).
+#
+# Cumuls récursifs (total_size, document_count): calculés une seule fois, à l'ajout des
+# colonnes, en rattachant chaque document à tous les dossiers de son chemin; ils sont
+# ensuite maintenus par les routes.
+#
+# Un dossier qu'aucune chaîne de parents du même tenant ne relie à une racine (cycle
+# hérité) garde "/" et est compté: à rattacher à la main avant usage.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+
+from app.core.tenant import shard_router
+from app.modules.documents.models import Folder
+
+def backfill_folders(engine):
+    """Retourne (dossiers mis à jour, dossiers sans chemin jusqu'à une racine)"""
+    with engine.begin() as conn:
+        rollups_missing = "total_size" not in {column["name"] for column in inspect(conn).get_columns("folders")}
+        conn.execute(text("ALTER TABLE folders ADD COLUMN IF NOT EXISTS path VARCHAR(1000) NOT NULL DEFAULT '/'"))
+        conn.execute(text("ALTER TABLE folders ADD COLUMN IF NOT EXISTS depth INTEGER NOT NULL DEFAULT 0"))
+
+        # Les dossiers créés depuis ont toujours un chemin complet: "/" = dossier à remplir
+        pending = conn.execute(text("SELECT 1 FROM folders WHERE path = '/' LIMIT 1")).first()
+        updated = 0
+        if pending:
+            updated = conn.execute(text("""
+                WITH RECURSIVE tree AS (
+                    SELECT id, tenant_id, '/' || id || '/' AS path, 0 AS depth
+                    FROM folders
+                    WHERE parent_id IS NULL
+                    UNION ALL
+                    SELECT child.id, child.tenant_id, tree.path || child.id || '/', tree.depth + 1
+                    FROM folders child
+                    JOIN tree ON child.parent_id = tree.id AND child.tenant_id = tree.tenant_id
+                )
+                UPDATE folders
+                SET path = tree.path, depth = tree.depth
+                FROM tree
+                WHERE folders.id = tree.id
+                  AND (folders.path <> tree.path OR folders.depth <> tree.depth)
+            """)).rowcount
+
+        orphans = conn.execute(text("SELECT COUNT(*) FROM folders WHERE path = '/'")).scalar()
+
+        if rollups_missing:
+            conn.execute(text("ALTER TABLE folders ADD COLUMN IF NOT EXISTS total_size BIGINT NOT NULL DEFAULT 0"))
+            conn.execute(text("ALTER TABLE folders ADD COLUMN IF NOT EXISTS document_count INTEGER NOT NULL DEFAULT 0"))
+            # Chaque document compte pour tous les ids de son chemin (dossier inclus);
+            # un dossier sans chemin ("/", cycle hérité) ne reçoit aucun cumul
+            conn.execute(text("""
+                UPDATE folders
+                SET total_size = rollup.total_size, document_count = rollup.document_count
+                FROM (
+                    SELECT CAST(ancestor AS INTEGER) AS id,
+                           SUM(COALESCE(documents.file_size, 0)) AS total_size,
+                           COUNT(*) AS document_count
+                    FROM documents
+                    JOIN folders parent ON parent.id = documents.folder_id AND parent.tenant_id = documents.tenant_id
+                    CROSS JOIN LATERAL unnest(string_to_array(BTRIM(parent.path, '/'), '/')) AS ancestor
+                    WHERE parent.path <> '/'
+                    GROUP BY ancestor
+                ) rollup
+                WHERE folders.id = rollup.id
+            """))
+
+        for index in Folder.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+    return updated, orphans
+
+def backfill_all_shards():
+    for shard in shard_router.shards():
+        updated, orphans = backfill_folders(shard_router.engine(shard))
+        print(f"✅ Folders on shard '{shard}': {updated} paths filled, {orphans} folders unreachable from a root")
+
+if __name__ == "__main__":
+    backfill_all_shards()
@@ -0,0 +1,73 @@
+# backend/scripts/backfill_messages.py
+# Mise à niveau des messages existants pour les statistiques de thread
+#
+#   python scripts/backfill_messages.py
+#
+# Étape obligatoire sur une base antérieure à messages.reply_count (exécutée aussi par
+# init_db, sans effet sur une base à jour): create_all ne modifie pas une table
+# existante. Sur chaque shard: ajout des colonnes, puis calcul unique (à l'ajout) du
+# nombre de réponses, de la dernière réponse et des derniers participants de chaque
+# message racine, ensuite maintenus par les routes; création des index de pagination.
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+
+from app.core.tenant import shard_router
+from app.modules.messages.models import Message
+from app.modules.messages.routes import RECENT_PARTICIPANTS_LIMIT
+
+def backfill_messages(engine) -> int:
+    """Retourne le nombre de threads dont les statistiques ont été calculées"""
+    with engine.begin() as conn:
+        if "reply_count" in {column["name"] for column in inspect(conn).get_columns("messages")}:
+            threads = 0
+        else:
+            conn.execute(text("ALTER TABLE messages ADD COLUMN IF NOT EXISTS reply_count INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text("ALTER TABLE messages ADD COLUMN IF NOT EXISTS last_reply_at TIMESTAMP"))
+            conn.execute(text("ALTER TABLE messages ADD COLUMN IF NOT EXISTS recent_participant_ids JSON"))
+
+            threads = conn.execute(text("""
+                UPDATE messages
+                SET reply_count = stats.reply_count, last_reply_at = stats.last_reply_at
+                FROM (
+                    SELECT tenant_id, thread_id, COUNT(*) AS reply_count, MAX(created_at) AS last_reply_at
+                    FROM messages
+                    WHERE thread_id IS NOT NULL
+                    GROUP BY tenant_id, thread_id
+                ) stats
+                WHERE messages.id = stats.thread_id AND messages.tenant_id = stats.tenant_id
+            """)).rowcount
+
+            # Derniers contacts ayant répondu, plus récent en premier (comme create_message)
+            conn.execute(text("""
+                UPDATE messages
+                SET recent_participant_ids = recent.ids
+                FROM (
+                    SELECT tenant_id, thread_id, json_agg(sender_id ORDER BY rank) AS ids
+                    FROM (
+                        SELECT tenant_id, thread_id, sender_id,
+                               ROW_NUMBER() OVER (PARTITION BY tenant_id, thread_id ORDER BY MAX(id) DESC) AS rank
+                        FROM messages
+                        WHERE thread_id IS NOT NULL
+                        GROUP BY tenant_id, thread_id, sender_id
+                    ) senders
+                    WHERE rank <= :limit
+                    GROUP BY tenant_id, thread_id
+                ) recent
+                WHERE messages.id = recent.thread_id AND messages.tenant_id = recent.tenant_id
+            """), {"limit": RECENT_PARTICIPANTS_LIMIT})
+
+        for index in Message.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+    return threads
+
+def backfill_all_shards():
+    for shard in shard_router.shards():
+        threads = backfill_messages(shard_router.engine(shard))
+        print(f"✅ Messages on shard '{shard}': thread statistics computed for {threads} threads")
+
+if __name__ == "__main__":
+    backfill_all_shards()
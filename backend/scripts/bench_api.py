@@ -0,0 +1,302 @@
+# backend/scripts/bench_api.py
+# Benchmark de charge de l'API: workload mixte, p50/p95/p99 et débit par route
+#
+#   python scripts/bench_api.py --database-url postgresql://localhost/workos_bench \
+#       --duration 60 --concurrency 16 --output bench/baseline.json
+#   python scripts/bench_api.py ... --compare bench/baseline.json --threshold 0.15
+#
+# Lance l'application (uvicorn) contre la base indiquée, crée un jeu de données via
+# l'API puis mesure. Sortie non nulle si une route régresse au-delà du seuil.
+import sys
+import os
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+import statistics
+import http.client
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Poids relatifs des scénarios du workload mixte
+WORKLOAD = {
+    "message_polling": 45,
+    "calendar_view": 25,
+    "project_dashboard": 20,
+    "upload": 10,
+}
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return None
+
+class Client:
+    """Client HTTP keep-alive (une connexion par thread)"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def request(self, method, path, body=None, headers=None):
+        self.connection.request(method, path, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        data = response.read()
+        return response.status, data
+
+    def json(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        status, data = self.request(method, path, body, {"Content-Type": "application/json"})
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}: {data[:200]!r}")
+        return json.loads(data)
+
+    def upload(self, path, fields, filename, content):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n"
+        )
+        parts.append(f"--{boundary}--\r\n".encode())
+        return self.request("POST", path, b"".join(parts), {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+def seed(client, tenant, contacts, projects, messages, events):
+    """Jeu de données minimal créé via l'API"""
+    print(f"🌱 Seeding tenant '{tenant}'...")
+    contact_ids = [
+        client.json("POST", f"/api/{tenant}/contacts", {"name": f"User {i}", "email": f"user{i}@workos-bench.com"})["id"]
+        for i in range(contacts)
+    ]
+    now = datetime.utcnow().replace(microsecond=0)
+    for i in range(events):
+        start = now + timedelta(hours=random.randint(-72, 72))
+        client.json("POST", f"/api/{tenant}/events", {
+            "title": f"Event {i}",
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=30)).isoformat(),
+            "created_by": random.choice(contact_ids),
+            "participant_ids": random.sample(contact_ids, min(3, len(contact_ids)))
+        })
+    for i in range(messages):
+        client.json("POST", f"/api/{tenant}/messages", {
+            "content": f"Message {i}",
+            "sender_id": random.choice(contact_ids),
+            "channel": random.choice(["general", "dev", "random"])
+        })
+    project_ids = []
+    for i in range(projects):
+        project = client.json("POST", f"/api/{tenant}/projects", {
+            "name": f"Project {i}",
+            "created_by": random.choice(contact_ids),
+            "member_ids": random.sample(contact_ids, min(5, len(contact_ids)))
+        })
+        project_ids.append(project["id"])
+        for j in range(5):
+            task = client.json("POST", f"/api/{tenant}/tasks", {"title": f"Task {i}.{j}"})
+            client.json("POST", f"/api/{tenant}/projects/{project['id']}/tasks/{task['id']}")
+    return {"contacts": contact_ids, "projects": project_ids}
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, route, elapsed, ok):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(elapsed)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+def scenario(name, client, tenant, data, rng):
+    """Retourne la liste des (route, appel) d'un scénario"""
+    if name == "message_polling":
+        contact = rng.choice(data["contacts"])
+        channel = rng.choice(["general", "dev", "random"])
+        return [
+            ("GET /api/{tenant_id}/messages", lambda: client.request("GET", f"/api/{tenant}/messages?" + urlencode({"channel": channel, "limit": 50}))),
+            ("GET /api/{tenant_id}/messages/unread", lambda: client.request("GET", f"/api/{tenant}/messages/unread?contact_id={contact}")),
+        ]
+    if name == "calendar_view":
+        start = datetime.utcnow() - timedelta(days=datetime.utcnow().weekday())
+        params = urlencode({"start_date": start.isoformat(), "end_date": (start + timedelta(days=7)).isoformat()})
+        return [
+            ("GET /api/{tenant_id}/calendar", lambda: client.request("GET", f"/api/{tenant}/calendar?{params}")),
+            ("GET /api/{tenant_id}/calendar/stats", lambda: client.request("GET", f"/api/{tenant}/calendar/stats")),
+        ]
+    if name == "project_dashboard":
+        project = rng.choice(data["projects"])
+        return [
+            ("GET /api/{tenant_id}/projects/{project_id}", lambda: client.request("GET", f"/api/{tenant}/projects/{project}")),
+            ("GET /api/{tenant_id}/tasks", lambda: client.request("GET", f"/api/{tenant}/tasks")),
+        ]
+    content = os.urandom(rng.randint(1_000, 200_000))
+    uploader = rng.choice(data["contacts"])
+    return [
+        ("POST /api/{tenant_id}/documents/upload", lambda: client.upload(
+            f"/api/{tenant}/documents/upload", {"uploaded_by": uploader}, "bench.bin", content
+        )),
+    ]
+
+def worker(port, tenant, data, recorder, deadline, seed_value):
+    rng = random.Random(seed_value)
+    client = Client(port)
+    names = list(WORKLOAD)
+    weights = [WORKLOAD[name] for name in names]
+    while time.perf_counter() < deadline:
+        for route, call in scenario(rng.choices(names, weights)[0], client, tenant, data, rng):
+            start = time.perf_counter()
+            try:
+                status, _ = call()
+                ok = status < 400
+            except Exception:
+                client = Client(port)
+                ok = False
+            recorder.record(route, time.perf_counter() - start, ok)
+
+def summarize(recorder, duration):
+    routes = {}
+    for route, latencies in sorted(recorder.latencies.items()):
+        ms = [value * 1000 for value in latencies]
+        routes[route] = {
+            "requests": len(ms),
+            "errors": recorder.errors.get(route, 0),
+            "throughput_rps": round(len(ms) / duration, 2),
+            "p50_ms": round(statistics.median(ms), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+        }
+    return routes
+
+def print_report(routes):
+    print(f"\n{'route':<48} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in routes.items():
+        print(
+            f"{route:<48} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+
+def compare(routes, baseline_path, threshold):
+    """Retourne la liste des régressions p95/p99 au-delà du seuil relatif"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for route, stats in routes.items():
+        reference = baseline["routes"].get(route)
+        if not reference:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if reference[metric] and stats[metric] > reference[metric] * (1 + threshold):
+                regressions.append(f"{route} {metric}: {reference[metric]:.1f} -> {stats[metric]:.1f} ms")
+    return regressions
+
+def start_server(database_url, port, workers):
+    env = dict(os.environ, DATABASE_URL=database_url, ADMISSION_CONTROL_ENABLED="false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    for _ in range(100):
+        try:
+            status, _ = Client(port).request("GET", "/health")
+            if status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latence de l'API WorkOS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenant", default=f"bench{int(time.time())}")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--contacts", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichier JSON des résultats (baseline)")
+    parser.add_argument("--compare", help="Baseline JSON à comparer")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Régression relative tolérée (0.15 = +15%%)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    random.seed(args.seed)
+    port = free_port()
+    server = start_server(args.database_url, port, args.server_workers)
+    try:
+        data = seed(Client(port), args.tenant, args.contacts, args.projects, args.messages, args.events)
+
+        # Préchauffage (non mesuré) puis mesure
+        for phase, duration in (("warmup", args.warmup), ("measure", args.duration)):
+            print(f"🏃 {phase}: {duration}s, {args.concurrency} clients")
+            recorder = Recorder()
+            deadline = time.perf_counter() + duration
+            threads = [
+                threading.Thread(target=worker, args=(port, args.tenant, data, recorder, deadline, args.seed + i))
+                for i in range(args.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    routes = summarize(recorder, args.duration)
+    print_report(routes)
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": {
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "server_workers": args.server_workers,
+            "workload": WORKLOAD,
+        },
+        "routes": routes,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(routes, args.compare, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regression over {args.threshold:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    main()
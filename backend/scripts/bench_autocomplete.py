@@ -0,0 +1,137 @@
+# backend/scripts/bench_autocomplete.py
+# Latence de l'autocomplétion des contacts (objectif: moins de 10 ms à 100k contacts)
+#
+#   python scripts/bench_autocomplete.py --database-url postgresql://localhost/workos_bench --contacts 100000
+#
+# Un tenant dédié reçoit --contacts contacts (noms, entreprises, une partie avec
+# une interaction récente). Le serveur (uvicorn, 1 process) est lancé contre la
+# base; la première requête charge l'index, les suivantes mesurent préfixes courts
+# (peu sélectifs), préfixes longs, plusieurs termes, emails et fautes de frappe.
+# GET /health donne le plancher HTTP (client, uvicorn, middlewares) à déduire;
+# la durée côté serveur (index seul) est lue dans /metrics.
+import sys
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from bench_api import Client, free_port, start_server, percentile, BACKEND_DIR
+
+sys.path.append(BACKEND_DIR)
+
+TARGET_MS = 10
+
+FIRST_NAMES = ["jean", "marie", "pierre", "sophie", "luc", "élodie", "thomas", "camille", "nicolas", "julie",
+               "antoine", "chloé", "hugo", "léa", "maxime", "manon", "olivier", "sarah", "paul", "inès"]
+LAST_NAMES = ["martin", "bernard", "dubois", "durand", "lefebvre", "moreau", "laurent", "simon", "michel",
+              "garcia", "david", "bertrand", "roux", "vincent", "fournier", "morel", "girard", "andré", "mercier"]
+
+QUERIES = {
+    "préfixe court": ["j", "m", "ma", "du", "so"],
+    "préfixe long": ["jean", "élodie", "fournier", "acme", "globex-12"],
+    "plusieurs termes": ["jean mar", "sophie dub", "hugo acme"],
+    "email": ["jean.martin", "sophie.dubois.1@", "contact-42@"],
+    "faute de frappe": ["fournir", "duarnd", "elodei"],
+}
+
+def contact_name(rng, i):
+    # Un nom de famille sur deux est rare (suffixe): vocabulaire réaliste pour les trigrammes
+    last = rng.choice(LAST_NAMES) + (f"-{i % 5000}" if i % 2 else "")
+    return f"{rng.choice(FIRST_NAMES).title()} {last.title()}", last
+
+def seed_contacts(database_url, tenant, count, batch=10000):
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+    from init_db import init_database
+    from app.core.database import engine
+    from app.modules.contacts.models import Contact
+
+    init_database()
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        for start in range(0, count, batch):
+            rows = []
+            for i in range(start, min(start + batch, count)):
+                name, last = contact_name(rng, i)
+                email = f"{name.split()[0].lower()}.{last}.{i}@example.com" if i % 3 else f"contact-{i}@example.com"
+                rows.append({
+                    "tenant_id": tenant, "name": name, "email": email, "normalized_email": email,
+                    "company": f"{rng.choice(['Acme', 'Globex', 'Initech', 'Umbrella'])}-{i % 300}",
+                    "type": "contact", "created_at": now, "updated_at": now,
+                    "last_interaction_at": now - timedelta(minutes=rng.randrange(60 * 24 * 90)) if i % 4 == 0 else None,
+                })
+            connection.execute(insert(Contact.__table__), rows)
+            print(f"   {min(start + batch, count)}/{count} contacts", end="\r")
+    print()
+
+def measure(client, path, repeat):
+    timings, results = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        status, data = client.request("GET", path)
+        timings.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            raise RuntimeError(f"GET {path} -> {status}: {data[:200]!r}")
+        results = len(json.loads(data)) if path != "/health" else 0
+    return timings, results
+
+def server_search_ms(client):
+    """Moyenne de workos_contacts_autocomplete_seconds{phase="search"} (index seul)"""
+    _, data = client.request("GET", "/metrics")
+    values = {}
+    for line in data.decode().splitlines():
+        if line.startswith("workos_contacts_autocomplete_seconds_") and 'phase="search"' in line:
+            name, value = line.rsplit(" ", 1)
+            values[name.split("{")[0].rsplit("_", 1)[1]] = float(value)
+    return values.get("sum", 0) / values["count"] * 1000 if values.get("count") else 0.0
+
+def autocomplete_path(tenant, query):
+    return f"/api/{tenant}/contacts/autocomplete?{urlencode({'q': query, 'limit': 10})}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'autocomplétion des contacts")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--contacts", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50, help="Requêtes par terme recherché")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (ou DATABASE_URL) est requis")
+
+    tenant = f"bench-autocomplete-{uuid.uuid4().hex[:8]}"
+    print(f"🌱 Tenant {tenant}: insertion de {args.contacts} contacts")
+    seed_contacts(args.database_url, tenant, args.contacts)
+
+    port = free_port()
+    process = start_server(args.database_url, port, 1)
+    try:
+        client = Client(port)
+        start = time.perf_counter()
+        measure(client, autocomplete_path(tenant, "jean"), 1)
+        print(f"\n📇 Chargement de l'index: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        print(f"\n🔎 {'requêtes':<18}{'p50':>9}{'p95':>9}{'max':>9}  résultats")
+        timings, _ = measure(client, "/health", args.repeat * 5)
+        print(f"      {'plancher HTTP':<16}{percentile(timings, 50):>7.2f}ms{percentile(timings, 95):>7.2f}ms"
+              f"{max(timings):>7.2f}ms")
+        for label, queries in QUERIES.items():
+            timings, counts = [], []
+            for query in queries:
+                query_timings, results = measure(client, autocomplete_path(tenant, query), args.repeat)
+                timings += query_timings
+                counts.append(results)
+            p95 = percentile(timings, 95)
+            verdict = "✅" if p95 < TARGET_MS else "⚠️"
+            print(f"   {verdict} {label:<16}{percentile(timings, 50):>7.2f}ms{p95:>7.2f}ms{max(timings):>7.2f}ms  {counts}")
+        print(f"\n⏱️  Recherche dans l'index (serveur, moyenne): {server_search_ms(client):.2f} ms")
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    main()
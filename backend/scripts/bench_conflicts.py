@@ -0,0 +1,142 @@
+# backend/scripts/bench_conflicts.py
+# Latence de la détection des doubles réservations pour un événement à N participants
+#
+#   python scripts/bench_conflicts.py --database-url postgresql://localhost/workos_bench \
+#       --participants 100 --events 5000 --iterations 50
+#
+# Crée un tenant dédié (contacts, événements acceptés répartis sur 30 jours) puis compare:
+#   - la requête ensembliste (_find_conflicts), une seule requête pour tous les participants
+#   - une requête par participant (approche naïve)
+#   - POST /events de bout en bout avec conflicts=ignore puis conflicts=report
+import sys
+import os
+import time
+import uuid
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def timed(function, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+def report(label, durations):
+    print(f"   {label:<38} p50 {statistics.median(durations):8.2f} ms   "
+          f"p95 {percentile(durations, 95):8.2f} ms   max {max(durations):8.2f} ms")
+
+def seed(db, models, tenant_id, participants, events, per_event, rng):
+    """Contacts et événements (participants acceptés) insérés par lots"""
+    from sqlalchemy import insert
+    from app.modules.contacts.models import Contact
+
+    now = datetime.utcnow()
+    db.execute(insert(Contact.__table__), [
+        {"tenant_id": tenant_id, "name": f"Bench {i}", "email": f"bench{i}@workos-bench.com",
+         "created_at": now, "updated_at": now}
+        for i in range(participants)
+    ])
+    contact_ids = [row.id for row in db.query(Contact.id).filter(Contact.tenant_id == tenant_id)]
+
+    base = now.replace(minute=0, second=0, microsecond=0)
+    for start in range(0, events, 1000):
+        count = min(1000, events - start)
+        rows = []
+        for _ in range(count):
+            begin = base + timedelta(minutes=30 * rng.randrange(30 * 48))
+            rows.append({
+                "tenant_id": tenant_id, "title": "Bench meeting", "start_time": begin,
+                "end_time": begin + timedelta(minutes=rng.choice((30, 60, 90))),
+                "created_by": rng.choice(contact_ids), "event_type": "MEETING",
+                "recurrence_type": "NONE", "is_all_day": False, "created_at": now, "updated_at": now
+            })
+        db.execute(insert(models.Event.__table__), rows)
+    event_ids = [row.id for row in db.query(models.Event.id).filter(models.Event.tenant_id == tenant_id)]
+
+    rows = []
+    for event_id in event_ids:
+        for contact_id in rng.sample(contact_ids, min(per_event, len(contact_ids))):
+            rows.append({
+                "tenant_id": tenant_id, "event_id": event_id, "contact_id": contact_id,
+                "status": rng.choice(("accepted", "accepted", "pending", "declined")),
+                "role": "attendee", "created_at": now, "updated_at": now
+            })
+    for start in range(0, len(rows), 5000):
+        db.execute(insert(models.EventParticipant.__table__), rows[start:start + 5000])
+    db.commit()
+    return contact_ids, base
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la détection des conflits d'agenda")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./bench_conflicts.db"))
+    parser.add_argument("--participants", type=int, default=100)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--per-event", type=int, default=5, help="Participants par événement existant")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["STARTUP_WARMUP"] = "false"
+
+    from fastapi.testclient import TestClient
+    from app.core.database import Base, engine, SessionLocal
+    from app.main import app
+    from app.modules.calendar import models
+    from app.modules.calendar.routes import _find_conflicts
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(args.seed)
+    tenant_id = f"bench-conflicts-{uuid.uuid4().hex[:8]}"
+
+    print(f"🌱 Tenant {tenant_id}: {args.participants} contacts, {args.events} événements")
+    db = SessionLocal()
+    contact_ids, base = seed(db, models, tenant_id, args.participants, args.events, args.per_event, rng)
+
+    def window():
+        begin = base + timedelta(minutes=30 * rng.randrange(30 * 48))
+        return begin, begin + timedelta(hours=1)
+
+    def set_based():
+        start, end = window()
+        return _find_conflicts(db, tenant_id, contact_ids, [(start, end)])
+
+    def per_participant():
+        start, end = window()
+        return [_find_conflicts(db, tenant_id, [contact_id], [(start, end)]) for contact_id in contact_ids]
+
+    found = [len(set_based()) for _ in range(args.iterations)]
+    print(f"🔎 Conflits trouvés par vérification: moyenne {statistics.mean(found):.1f}")
+
+    print(f"\n⏱️  Vérification pour {len(contact_ids)} participants ({args.iterations} itérations)")
+    report("requête ensembliste", timed(set_based, args.iterations))
+    report("une requête par participant", timed(per_participant, max(1, args.iterations // 5)))
+    db.close()
+
+    client = TestClient(app)
+
+    def create_event(mode):
+        start, end = window()
+        response = client.post(f"/api/{tenant_id}/events", params={"conflicts": mode}, json={
+            "title": "Bench all-hands", "start_time": start.isoformat(), "end_time": end.isoformat(),
+            "created_by": contact_ids[0], "participant_ids": contact_ids
+        })
+        assert response.status_code == 200, response.text
+
+    print(f"\n⏱️  POST /events avec {len(contact_ids)} participants")
+    report("conflicts=ignore", timed(lambda: create_event("ignore"), args.iterations))
+    report("conflicts=report", timed(lambda: create_event("report"), args.iterations))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# backend/scripts/bench_contact_import.py
+# Débit de l'import CSV de contacts (objectif: 100k contacts par minute)
+#
+#   python scripts/bench_contact_import.py --database-url postgresql://localhost/workos_bench --rows 200000
+#
+# Génère un CSV (avec doublons internes et variations de casse), lance le serveur
+# puis importe le fichier deux fois dans un tenant dédié: premier import (création)
+# et ré-import (tous les contacts existent déjà, mode skip puis update).
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+
+from bench_api import Client, free_port, start_server
+
+TARGET_PER_MINUTE = 100000
+
+def generate_csv(path, rows, duplicate_ratio, seed):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as output:
+        output.write("name,email,phone,company,type\n")
+        for i in range(rows):
+            # Une partie des lignes reprend un email déjà écrit (casse et espaces différents)
+            n = rng.randrange(i) if i and rng.random() < duplicate_ratio else i
+            email = f"Contact.{n}@Example-{n % 97}.com" if rng.random() < 0.5 else f" contact.{n}@example-{n % 97}.com"
+            phone = f"+33 6 {rng.randrange(10**8):08d}" if rng.random() < 0.7 else ""
+            output.write(f"Contact {n},{email},{phone},\"Company {n % 500}, Inc\",contact\n")
+
+def run_import(port, tenant, path, on_duplicate):
+    with open(path, "rb") as source:
+        content = source.read()
+    client = Client(port)
+    client.connection.timeout = 600  # wait=true: la réponse arrive à la fin de l'import
+    start = time.perf_counter()
+    status, data = client.upload(
+        f"/api/{tenant}/contacts/import?wait=true", {"on_duplicate": on_duplicate},
+        os.path.basename(path), content
+    )
+    elapsed = time.perf_counter() - start
+    if status != 200:
+        raise RuntimeError(f"Import failed: {status} {data[:200]!r}")
+    return json.loads(data), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'import CSV de contacts")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Part de lignes en doublon dans le fichier")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (ou DATABASE_URL) est requis")
+
+    path = os.path.join(tempfile.gettempdir(), f"bench-contacts-{uuid.uuid4().hex[:8]}.csv")
+    generate_csv(path, args.rows, args.duplicates, args.seed)
+    print(f"📄 {args.rows} lignes, {os.path.getsize(path) / 1e6:.1f} Mo")
+
+    tenant = f"bench-import-{uuid.uuid4().hex[:8]}"
+    port = free_port()
+    process = start_server(args.database_url, port, 1)
+    try:
+        print(f"\n📥 Imports dans le tenant {tenant}")
+        for label, mode in (("import initial", "skip"), ("ré-import (skip)", "skip"), ("ré-import (update)", "update")):
+            job, elapsed = run_import(port, tenant, path, mode)
+            per_minute = job["rows_read"] / elapsed * 60
+            verdict = "✅" if per_minute >= TARGET_PER_MINUTE else "⚠️"
+            print(f"   {verdict} {label:<20} {elapsed:7.1f}s  {per_minute:>10.0f} lignes/min  "
+                  f"créés {job['created_count']}, mis à jour {job['updated_count']}, ignorés {job['skipped_count']}, "
+                  f"doublons {job['duplicate_count']}, invalides {job['invalid_count']}")
+    finally:
+        process.terminate()
+        process.wait()
+        os.unlink(path)
+
+if __name__ == "__main__":
+    main()
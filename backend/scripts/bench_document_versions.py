@@ -0,0 +1,77 @@
+# backend/scripts/bench_document_versions.py
+# Mesure la croissance du stockage des versions pour un document souvent modifié
+import sys
+import os
+import random
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.modules.documents.delta import make_delta, apply_delta
+from app.modules.documents.routes import SNAPSHOT_INTERVAL, DELTA_MAX_RATIO
+
+def edit(content: bytearray, rng: random.Random, edits: int):
+    """Petites modifications locales: remplacements, insertions et suppressions"""
+    for _ in range(edits):
+        position = rng.randrange(len(content))
+        action = rng.choice(("replace", "insert", "delete"))
+        size = rng.randint(1, 200)
+        chunk = bytes(rng.getrandbits(8) for _ in range(size))
+        if action == "replace":
+            content[position:position + size] = chunk
+        elif action == "insert":
+            content[position:position] = chunk
+        else:
+            del content[position:position + size]
+
+def run(size: int, versions: int, edits: int, seed: int):
+    rng = random.Random(seed)
+    content = bytearray(rng.getrandbits(8) for _ in range(size))
+    history = [bytes(content)]
+    stored = [("full", bytes(content))]
+    encode_time = 0.0
+
+    for number in range(2, versions + 1):
+        edit(content, rng, edits)
+        current = bytes(content)
+        if (number - 1) % SNAPSHOT_INTERVAL == 0:
+            stored.append(("full", current))
+        else:
+            start = time.perf_counter()
+            delta = make_delta(history[-1], current)
+            encode_time += time.perf_counter() - start
+            if len(delta) < len(current) * DELTA_MAX_RATIO:
+                stored.append(("delta", delta))
+            else:
+                stored.append(("full", current))
+        history.append(current)
+
+    # Pire cas de reconstruction: la version juste avant un snapshot
+    worst = 0.0
+    for number in range(1, versions + 1):
+        start = time.perf_counter()
+        base = max(i for i in range(number) if stored[i][0] == "full")
+        rebuilt = stored[base][1]
+        for i in range(base + 1, number):
+            rebuilt = apply_delta(rebuilt, stored[i][1])
+        worst = max(worst, time.perf_counter() - start)
+        assert rebuilt == history[number - 1]
+
+    full_copies = sum(len(h) for h in history)
+    stored_bytes = sum(len(data) for _, data in stored)
+
+    print(f"Versions: {versions} | taille ~{size} octets | {edits} modifications/version")
+    print(f"Copies complètes:  {full_copies:>12} octets")
+    print(f"Delta + snapshots: {stored_bytes:>12} octets ({stored_bytes / full_copies:.1%})")
+    print(f"Croissance moyenne par version: {(stored_bytes - len(history[0])) / max(versions - 1, 1):.0f} octets")
+    print(f"Encodage delta moyen: {encode_time / max(versions - 1, 1) * 1000:.1f} ms")
+    print(f"Reconstruction pire cas: {worst * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du stockage delta des versions de documents")
+    parser.add_argument("--size", type=int, default=500_000)
+    parser.add_argument("--versions", type=int, default=50)
+    parser.add_argument("--edits", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.size, args.versions, args.edits, args.seed)
@@ -0,0 +1,141 @@
+# backend/scripts/bench_export.py
+# Débit (lignes/s) et mémoire du serveur pendant les exports en streaming
+#
+#   python scripts/bench_export.py --database-url postgresql://localhost/workos_bench --rows 1000000
+#   python scripts/bench_export.py ... --tenant startup1 --modules contacts,tasks,messages --gzip
+#
+# Sans --tenant, un tenant dédié reçoit --rows messages (insertion par lots). Le
+# serveur (uvicorn, 1 process) est lancé contre la base; sa mémoire résidente est
+# échantillonnée pendant chaque export: elle doit rester plate quel que soit le
+# nombre de lignes.
+import sys
+import os
+import time
+import uuid
+import zlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from bench_api import Client, free_port, start_server, BACKEND_DIR
+
+sys.path.append(BACKEND_DIR)
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.start_mb = self.peak_mb = rss_mb(pid)
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, rss_mb(self.pid))
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+def seed_messages(database_url, tenant, rows, batch=10000):
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+    from init_db import init_database  # Importe tous les modèles et crée les tables
+    from app.core.database import engine
+    from app.modules.contacts.models import Contact
+    from app.modules.messages.models import Message
+
+    init_database()
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        sender_id = connection.execute(insert(Contact.__table__).values(
+            tenant_id=tenant, name="Export bench", email="export@workos-bench.com", created_at=now, updated_at=now
+        )).inserted_primary_key[0]
+        for start in range(0, rows, batch):
+            connection.execute(insert(Message.__table__), [{
+                "tenant_id": tenant, "sender_id": sender_id, "channel": f"channel-{i % 20}",
+                "content": f"Message {i}: lorem ipsum dolor sit amet, consectetur adipiscing elit",
+                "message_type": "text", "is_read": False, "reply_count": 0, "recent_participant_ids": [],
+                "created_at": now - timedelta(seconds=i), "updated_at": now
+            } for i in range(start, min(start + batch, rows))])
+            print(f"   {min(start + batch, rows)}/{rows} messages", end="\r")
+    print()
+
+def run_export(port, pid, tenant, module, fmt, compress):
+    client = Client(port)
+    path = f"/api/{tenant}/{module}/export?format={fmt}&gzip={'true' if compress else 'false'}"
+    sampler = RssSampler(pid)
+    sampler.start()
+    start = time.perf_counter()
+    client.connection.request("GET", path)
+    response = client.connection.getresponse()
+    if response.status != 200:
+        raise RuntimeError(f"GET {path} -> {response.status}")
+
+    decompressor = zlib.decompressobj(31) if compress else None
+    transferred = lines = 0
+    first_byte = None
+    while True:
+        chunk = response.read(1 << 16)
+        if not chunk:
+            break
+        first_byte = first_byte or time.perf_counter() - start
+        transferred += len(chunk)
+        lines += (decompressor.decompress(chunk) if decompressor else chunk).count(b"\n")
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    rows = lines - 1 if fmt == "csv" else lines  # En-tête CSV
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0,
+        "megabytes": transferred / 1e6,
+        "first_byte_ms": (first_byte or elapsed) * 1000,
+        "rss_start_mb": sampler.start_mb,
+        "rss_peak_mb": sampler.peak_mb,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des exports NDJSON/CSV en streaming")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenant", default=None, help="Tenant existant (sinon un tenant dédié est créé)")
+    parser.add_argument("--rows", type=int, default=200000, help="Messages insérés pour le tenant dédié")
+    parser.add_argument("--modules", default="messages")
+    parser.add_argument("--formats", default="ndjson,csv")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (ou DATABASE_URL) est requis")
+
+    tenant = args.tenant
+    if tenant is None:
+        tenant = f"bench-export-{uuid.uuid4().hex[:8]}"
+        print(f"🌱 Tenant {tenant}: insertion de {args.rows} messages")
+        seed_messages(args.database_url, tenant, args.rows)
+
+    port = free_port()
+    process = start_server(args.database_url, port, 1)
+    try:
+        print(f"\n📤 Exports du tenant {tenant}{' (gzip)' if args.gzip else ''}")
+        print(f"   {'export':<22}{'lignes':>10}{'lignes/s':>12}{'Mo':>9}{'1er octet':>12}{'RSS début':>11}{'RSS max':>10}")
+        for module in args.modules.split(","):
+            for fmt in args.formats.split(","):
+                result = run_export(port, process.pid, tenant, module, fmt, args.gzip)
+                print(f"   {module + '.' + fmt:<22}{result['rows']:>10}{result['rows_per_second']:>12.0f}"
+                      f"{result['megabytes']:>9.1f}{result['first_byte_ms']:>10.0f}ms"
+                      f"{result['rss_start_mb']:>9.0f}Mo{result['rss_peak_mb']:>8.0f}Mo")
+    finally:
+        process.terminate()
+        process.wait()
+
+if __name__ == "__main__":
+    main()
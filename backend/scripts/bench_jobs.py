@@ -0,0 +1,140 @@
+# backend/scripts/bench_jobs.py
+# Débit de la file de travaux (objectif: plusieurs milliers de travaux par seconde sur un nœud)
+#
+#   python scripts/bench_jobs.py --database-url postgresql://localhost/workos_bench --jobs 50000 --processes 4
+#
+# Ajoute --jobs travaux (handler vide, file "bench") par transactions de --enqueue-batch,
+# puis lance --processes process de travail (--concurrency threads chacun) qui vident
+# la file: réclamation par lots (FOR UPDATE SKIP LOCKED), exécution, acquittement
+# groupé. Chaque process compte les travaux exécutés: le total doit être exactement
+# --jobs (aucun travail exécuté deux fois ni perdu).
+import os
+import sys
+import time
+import uuid
+import threading
+import argparse
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TARGET_PER_SECOND = 2000
+QUEUE = "bench"
+
+def noop(job):
+    pass
+
+def work(database_url, concurrency, batch_size, ready, go, executed, stop):
+    """Process de travail: une JobQueue limitée à la file du banc d'essai"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["JOB_BATCH_SIZE"] = str(batch_size)
+    os.environ["JOB_POLL_INTERVAL"] = "0.05"
+    from app.core.jobs import JobQueue
+
+    counter, lock = [0], threading.Lock()
+    def handler(job):
+        with lock:
+            counter[0] += 1
+
+    jobs = JobQueue({QUEUE: concurrency})
+    jobs.handler("bench.noop", queue=QUEUE)(handler)
+    ready.release()
+    go.wait()
+    jobs.start()
+    stop.wait()
+    jobs.close()
+    with executed.get_lock():
+        executed.value += counter[0]
+
+def enqueue_jobs(tenant, count, batch):
+    from app.core.database import SessionLocal
+    from app.core.jobs import job_queue
+
+    job_queue.handler("bench.noop", queue=QUEUE)(noop)
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        for offset in range(0, count, batch):
+            for i in range(offset, min(offset + batch, count)):
+                job_queue.enqueue(db, tenant, "bench.noop", {"i": i}, priority=i % 3)
+            db.commit()
+    finally:
+        db.close()
+    return time.perf_counter() - start
+
+def count_done(tenant, previous=0):
+    from sqlalchemy import func, select
+    from sqlalchemy.exc import OperationalError
+    from app.core.database import SessionLocal
+    from app.core.models import BackgroundJob
+
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(func.count()).select_from(BackgroundJob).where(
+                BackgroundJob.tenant_id == tenant, BackgroundJob.status == "done"
+            )
+        ).scalar()
+    except OperationalError:
+        # SQLite: base verrouillée par un acquittement en cours, on réessaiera
+        return previous
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la file de travaux en arrière-plan")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8, help="Threads par process")
+    parser.add_argument("--batch-size", type=int, default=100, help="Travaux réclamés par requête")
+    parser.add_argument("--enqueue-batch", type=int, default=500, help="Travaux ajoutés par transaction")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (ou DATABASE_URL) est requis")
+    os.environ["DATABASE_URL"] = args.database_url
+    from init_db import init_database
+    init_database()
+
+    tenant = f"bench-jobs-{uuid.uuid4().hex[:8]}"
+    elapsed = enqueue_jobs(tenant, args.jobs, args.enqueue_batch)
+    print(f"\n📥 {args.jobs} travaux ajoutés en {elapsed:.1f}s ({args.jobs / elapsed:.0f}/s)")
+
+    context = multiprocessing.get_context("spawn")
+    ready, go, stop = context.Semaphore(0), context.Event(), context.Event()
+    executed = context.Value("i", 0)
+    workers = [
+        context.Process(
+            target=work, args=(args.database_url, args.concurrency, args.batch_size, ready, go, executed, stop)
+        )
+        for _ in range(args.processes)
+    ]
+    for process in workers:
+        process.start()
+
+    # Chronomètre lancé quand tous les process sont prêts (imports et connexions exclus)
+    for _ in workers:
+        ready.acquire()
+    start = time.perf_counter()
+    go.set()
+    done = 0
+    try:
+        while done < args.jobs:
+            time.sleep(0.05)
+            done = count_done(tenant, done)
+            print(f"   {done}/{args.jobs}", end="\r")
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        for process in workers:
+            process.join()
+
+    rate = args.jobs / elapsed
+    verdict = "✅" if rate >= TARGET_PER_SECOND else "⚠️"
+    print(f"\n{verdict} {args.processes} process x {args.concurrency} threads: {rate:.0f} travaux/s")
+    duplicates = executed.value - args.jobs
+    print(f"{'✅' if duplicates == 0 else '❌'} Travaux exécutés: {executed.value} (attendu {args.jobs})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# backend/scripts/bench_startup.py
+# Benchmark de démarrage: temps d'import, délai avant /ready et latence des premières requêtes
+#
+#   python scripts/bench_startup.py --database-url postgresql://localhost/workos_bench --runs 5
+#   python scripts/bench_startup.py ... --modules contacts,tasks --importtime
+#
+# Compare un démarrage avec et sans préchauffage (STARTUP_WARMUP). La première
+# requête de chaque route est mesurée séparément de la seconde (à chaud).
+import sys
+import os
+import time
+import argparse
+import statistics
+import subprocess
+
+from bench_api import Client, free_port, BACKEND_DIR
+
+FIRST_REQUESTS = [
+    "/api/{tenant}/contacts",
+    "/api/{tenant}/messages?channel=general",
+    "/api/{tenant}/calendar?start_date=2024-01-01T00:00:00&end_date=2024-01-08T00:00:00",
+    "/api/{tenant}/projects",
+]
+
+def measure_import(env):
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, text=True)
+    return float(output.strip().splitlines()[-1])
+
+def print_importtime(env, top=15):
+    """Modules les plus coûteux à l'import (cumulé), via python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line.split("|")
+        rows.append((int(cumulative_us), module.strip()))
+    print(f"\n{'module':<50} {'cumulative':>12}")
+    for cumulative_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"{module:<50} {cumulative_us / 1000:>10.1f}ms")
+
+def measure_start(env, tenant):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        ready = None
+        while ready is None and time.perf_counter() - started < 60:
+            try:
+                status, _ = Client(port).request("GET", "/ready")
+                if status == 200:
+                    ready = time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        if ready is None:
+            raise RuntimeError("Server did not become ready")
+
+        client = Client(port)
+        first, second = [], []
+        for path in FIRST_REQUESTS:
+            path = path.format(tenant=tenant)
+            for samples in (first, second):
+                start = time.perf_counter()
+                client.request("GET", path)
+                samples.append((time.perf_counter() - start) * 1000)
+        return ready, first, second
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de démarrage de l'API WorkOS")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenant", default="demo")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modules", default="", help="ENABLED_MODULES (tous par défaut)")
+    parser.add_argument("--importtime", action="store_true", help="Détail des imports les plus lents")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    base_env = dict(os.environ, DATABASE_URL=args.database_url, ENABLED_MODULES=args.modules, ADMISSION_CONTROL_ENABLED="false")
+
+    imports = [measure_import(base_env) for _ in range(args.runs)]
+    print(f"📦 Import app.main: median {statistics.median(imports) * 1000:.0f}ms over {args.runs} runs")
+    if args.importtime:
+        print_importtime(base_env)
+
+    print(f"\n{'config':<12} {'ready':>10} {'1st req p50':>12} {'1st req max':>12} {'2nd req p50':>12}")
+    for label, warmup in (("no warmup", "false"), ("warmup", "true")):
+        env = dict(base_env, STARTUP_WARMUP=warmup)
+        ready, first, second = [], [], []
+        for _ in range(args.runs):
+            run_ready, run_first, run_second = measure_start(env, args.tenant)
+            ready.append(run_ready)
+            first.extend(run_first)
+            second.extend(run_second)
+        print(
+            f"{label:<12} {statistics.median(ready) * 1000:>8.0f}ms {statistics.median(first):>10.1f}ms "
+            f"{max(first):>10.1f}ms {statistics.median(second):>10.1f}ms"
+        )
+
+if __name__ == "__main__":
+    main()
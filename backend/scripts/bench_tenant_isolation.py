@@ -0,0 +1,94 @@
+# backend/scripts/bench_tenant_isolation.py
+# Latence d'un tenant "calme" pendant qu'un tenant "bruyant" sature la base
+#
+# Trois phases: référence sans bruit, bruit sur le shard du tenant calme
+# (tenants co-localisés), puis bruit routé sur le shard du tenant bruyant.
+import sys
+import os
+import time
+import threading
+import argparse
+import statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.core.tenant import shard_router
+
+QUIET_QUERY = text(
+    "SELECT id, content, created_at FROM messages "
+    "WHERE tenant_id = :tenant AND channel = 'general' "
+    "ORDER BY created_at DESC LIMIT 50"
+)
+
+NOISY_QUERY = text(
+    "SELECT channel, count(*), max(length(content)), count(DISTINCT sender_id) "
+    "FROM messages WHERE tenant_id = :tenant GROUP BY channel"
+)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def noisy_worker(shard, tenant_id, stop):
+    sessions = shard_router.sessionmaker(shard)
+    while not stop.is_set():
+        db = sessions()
+        try:
+            db.execute(NOISY_QUERY, {"tenant": tenant_id}).all()
+        finally:
+            db.close()
+
+def measure(shard, tenant_id, duration):
+    sessions = shard_router.sessionmaker(shard)
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        db = sessions()
+        try:
+            start = time.perf_counter()
+            db.execute(QUIET_QUERY, {"tenant": tenant_id}).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+    return latencies
+
+def run_phase(name, quiet_shard, quiet_tenant, noisy_shard, noisy_tenant, workers, duration):
+    stop = threading.Event()
+    threads = []
+    if noisy_shard:
+        for _ in range(workers):
+            thread = threading.Thread(target=noisy_worker, args=(noisy_shard, noisy_tenant, stop), daemon=True)
+            thread.start()
+            threads.append(thread)
+        time.sleep(1)  # Laisser la charge s'installer
+
+    latencies = measure(quiet_shard, quiet_tenant, duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(
+        f"{name:<28} n={len(latencies):<6} "
+        f"p50={statistics.median(latencies):7.2f}ms "
+        f"p95={percentile(latencies, 95):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark d'isolation de latence entre tenants")
+    parser.add_argument("--quiet-tenant", required=True)
+    parser.add_argument("--noisy-tenant", required=True)
+    parser.add_argument("--noisy-workers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15)
+    args = parser.parse_args()
+
+    quiet_shard, _ = shard_router.resolve(args.quiet_tenant)
+    noisy_shard, _ = shard_router.resolve(args.noisy_tenant)
+    print(f"Quiet tenant '{args.quiet_tenant}' on '{quiet_shard}', noisy tenant '{args.noisy_tenant}' on '{noisy_shard}'")
+    if quiet_shard == noisy_shard:
+        print("⚠️  Both tenants are on the same shard: the last two phases are equivalent")
+
+    run_phase("baseline", quiet_shard, args.quiet_tenant, None, args.noisy_tenant, 0, args.duration)
+    run_phase("noise, shared shard", quiet_shard, args.quiet_tenant, quiet_shard, args.noisy_tenant, args.noisy_workers, args.duration)
+    run_phase("noise, routed shard", quiet_shard, args.quiet_tenant, noisy_shard, args.noisy_tenant, args.noisy_workers, args.duration)
@@ -0,0 +1,107 @@
+# backend/scripts/bench_workers.py
+# Débit en fonction du nombre de workers (python -m app.server)
+#
+#   python scripts/bench_workers.py --database-url postgresql://localhost/workos_bench \
+#       --workers 1,2,4,8 --clients 32 --duration 20
+#
+# Les clients tournent dans des processus séparés pour que le générateur de charge
+# ne soit pas limité par le GIL. Après chaque palier, /metrics est relevé pour
+# vérifier que les compteurs agrégés couvrent bien les requêtes de tous les workers.
+import sys
+import os
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+
+from bench_api import Client, free_port, percentile, BACKEND_DIR
+
+def load_client(args):
+    port, path, duration = args
+    client = Client(port)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status, _ = client.request("GET", path)
+            errors += status >= 400
+        except OSError:
+            client = Client(port)
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+def start_server(database_url, port, workers, metrics_dir):
+    env = dict(os.environ, DATABASE_URL=database_url, ADMISSION_CONTROL_ENABLED="false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--port", str(port), "--workers", str(workers),
+         "--metrics-dir", metrics_dir, "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    for _ in range(300):
+        try:
+            status, _ = Client(port).request("GET", "/ready")
+            if status == 200:
+                # Laisser les autres workers terminer leur préchauffage
+                time.sleep(1 + workers * 0.5)
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+def scraped_requests(port, path):
+    """Somme de workos_requests_total pour le chemin mesuré, tous workers confondus"""
+    _, body = Client(port).request("GET", "/metrics")
+    total = 0.0
+    for line in body.decode().splitlines():
+        if line.startswith("workos_requests_total{") and f'endpoint="{path}"' in line:
+            total += float(line.rsplit(" ", 1)[1])
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de montée en charge par nombre de workers")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenant", default="demo")
+    parser.add_argument("--path", default="/api/{tenant}/contacts")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    path = args.path.format(tenant=args.tenant)
+    counts = [int(value) for value in args.workers.split(",")]
+    print(f"🏃 {path}, {args.clients} client processes, {args.duration}s per step")
+    print(f"\n{'workers':>7} {'rps':>9} {'speedup':>8} {'p50':>8} {'p99':>8} {'errors':>7} {'scraped':>9}")
+
+    baseline = None
+    for workers in counts:
+        port = free_port()
+        server = start_server(args.database_url, port, workers, tempfile.mkdtemp(prefix="workos-metrics-"))
+        try:
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(load_client, [(port, path, args.duration)] * args.clients)
+            scraped = scraped_requests(port, path)
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies = [value * 1000 for result in results for value in result[0]]
+        errors = sum(result[1] for result in results)
+        rps = len(latencies) / args.duration
+        baseline = baseline or rps
+        print(
+            f"{workers:>7} {rps:>9.1f} {rps / baseline:>7.2f}x {statistics.median(latencies):>7.1f}ms "
+            f"{percentile(latencies, 99):>7.1f}ms {errors:>7} {scraped:>9.0f}/{len(latencies)}"
+        )
+
+if __name__ == "__main__":
+    main()
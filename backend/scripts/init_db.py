@@ -4,11 +4,18 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.database import engine, Base
+from app.core.models import TenantShard, BackgroundJob
+from app.core.tenant import shard_router
+from backfill_contacts import backfill_contacts
+from backfill_document_texts import backfill_document_texts
+from backfill_documents import backfill_documents, backfill_previews
+from backfill_folders import backfill_folders
+from backfill_messages import backfill_messages
 
 # Importer TOUS les modèles
 from app.modules.contacts.models import Contact
 from app.modules.tasks.models import Task
-from app.modules.messages.models import Message
+from app.modules.messages.models import Message, MessageReadCursor
 from app.modules.documents.models import Folder, Document, DocumentShare, DocumentVersion
 from app.modules.calendar.models import Event, EventParticipant, EventReminder
 from app.modules.projects.models import (
@@ -22,8 +29,31 @@ def init_database():
     # Afficher les modèles détectés
     print(f"Modèles détectés: {[table.name for table in Base.metadata.tables.values()]}")
     
-    Base.metadata.create_all(bind=engine)
-    print("✅ Tables created successfully!")
+    # Le schéma est identique sur chaque shard
+    for shard in shard_router.shards():
+        shard_engine = shard_router.engine(shard)
+        Base.metadata.create_all(bind=shard_engine)
+        print(f"✅ Tables created successfully on shard '{shard}'!")
+        
+        # Tables existantes: colonnes et index ajoutés depuis (idempotent)
+        filled, duplicates = backfill_contacts(shard_engine)
+        if filled or duplicates:
+            print(f"   contacts: {filled} normalized emails filled, {duplicates} duplicates left without key")
+        updated, orphans = backfill_folders(shard_engine)
+        if updated or orphans:
+            print(f"   folders: {updated} paths filled, {orphans} folders unreachable from a root")
+        threads = backfill_messages(shard_engine)
+        if threads:
+            print(f"   messages: thread statistics computed for {threads} threads")
+        upgraded, duplicates = backfill_documents(shard_engine)
+        if upgraded or duplicates:
+            print(f"   document_versions: {upgraded} versions upgraded, {duplicates} duplicated version numbers")
+        filled = backfill_previews(shard_engine)
+        if filled:
+            print(f"   documents: {filled} preview statuses set")
+        added = backfill_document_texts(shard_engine)
+        if added:
+            print(f"   document_texts: {added} documents queued for extraction")
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
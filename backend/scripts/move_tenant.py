@@ -0,0 +1,246 @@
+# backend/scripts/move_tenant.py
+# Déplacement en ligne d'un tenant entre shards
+#
+#   python scripts/move_tenant.py init-shard --shard shard1 --index 2 --count 4
+#   python scripts/move_tenant.py move --tenant bigcorp --to shard1 [--cleanup]
+#
+# Les ids sont conservés lors d'un déplacement: chaque shard doit d'abord être
+# initialisé avec des séquences entrelacées (INCREMENT BY count) pour qu'aucun id
+# ne puisse entrer en collision d'un shard à l'autre.
+import sys
+import os
+import time
+import argparse
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, delete, update, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.database import Base, SessionLocal
+from app.core.models import TenantShard
+from app.core.tenant import shard_router, SHARD_MAP_TTL
+
+# Importer TOUS les modèles
+import app.modules.contacts.models
+import app.modules.tasks.models
+import app.modules.messages.models
+import app.modules.documents.models
+import app.modules.calendar.models
+import app.modules.projects.models
+
+BATCH_SIZE = 5000
+# Marge sur updated_at (horloges applicatives des différentes instances)
+CLOCK_SKEW_MARGIN = timedelta(seconds=60)
+MAX_CATCHUP_PASSES = 5
+CATCHUP_THRESHOLD = 1000
+
+class IdCollision(Exception):
+    """Un id copié est déjà utilisé par un autre tenant sur le shard cible"""
+
+def tenant_tables():
+    """Tables portant un tenant_id, parents avant enfants"""
+    return [
+        table for table in Base.metadata.sorted_tables
+        if "tenant_id" in table.c and table.name != TenantShard.__tablename__
+    ]
+
+def self_ref_columns(table):
+    return [fk.parent.name for fk in table.foreign_keys if fk.column.table is table]
+
+def copy_rows(source, target, table, tenant_id, since=None):
+    """Upsert des lignes du tenant dans le shard cible, par lots ordonnés par id.
+
+    Les FK auto-référencées (thread_id, parent_id...) sont posées dans un second
+    temps: un parent peut avoir un id plus grand que son enfant (ex: dossier déplacé).
+
+    Un id déjà pris par un autre tenant sur la cible (séquences non entrelacées) n'est
+    jamais écrasé: l'upsert ne met à jour que les lignes du même tenant et le
+    déplacement échoue si une ligne n'a pas été écrite.
+    """
+    self_refs = self_ref_columns(table)
+    deferred = []
+    copied = 0
+    last_id = 0
+
+    while True:
+        query = select(table).where(table.c.tenant_id == tenant_id, table.c.id > last_id)
+        if since is not None:
+            query = query.where(table.c.updated_at >= since)
+        rows = source.execute(query.order_by(table.c.id).limit(BATCH_SIZE)).mappings().all()
+        if not rows:
+            break
+
+        values = []
+        for row in rows:
+            row = dict(row)
+            refs = {column: row[column] for column in self_refs if row[column] is not None}
+            if refs:
+                deferred.append((row["id"], refs))
+                row.update({column: None for column in refs})
+            values.append(row)
+
+        stmt = pg_insert(table).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={column.name: stmt.excluded[column.name] for column in table.c if column.name != "id"},
+            where=(table.c.tenant_id == stmt.excluded.tenant_id)
+        )
+        written = target.execute(stmt).rowcount
+        if written != len(values):
+            raise IdCollision(
+                f"{table.name}: {len(values) - written} id(s) between {rows[0]['id']} and {rows[-1]['id']} "
+                f"already belong to another tenant on the target shard (run init-shard on every shard)"
+            )
+
+        copied += len(rows)
+        last_id = rows[-1]["id"]
+
+    for row_id, refs in deferred:
+        target.execute(
+            update(table)
+            .where(table.c.id == row_id, table.c.tenant_id == tenant_id)
+            .values(**refs)
+        )
+
+    return copied
+
+def copy_tenant(source, target, tenant_id, since=None):
+    total = 0
+    for table in tenant_tables():
+        copied = copy_rows(source, target, table, tenant_id, since)
+        target.commit()
+        if copied:
+            print(f"   {table.name}: {copied} rows")
+        total += copied
+    return total
+
+def reconcile_deletes(source, target, tenant_id):
+    """Supprime du shard cible les lignes supprimées à la source pendant la copie"""
+    removed = 0
+    for table in reversed(tenant_tables()):
+        source_ids = set(source.execute(
+            select(table.c.id).where(table.c.tenant_id == tenant_id)
+        ).scalars())
+        target_ids = set(target.execute(
+            select(table.c.id).where(table.c.tenant_id == tenant_id)
+        ).scalars())
+        stale = list(target_ids - source_ids)
+        for start in range(0, len(stale), BATCH_SIZE):
+            target.execute(delete(table).where(table.c.id.in_(stale[start:start + BATCH_SIZE])))
+        removed += len(stale)
+    target.commit()
+    return removed
+
+def set_directory(tenant_id, shard, read_only):
+    db = SessionLocal()
+    try:
+        db.merge(TenantShard(tenant_id=tenant_id, shard=shard, read_only=read_only))
+        db.commit()
+    finally:
+        db.close()
+
+def wait_for_directory():
+    # Laisser chaque instance recharger l'annuaire
+    print(f"⏳ Waiting {SHARD_MAP_TTL + 2}s for instances to reload the shard directory...")
+    time.sleep(SHARD_MAP_TTL + 2)
+
+def move_tenant(tenant_id, target_shard, cleanup=False):
+    source_shard, _ = shard_router.resolve(tenant_id)
+    if source_shard == target_shard:
+        print(f"Tenant '{tenant_id}' is already on shard '{target_shard}'")
+        return
+
+    source = shard_router.sessionmaker(source_shard)()
+    target = shard_router.sessionmaker(target_shard)()
+    started = time.time()
+
+    try:
+        print(f"🚚 Moving tenant '{tenant_id}': {source_shard} -> {target_shard}")
+
+        # 1. Copie complète, le tenant reste en écriture
+        since = datetime.utcnow() - CLOCK_SKEW_MARGIN
+        print("1/4 Initial copy")
+        copy_tenant(source, target, tenant_id)
+
+        # 2. Rattrapage des lignes modifiées pendant la copie
+        for attempt in range(MAX_CATCHUP_PASSES):
+            pass_start = datetime.utcnow() - CLOCK_SKEW_MARGIN
+            print(f"2/4 Catch-up pass {attempt + 1} (updated since {since.isoformat()})")
+            copied = copy_tenant(source, target, tenant_id, since)
+            since = pass_start
+            if copied < CATCHUP_THRESHOLD:
+                break
+
+        # 3. Gel des écritures, dernier rattrapage et réconciliation des suppressions
+        print("3/4 Freezing writes")
+        set_directory(tenant_id, source_shard, read_only=True)
+        wait_for_directory()
+        copy_tenant(source, target, tenant_id, since)
+        removed = reconcile_deletes(source, target, tenant_id)
+        print(f"   {removed} deleted rows reconciled")
+
+        # 4. Bascule
+        print("4/4 Switching tenant to target shard")
+        set_directory(tenant_id, target_shard, read_only=False)
+
+        if cleanup:
+            wait_for_directory()
+            for table in reversed(tenant_tables()):
+                source.execute(delete(table).where(table.c.tenant_id == tenant_id))
+            source.commit()
+            print(f"🧹 Source rows removed from '{source_shard}'")
+
+        print(f"✅ Tenant moved in {time.time() - started:.1f}s")
+
+    except Exception:
+        # En cas d'échec le tenant reste sur la source, écritures réouvertes
+        source.rollback()
+        target.rollback()
+        set_directory(tenant_id, source_shard, read_only=False)
+        raise
+    finally:
+        source.close()
+        target.close()
+
+def init_shard(shard, index, count):
+    """Séquences entrelacées: sur ce shard, id ≡ index (mod count)"""
+    engine = shard_router.engine(shard)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if "id" not in table.c or not table.c.id.autoincrement:
+                continue
+            sequence = conn.execute(
+                text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table.name}
+            ).scalar()
+            if not sequence:
+                continue
+            max_id = conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+            start = max_id + 1
+            start += (index - start) % count
+            conn.execute(text(f"ALTER SEQUENCE {sequence} INCREMENT BY {count} RESTART WITH {start}"))
+            print(f"   {table.name}: next id {start}, increment {count}")
+
+    print(f"✅ Shard '{shard}' initialized (index {index}/{count})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tenant shard management")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = commands.add_parser("init-shard")
+    init_parser.add_argument("--shard", required=True)
+    init_parser.add_argument("--index", type=int, required=True, help="Résidu des ids de ce shard (1..count)")
+    init_parser.add_argument("--count", type=int, required=True, help="Nombre maximum de shards")
+
+    move_parser = commands.add_parser("move")
+    move_parser.add_argument("--tenant", required=True)
+    move_parser.add_argument("--to", required=True)
+    move_parser.add_argument("--cleanup", action="store_true", help="Supprimer les lignes du shard source")
+
+    args = parser.parse_args()
+    if args.command == "init-shard":
+        init_shard(args.shard, args.index, args.count)
+    else:
+        move_tenant(args.tenant, args.to, args.cleanup)
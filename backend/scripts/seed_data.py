@@ -0,0 +1,476 @@
+# backend/scripts/seed_data.py
+# Génération de données synthétiques multi-tenant chargées par COPY
+#
+#   python scripts/seed_data.py --scale 10 --tenants 50 --seed 42
+#
+# Tailles de tenants selon une loi de Zipf (quelques très gros tenants, beaucoup de
+# petits), expéditeurs et channels biaisés, threads, événements récurrents,
+# arborescences de dossiers et membres de projets. Le même --seed donne les mêmes
+# données. A --scale 1, environ 100k messages et 4k événements au total.
+import sys
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import itertools
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, JSON
+
+from app.core.database import Base, normalize_database_url
+from app.modules.contacts.models import Contact
+from app.modules.tasks.models import Task
+from app.modules.messages.models import Message
+from app.modules.documents.models import Folder, Document
+from app.modules.calendar.models import Event, EventParticipant
+from app.modules.calendar.schemas import EventTypeEnum, RecurrenceTypeEnum
+from app.modules.projects.models import Project, ProjectMember, ProjectTask
+
+# Volumes totaux (tous tenants) à --scale 1
+BASE_COUNTS = {
+    "contacts": 5_000,
+    "messages": 100_000,
+    "events": 4_000,
+    "tasks": 10_000,
+    "projects": 500,
+    "folders": 2_000,
+    "documents": 10_000,
+}
+MIN_COUNTS = {"contacts": 5, "messages": 20, "events": 5, "tasks": 10, "projects": 1, "folders": 3, "documents": 5}
+
+CHANNELS = ["general", "dev", "random", "sales", "support", "design", "ops", "marketing"]
+MIME_TYPES = [("application/pdf", ".pdf"), ("image/png", ".png"), ("text/plain", ".txt"),
+              ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx")]
+WORDS = ("project review budget deadline client release meeting update design roadmap "
+         "invoice report sprint backlog feedback launch hiring onboarding contract demo").split()
+
+HISTORY_DAYS = 365
+COPY_CHUNK = 1 << 20
+
+class ZipfSampler:
+    def __init__(self, rng, population, exponent=1.1):
+        self.rng = rng
+        self.population = list(population)
+        self.cum_weights = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(len(self.population))))
+
+    def __call__(self):
+        return self.rng.choices(self.population, cum_weights=self.cum_weights)[0]
+
+class IdAllocator:
+    """Blocs d'ids pris sur la séquence de chaque table (respecte l'INCREMENT des shards)"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.sequences = {}
+        self.next = {}
+        self.increment = {}
+
+    def start(self, table):
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table.name,))
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT nextval(%s), seqincrement FROM pg_sequence WHERE seqrelid = %s::regclass",
+            (sequence, sequence)
+        )
+        self.next[table.name], self.increment[table.name] = cursor.fetchone()
+        self.sequences[table.name] = sequence
+
+    def __call__(self, table):
+        value = self.next[table.name]
+        self.next[table.name] += self.increment[table.name]
+        return value
+
+    def finish(self):
+        """Avance chaque séquence après les ids distribués (jamais en arrière si l'application
+        en a pris entre-temps) et reprend la distribution après sa valeur"""
+        cursor = self.connection.cursor()
+        for name, sequence in self.sequences.items():
+            cursor.execute(
+                f"SELECT setval(%s, GREATEST(%s, (SELECT last_value FROM {sequence})))",
+                (sequence, self.next[name] - self.increment[name])
+            )
+            self.next[name] = cursor.fetchone()[0] + self.increment[name]
+
+class CopyStream:
+    """Fichier en lecture seule alimenté par un générateur de lignes CSV"""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.pending = ""
+        self.count = 0
+        self._parts = []
+        self._writer = csv.writer(self, lineterminator="\n")
+
+    def write(self, value):
+        # Appelé par csv.writer
+        self._parts.append(value)
+
+    def read(self, size=-1):
+        size = COPY_CHUNK if size is None or size < 0 else size
+        self._parts = [self.pending]
+        buffered = len(self.pending)
+        while buffered < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            buffered += len(self._parts[-1])
+            self.count += 1
+        data = "".join(self._parts)
+        chunk, self.pending = data[:size], data[size:]
+        return chunk
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+def copy_rows(connection, table, rows):
+    """COPY des lignes (dicts) vers la table, les colonnes absentes prennent leur défaut Python"""
+    names = [column.name for column in table.columns]
+    # str(datetime) est directement accepté par Postgres, seul le JSON est à encoder
+    json_indexes = [index for index, column in enumerate(table.columns) if isinstance(column.type, JSON)]
+    now = datetime.utcnow()
+
+    def default_for(column):
+        default = column.default
+        if column.name in ("created_at", "updated_at"):
+            return now
+        if default is None or not (default.is_scalar or default.is_callable):
+            return None
+        # Les défauts appelables sont enveloppés par SQLAlchemy: fn(context)
+        return default.arg(None) if default.is_callable else default.arg
+
+    defaults = {column.name: default_for(column) for column in table.columns}
+
+    def encoded():
+        for row in rows:
+            values = [row.get(name, defaults[name]) for name in names]
+            for index in json_indexes:
+                if values[index] is not None:
+                    values[index] = json.dumps(values[index])
+            yield values
+
+    stream = CopyStream(encoded())
+    cursor = connection.cursor()
+    cursor.copy_expert(f"COPY {table.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)", stream)
+    return stream.count
+
+def sentence(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, words))).capitalize()
+
+def random_time(rng, start, days=HISTORY_DAYS):
+    return start + timedelta(seconds=rng.randint(0, days * 86400))
+
+class TenantGenerator:
+    def __init__(self, tenant_id, counts, rng, ids, now):
+        self.tenant_id = tenant_id
+        self.counts = counts
+        self.rng = rng
+        self.ids = ids
+        self.now = now
+        self.since = now - timedelta(days=HISTORY_DAYS)
+        self.contact_ids = []
+        self.task_ids = []
+        # Textes tirés d'un pool: générer une phrase par ligne domine sinon le temps de chargement
+        self.texts = [sentence(rng, 25) for _ in range(2048)]
+
+    def text(self):
+        return self.texts[int(self.rng.random() * len(self.texts))]
+
+    def base(self, table, created_at=None):
+        created_at = created_at or random_time(self.rng, self.since)
+        return {"id": self.ids(table), "tenant_id": self.tenant_id, "created_at": created_at, "updated_at": created_at}
+
+    def contacts(self):
+        for i in range(self.counts["contacts"]):
+            row = self.base(Contact.__table__)
+            self.contact_ids.append(row["id"])
+            row.update({
+                "name": f"Contact {i} {self.tenant_id}",
+                "email": f"contact{i}@{self.tenant_id}.example.com",
+                "normalized_email": f"contact{i}@{self.tenant_id}.example.com".lower(),
+                "phone": f"+1555{self.rng.randint(0, 9999999):07d}",
+                "company": f"Company {self.rng.randint(1, max(1, self.counts['contacts'] // 20))}",
+                "type": self.rng.choice(["contact", "contact", "client", "vendor"]),
+            })
+            yield row
+
+    def tasks(self):
+        assignee = ZipfSampler(self.rng, self.contact_ids)
+        for _ in range(self.counts["tasks"]):
+            row = self.base(Task.__table__)
+            self.task_ids.append(row["id"])
+            row.update({
+                "title": sentence(self.rng, 6),
+                "description": self.text(),
+                "assignee_id": assignee() if self.rng.random() < 0.85 else None,
+                "status": self.rng.choices(["todo", "in_progress", "done"], [40, 20, 40])[0],
+                "priority": self.rng.choices(["low", "medium", "high"], [30, 50, 20])[0],
+                "due_date": random_time(self.rng, self.since, HISTORY_DAYS + 60) if self.rng.random() < 0.7 else None,
+            })
+            yield row
+
+    def messages(self):
+        """Threads générés d'un bloc: les stats du message racine sont connues avant l'écriture"""
+        table = Message.__table__
+        sender = ZipfSampler(self.rng, self.contact_ids)
+        channel = ZipfSampler(self.rng, CHANNELS[:max(2, min(len(CHANNELS), self.counts["contacts"] // 10))])
+        remaining = self.counts["messages"]
+        step = HISTORY_DAYS * 86400 / max(1, remaining)
+        clock = self.since
+
+        while remaining > 0:
+            clock += timedelta(seconds=self.rng.expovariate(1 / step))
+            replies = min(remaining - 1, int(self.rng.paretovariate(1.5)) - 1 if self.rng.random() < 0.3 else 0)
+            root = self.base(table, clock)
+            root_channel = channel()
+            reply_rows = []
+            reply_time = clock
+            participants = []
+            for _ in range(replies):
+                reply_time += timedelta(seconds=self.rng.randint(10, 3600))
+                reply_sender = sender()
+                participants = [reply_sender] + [p for p in participants if p != reply_sender]
+                reply = self.base(table, reply_time)
+                reply.update({
+                    "content": self.text(),
+                    "sender_id": reply_sender,
+                    "channel": root_channel,
+                    "thread_id": root["id"],
+                    "is_read": reply_time < self.now - timedelta(days=7),
+                    "message_type": "text",
+                    "reply_count": 0,
+                    "recent_participant_ids": [],
+                })
+                reply_rows.append(reply)
+            root.update({
+                "content": self.text(),
+                "sender_id": sender(),
+                "recipient_id": None,
+                "channel": root_channel,
+                "thread_id": None,
+                "is_read": clock < self.now - timedelta(days=7),
+                "message_type": "text",
+                "reply_count": replies,
+                "last_reply_at": reply_time if replies else None,
+                "recent_participant_ids": participants[:5],
+            })
+            yield root
+            yield from reply_rows
+            remaining -= 1 + replies
+
+    def folders_and_documents(self):
+        """Arborescence aléatoire (profondeur bornée) avec cumuls de tailles cohérents"""
+        folder_table = Folder.__table__
+        creator = ZipfSampler(self.rng, self.contact_ids)
+        folders = []
+        for i in range(self.counts["folders"]):
+            row = self.base(folder_table)
+            parent = self.rng.choice(folders) if folders and self.rng.random() < 0.75 else None
+            if parent and parent["depth"] >= 7:
+                parent = None
+            row.update({
+                "name": f"Folder {i}",
+                "parent_id": parent["id"] if parent else None,
+                "description": None,
+                "is_shared": self.rng.random() < 0.2,
+                "created_by": creator(),
+                "path": f"{parent['path'] if parent else '/'}{row['id']}/",
+                "depth": parent["depth"] + 1 if parent else 0,
+                "total_size": 0,
+                "document_count": 0,
+            })
+            folders.append(row)
+
+        by_id = {folder["id"]: folder for folder in folders}
+        folder_choice = ZipfSampler(self.rng, [folder["id"] for folder in folders], 0.8)
+        documents = []
+        for i in range(self.counts["documents"]):
+            row = self.base(Document.__table__)
+            mime_type, extension = self.rng.choice(MIME_TYPES)
+            size = int(self.rng.lognormvariate(11, 1.5))
+            folder_id = folder_choice() if self.rng.random() < 0.9 else None
+            row.update({
+                "name": f"{self.rng.choice(WORDS)}-{i}{extension}",
+                "file_path": f"{self.tenant_id}/seed-{row['id']}{extension}",
+                "file_size": size,
+                "mime_type": mime_type,
+                "folder_id": folder_id,
+                "uploaded_by": creator(),
+                "version": 1,
+                "is_public": self.rng.random() < 0.1,
+                "download_count": int(self.rng.expovariate(0.2)),
+            })
+            if folder_id:
+                for ancestor_id in by_id[folder_id]["path"].strip("/").split("/"):
+                    ancestor = by_id[int(ancestor_id)]
+                    ancestor["total_size"] += size
+                    ancestor["document_count"] += 1
+            documents.append(row)
+
+        return folders, documents
+
+    def events(self, participants):
+        table = Event.__table__
+        organizer = ZipfSampler(self.rng, self.contact_ids)
+        recurrences = [RecurrenceTypeEnum.DAILY, RecurrenceTypeEnum.WEEKLY, RecurrenceTypeEnum.WEEKLY, RecurrenceTypeEnum.MONTHLY]
+        for _ in range(self.counts["events"]):
+            start = random_time(self.rng, self.since, HISTORY_DAYS + 90).replace(minute=self.rng.choice([0, 30]), second=0, microsecond=0)
+            recurring = self.rng.random() < 0.15
+            row = self.base(table)
+            created_by = organizer()
+            row.update({
+                "title": sentence(self.rng, 5),
+                "description": sentence(self.rng, 15),
+                "start_time": start,
+                "end_time": start + timedelta(minutes=self.rng.choice([15, 30, 30, 60, 60, 90, 120])),
+                "location": self.rng.choice([None, "Room A", "Room B", "Online"]),
+                "event_type": self.rng.choices(list(EventTypeEnum), [60, 10, 10, 15, 5])[0].name,
+                "is_all_day": self.rng.random() < 0.05,
+                "created_by": created_by,
+                "recurrence_type": (self.rng.choice(recurrences) if recurring else RecurrenceTypeEnum.NONE).name,
+                "recurrence_end": start + timedelta(days=self.rng.randint(30, 365)) if recurring else None,
+                "parent_event_id": None,
+                "related_task_id": self.rng.choice(self.task_ids) if self.task_ids and self.rng.random() < 0.1 else None,
+            })
+            attendees = {created_by}
+            for _ in range(min(len(self.contact_ids) - 1, int(self.rng.paretovariate(1.2)) + 1)):
+                attendees.add(organizer())
+            for contact_id in attendees:
+                participant = self.base(EventParticipant.__table__, row["created_at"])
+                participant.update({
+                    "event_id": row["id"],
+                    "contact_id": contact_id,
+                    "status": "accepted" if contact_id == created_by else self.rng.choices(
+                        ["pending", "accepted", "declined", "tentative"], [25, 55, 10, 10])[0],
+                    "role": "organizer" if contact_id == created_by else "attendee",
+                })
+                participants.append(participant)
+            yield row
+
+    def projects(self, members, links):
+        table = Project.__table__
+        member_choice = ZipfSampler(self.rng, self.contact_ids)
+        linked_tasks = self.rng.sample(self.task_ids, int(len(self.task_ids) * 0.6))
+        per_project = max(1, len(linked_tasks) // max(1, self.counts["projects"]))
+        for i in range(self.counts["projects"]):
+            row = self.base(table)
+            start = row["created_at"]
+            created_by = member_choice()
+            row.update({
+                "name": f"Project {i}",
+                "description": self.text(),
+                "status": self.rng.choices(["planning", "active", "on_hold", "completed", "cancelled"], [15, 45, 10, 25, 5])[0],
+                "priority": self.rng.choice(["low", "medium", "medium", "high", "critical"]),
+                "start_date": start,
+                "end_date": start + timedelta(days=self.rng.randint(30, 240)),
+                "deadline": start + timedelta(days=self.rng.randint(20, 200)),
+                "budget": round(self.rng.uniform(1_000, 200_000), 2),
+                "estimated_hours": self.rng.randint(10, 2000),
+                "created_by": created_by,
+                "client_id": member_choice() if self.rng.random() < 0.5 else None,
+                "is_public": self.rng.random() < 0.2,
+                "is_archived": self.rng.random() < 0.1,
+                "color": self.rng.choice(["#3B82F6", "#10B981", "#F59E0B", "#EF4444", "#8B5CF6"]),
+            })
+            team = {created_by} | {member_choice() for _ in range(self.rng.randint(2, 15))}
+            for contact_id in team:
+                member = self.base(ProjectMember.__table__, start)
+                member.update({
+                    "project_id": row["id"],
+                    "contact_id": contact_id,
+                    "role": "owner" if contact_id == created_by else self.rng.choice(["manager", "member", "member", "viewer"]),
+                    "joined_at": start,
+                    "hourly_rate": round(self.rng.uniform(30, 150), 2),
+                })
+                members.append(member)
+            for task_id in linked_tasks[i * per_project:(i + 1) * per_project]:
+                link = self.base(ProjectTask.__table__, start)
+                link.update({"project_id": row["id"], "task_id": task_id})
+                links.append(link)
+            yield row
+
+def tenant_counts(tenants, scale, exponent):
+    weights = [1 / (rank + 1) ** exponent for rank in range(tenants)]
+    total = sum(weights)
+    return [
+        {name: max(MIN_COUNTS[name], int(BASE_COUNTS[name] * scale * weight / total)) for name in BASE_COUNTS}
+        for weight in weights
+    ]
+
+def seed(database_url, tenants, scale, seed_value, exponent, prefix):
+    engine = create_engine(normalize_database_url(database_url))
+    Base.metadata.create_all(bind=engine)
+    connection = engine.raw_connection()
+    started = time.time()
+    totals = {}
+
+    def load(table, rows):
+        table_start = time.time()
+        count = copy_rows(connection, table, rows)
+        totals[table.name] = totals.get(table.name, 0) + count
+        return count, time.time() - table_start
+
+    try:
+        ids = IdAllocator(connection)
+        for table in (Contact.__table__, Task.__table__, Message.__table__, Folder.__table__, Document.__table__,
+                      Event.__table__, EventParticipant.__table__, Project.__table__, ProjectMember.__table__, ProjectTask.__table__):
+            ids.start(table)
+
+        now = datetime.utcnow().replace(microsecond=0)
+        for index, counts in enumerate(tenant_counts(tenants, scale, exponent)):
+            tenant_id = f"{prefix}{index + 1}"
+            generator = TenantGenerator(tenant_id, counts, random.Random(seed_value * 100_003 + index), ids, now)
+
+            load(Contact.__table__, generator.contacts())
+            load(Task.__table__, generator.tasks())
+            message_count, message_time = load(Message.__table__, generator.messages())
+
+            folders, documents = generator.folders_and_documents()
+            # Parents avant enfants pour la FK parent_id
+            load(Folder.__table__, sorted(folders, key=lambda folder: folder["depth"]))
+            load(Document.__table__, documents)
+
+            participants = []
+            load(Event.__table__, generator.events(participants))
+            load(EventParticipant.__table__, participants)
+
+            members, links = [], []
+            load(Project.__table__, generator.projects(members, links))
+            load(ProjectMember.__table__, members)
+            load(ProjectTask.__table__, links)
+
+            # Séquences avancées avec les lignes du tenant: un arrêt en cours de route ne
+            # laisse pas d'ids déjà écrits devant la séquence
+            ids.finish()
+            connection.commit()
+            print(f"   {tenant_id}: {counts['contacts']} contacts, {message_count} messages "
+                  f"({message_count / max(message_time, 1e-6):,.0f} rows/s), {counts['events']} events")
+
+    finally:
+        connection.close()
+
+    elapsed = time.time() - started
+    rows = sum(totals.values())
+    print(f"✅ {rows:,} rows loaded in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    for name, count in totals.items():
+        print(f"   {name}: {count:,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed synthetic multi-tenant data through COPY")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Exposant de la loi de Zipf des tailles de tenants")
+    parser.add_argument("--prefix", default="seed", help="Préfixe des tenant_id générés")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    print(f"🌱 Seeding {args.tenants} tenants (scale {args.scale}, seed {args.seed})...")
+    seed(args.database_url, args.tenants, args.scale, args.seed, args.zipf, args.prefix)
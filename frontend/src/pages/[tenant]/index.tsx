@@ -259,14 +259,17 @@ export default function TenantDashboard() {
       setEvents(eventsData)
       setProjects(projectsData)
       
-      // Fetch des stats séparément avec gestion d'erreur
+      // Stats agrégées en un seul appel (sections calculées en parallèle par l'API)
+      const dashboard = await fetch(`${API_URL}/api/${tenant}/dashboard`)
+        .then(res => res.ok ? res.json() : null)
+        .catch(() => null)
+      
+      // Stats calendrier, calculées localement si la section est absente
       try {
-        const eventsStatsRes = await fetch(`${API_URL}/api/${tenant}/events/stats`)
-        if (eventsStatsRes.ok) {
-          const statsData = await eventsStatsRes.json()
-          setCalendarStats(statsData)
+        if (dashboard?.calendar_stats) {
+          setCalendarStats(dashboard.calendar_stats)
         } else {
-          console.log('Events stats endpoint not available')
+          console.log('Calendar stats section not available')
           // Calculer les stats manuellement si l'endpoint n'existe pas
           const now = new Date()
           const weekStart = new Date(now.getFullYear(), now.getMonth(), now.getDate() - now.getDay())
@@ -291,14 +294,12 @@ export default function TenantDashboard() {
         console.log('Error fetching events stats:', error)
       }
       
-      // Fetch des stats projets séparément
+      // Stats projets, calculées localement si la section est absente
       try {
-        const projectStatsRes = await fetch(`${API_URL}/api/${tenant}/projects/stats`)
-        if (projectStatsRes.ok) {
-          const projectStatsData = await projectStatsRes.json()
-          setProjectStats(projectStatsData)
+        if (dashboard?.project_stats) {
+          setProjectStats(dashboard.project_stats)
         } else {
-          console.log('Projects stats endpoint not available')
+          console.log('Project stats section not available')
           // Calculer les stats manuellement si l'endpoint n'existe pas
           const now = new Date()
           setProjectStats({